@@ -0,0 +1,691 @@
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from utils import checker
+
+
+def _response(status_code=200, data=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = data
+    response.headers = headers or {}
+    response.raise_for_status = MagicMock()
+    return response
+
+
+_TAGS = [
+    {"name": "latest", "images": [{"architecture": "amd64"}]},
+    {"name": "arm", "images": [{"architecture": "arm64"}]},
+]
+
+
+def _fetch_tag(image, tag):
+    return next((t for t in _TAGS if t["name"] == tag), {})
+
+
+class TestRegistryCache(unittest.TestCase):
+    """Verify the persistent registry lookup cache."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        patcher = patch.object(checker, "REGISTRY_CACHE_DIR", self.tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        session_patcher = patch("utils.checker.get_registry_session")
+        self.mock_get = session_patcher.start().return_value.get
+        self.addCleanup(session_patcher.stop)
+
+    def test_fresh_entry_is_served_without_request(self):
+        """A second lookup within the TTL does not hit the registry."""
+        self.mock_get.return_value = _response(data={"results": []})
+
+        checker.fetch_docker_tags("owner/image")
+        checker.fetch_docker_tags("owner/image")
+
+        self.assertEqual(self.mock_get.call_count, 1)
+
+    def test_stale_entry_is_revalidated_with_etag(self):
+        """A stale entry sends If-None-Match and reuses the body on 304."""
+        data = {"results": [{"name": "latest", "images": []}]}
+        self.mock_get.return_value = _response(data=data, headers={"ETag": '"abc"'})
+        checker.cached_get_json("http://registry/tags", "owner/image", ttl=0)
+
+        self.mock_get.return_value = _response(status_code=304)
+        result = checker.cached_get_json("http://registry/tags", "owner/image", ttl=0)
+
+        self.assertEqual(result, data)
+        self.assertEqual(
+            self.mock_get.call_args.kwargs["headers"], {"If-None-Match": '"abc"'}
+        )
+
+    def test_stale_entry_used_when_registry_unreachable(self):
+        """Stale data is returned when the revalidation request fails."""
+        data = {"results": []}
+        self.mock_get.return_value = _response(data=data)
+        checker.cached_get_json("http://registry/tags", "owner/image", ttl=0)
+
+        self.mock_get.side_effect = checker.requests.ConnectionError("offline")
+        result = checker.cached_get_json("http://registry/tags", "owner/image", ttl=0)
+
+        self.assertEqual(result, data)
+
+    def test_prune_cache_evicts_least_recently_used(self):
+        """Entries are evicted oldest-first until the cache fits its size limit."""
+        checker.write_cache_entry("old", {"fetched_at": 0, "data": "x" * 100})
+        checker.write_cache_entry("new", {"fetched_at": 0, "data": "y" * 100})
+        old_path = checker._get_cache_entry_path("old")
+        os.utime(old_path, (time.time() - 100, time.time() - 100))
+
+        checker.prune_cache(max_bytes=150)
+
+        self.assertIsNone(checker.read_cache_entry("old"))
+        self.assertIsNotNone(checker.read_cache_entry("new"))
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Verify the client-side Docker Hub API budget."""
+
+    def test_bucket_refuses_when_budget_exhausted(self):
+        bucket = checker.TokenBucket(capacity=2, refill_per_minute=1, max_wait=0)
+        self.assertTrue(bucket.acquire())
+        self.assertTrue(bucket.acquire())
+        self.assertFalse(bucket.acquire())
+        self.assertEqual(bucket.remaining()["local"], 0)
+
+    def test_bucket_pauses_after_429(self):
+        bucket = checker.TokenBucket(capacity=5, refill_per_minute=60, max_wait=0)
+        bucket.update_from_response(
+            _response(
+                status_code=429,
+                headers={"Retry-After": "120", "X-RateLimit-Remaining": "0"},
+            )
+        )
+        self.assertFalse(bucket.acquire())
+        self.assertEqual(bucket.remaining(), {"local": 0, "registry": 0})
+
+    @patch("utils.checker.get_registry_session")
+    def test_429_reaches_the_bucket(self, mock_session):
+        """A 429 pauses the bucket and the tag is reported as unknown."""
+        response = _response(status_code=429, headers={"Retry-After": "3600"})
+        response.raise_for_status.side_effect = checker.requests.HTTPError(
+            response=response
+        )
+        mock_session.return_value.get.return_value = response
+        bucket = checker.TokenBucket(capacity=5, refill_per_minute=60, max_wait=0)
+
+        with (
+            tempfile.TemporaryDirectory() as cache_dir,
+            patch.object(checker, "REGISTRY_CACHE_DIR", cache_dir),
+            patch.object(checker, "dockerhub_rate_limiter", bucket),
+        ):
+            self.assertIsNone(checker.fetch_docker_tag("owner/image", "latest"))
+            self.assertIsNone(checker.fetch_docker_tag("owner/image", "arm"))
+
+        self.assertEqual(mock_session.return_value.get.call_count, 1)
+        self.assertEqual(bucket.remaining()["local"], 0)
+
+    @patch("utils.checker.cached_get_json")
+    def test_rate_limited_lookup_keeps_configured_tag(self, mock_get_json):
+        """A 429 makes compatibility unknown instead of disabling the app."""
+        response = MagicMock(status_code=429)
+        mock_get_json.side_effect = checker.requests.HTTPError(response=response)
+        context = checker.ImageResolutionContext()
+
+        resolution = context.resolve(
+            "owner/image", "latest", "linux/arm64", "linux/amd64"
+        )
+
+        self.assertEqual(resolution["image"], "owner/image:latest")
+        self.assertEqual(resolution["platform"], "linux/arm64")
+        self.assertIn("owner/image:latest", context.unverified)
+        self.assertIsNone(
+            checker.check_img_arch_support("owner/image", "latest", "linux/arm64")
+        )
+
+    @patch("utils.checker.fetch_docker_tag", side_effect=_fetch_tag)
+    @patch("utils.checker.iter_docker_tags")
+    def test_failed_tag_search_is_not_incompatible(self, mock_iter, mock_fetch):
+        mock_iter.side_effect = checker.RegistryRateLimitError("budget exhausted")
+        context = checker.ImageResolutionContext()
+
+        resolution = context.resolve(
+            "owner/image", "latest", "linux/arm64", "linux/amd64"
+        )
+
+        self.assertIsNotNone(resolution)
+        self.assertEqual(resolution["image"], "owner/image:latest")
+
+
+class TestDockerHubTagLookup(unittest.TestCase):
+    """Verify targeted and paginated Docker Hub tag lookups."""
+
+    @patch("utils.checker.cached_get_json")
+    def test_check_uses_single_tag_endpoint(self, mock_get_json):
+        mock_get_json.return_value = _TAGS[1]
+        self.assertTrue(
+            checker.check_img_arch_support("owner/image", "arm", "linux/arm64")
+        )
+        self.assertTrue(mock_get_json.call_args.args[0].endswith("/tags/arm"))
+
+    @patch("utils.checker.cached_get_json")
+    def test_official_images_use_library_namespace(self, mock_get_json):
+        mock_get_json.return_value = _TAGS[0]
+        checker.fetch_docker_tag("nginx", "latest")
+        self.assertIn(
+            "repositories/library/nginx/tags/latest", mock_get_json.call_args.args[0]
+        )
+
+    @patch("utils.checker.cached_get_json")
+    def test_missing_tag_is_not_supported(self, mock_get_json):
+        response = MagicMock(status_code=404)
+        mock_get_json.side_effect = checker.requests.HTTPError(response=response)
+        self.assertFalse(
+            checker.check_img_arch_support("owner/image", "gone", "linux/amd64")
+        )
+
+    @patch("utils.checker.cached_get_json")
+    def test_compatible_tag_search_stops_at_first_match(self, mock_get_json):
+        """Later pages are not fetched once a compatible tag is found."""
+        pages = [
+            {"results": [_TAGS[0]], "next": "http://registry/page2"},
+            {"results": [_TAGS[1]], "next": "http://registry/page3"},
+            {"results": [], "next": None},
+        ]
+        mock_get_json.side_effect = pages
+
+        self.assertEqual(
+            checker.get_compatible_tag("owner/image", "linux/arm64"), "arm"
+        )
+        self.assertEqual(mock_get_json.call_count, 2)
+
+
+def _docker_result(data=None, returncode=0, stdout=None):
+    if stdout is None:
+        stdout = json.dumps(data)
+    return subprocess.CompletedProcess([], returncode, stdout=stdout, stderr="")
+
+
+class TestLocalResolution(unittest.TestCase):
+    """Verify architectures are resolved from the local docker daemon first."""
+
+    @patch("utils.checker.fetch_docker_tag")
+    @patch("utils.checker.subprocess.run")
+    def test_pulled_image_resolves_without_registry(self, mock_run, mock_fetch):
+        mock_run.return_value = _docker_result([{"Architecture": "arm64"}])
+
+        self.assertTrue(
+            checker.check_img_arch_support("owner/image", "latest", "linux/arm64")
+        )
+        mock_fetch.assert_not_called()
+
+    @patch("utils.checker.fetch_docker_tag", side_effect=_fetch_tag)
+    @patch("utils.checker.subprocess.run")
+    def test_other_local_platform_falls_back_to_registry(self, mock_run, mock_fetch):
+        """A pulled image of another platform does not prove the tag unsupported."""
+        mock_run.return_value = _docker_result([{"Architecture": "arm64"}])
+
+        self.assertTrue(
+            checker.check_img_arch_support("owner/image", "latest", "linux/amd64")
+        )
+        mock_fetch.assert_called_once_with("owner/image", "latest")
+
+    @patch("utils.checker.subprocess.run")
+    def test_manifest_list_answers_both_ways(self, mock_run):
+        mock_run.return_value = _docker_result(
+            {
+                "manifests": [
+                    {"digest": "sha256:a", "platform": {"architecture": "amd64"}}
+                ]
+            }
+        )
+        with patch.object(checker, "REGISTRY_RESOLUTION_ORDER", ["manifest"]):
+            self.assertFalse(
+                checker.check_local_img_arch_support(
+                    "owner/image", "latest", "linux/arm64"
+                )
+            )
+
+    @patch("utils.checker.iter_docker_tags")
+    @patch("utils.checker.subprocess.run")
+    def test_compatible_tag_found_locally(self, mock_run, mock_iter):
+        def run(command, **kwargs):
+            if command[:3] == ["docker", "image", "ls"]:
+                return _docker_result(stdout="latest\narm\n")
+            arch = "arm64" if command[-1].endswith(":arm") else "amd64"
+            return _docker_result([{"Architecture": arch}])
+
+        mock_run.side_effect = run
+
+        self.assertEqual(
+            checker.get_compatible_tag("owner/image", "linux/arm64"), "arm"
+        )
+        mock_iter.assert_not_called()
+
+    @patch("utils.checker.cached_get_json")
+    @patch("utils.checker.subprocess.run", side_effect=FileNotFoundError("docker"))
+    def test_offline_order_never_queries_registry(self, mock_run, mock_get_json):
+        context = checker.ImageResolutionContext()
+        with patch.object(checker, "REGISTRY_RESOLUTION_ORDER", ["local"]):
+            resolution = context.resolve(
+                "owner/image", "latest", "linux/arm64", "linux/amd64"
+            )
+
+        self.assertEqual(resolution["image"], "owner/image:latest")
+        mock_get_json.assert_not_called()
+
+
+class TestImageIndex(unittest.TestCase):
+    """Verify the bundled offline image index."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.index_path = os.path.join(self.tmp_dir.name, "image-index.json")
+        self.app_config_path = os.path.join(self.tmp_dir.name, "app-config.json")
+        with open(self.app_config_path, "w") as f:
+            json.dump(
+                {
+                    "app_config_version": 1.1,
+                    "apps": [{"compose_config": {"image": "owner/image:latest"}}],
+                },
+                f,
+            )
+        for name, value in [
+            ("IMAGE_INDEX_PATH", self.index_path),
+            ("APP_CONFIG_PATH", self.app_config_path),
+            ("_image_index", {}),
+        ]:
+            patcher = patch.object(checker, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        run_patcher = patch(
+            "utils.checker.subprocess.run", side_effect=FileNotFoundError("docker")
+        )
+        run_patcher.start()
+        self.addCleanup(run_patcher.stop)
+
+    def _write_index(self, app_config_version=1.1):
+        with open(self.index_path, "w") as f:
+            json.dump(
+                {
+                    "app_config_version": app_config_version,
+                    "images": {
+                        "owner/image": {
+                            "tags": {
+                                "latest": {"platforms": {"linux/amd64": "sha256:a"}}
+                            },
+                            "compatible_tags": {"linux/arm64": None},
+                        }
+                    },
+                },
+                f,
+            )
+
+    @patch("utils.checker.fetch_docker_tag")
+    def test_fresh_index_resolves_without_registry(self, mock_fetch):
+        self._write_index()
+        self.assertTrue(
+            checker.check_img_arch_support("owner/image", "latest", "linux/amd64")
+        )
+        self.assertFalse(
+            checker.check_img_arch_support("owner/image", "latest", "linux/arm64")
+        )
+        mock_fetch.assert_not_called()
+
+    @patch("utils.checker.fetch_docker_tag", side_effect=_fetch_tag)
+    def test_stale_index_is_ignored(self, mock_fetch):
+        self._write_index(app_config_version=1.0)
+        checker.check_img_arch_support("owner/image", "latest", "linux/amd64")
+        mock_fetch.assert_called_once_with("owner/image", "latest")
+
+    @patch("utils.checker.ensure_service")
+    @patch("utils.checker.iter_docker_tags")
+    def test_indexed_missing_compatible_tag_skips_registry(
+        self, mock_iter, mock_ensure_service
+    ):
+        self._write_index()
+        self.assertIsNone(checker.get_compatible_tag("owner/image", "linux/arm64"))
+        mock_iter.assert_not_called()
+
+    @patch("utils.checker.search_registry_compatible_tag", return_value="arm")
+    @patch("utils.checker.fetch_docker_tag")
+    def test_refresh_writes_platforms_and_compatible_tags(
+        self, mock_fetch, mock_search
+    ):
+        mock_fetch.return_value = {
+            "digest": "sha256:list",
+            "images": [{"architecture": "amd64", "os": "linux", "digest": "sha256:a"}],
+        }
+        with patch.object(
+            checker, "IMAGE_INDEX_PLATFORMS", ["linux/amd64", "linux/arm64"]
+        ):
+            checker.refresh_image_index(self.app_config_path, self.index_path)
+
+        with open(self.index_path) as f:
+            index = json.load(f)
+        self.assertEqual(index["app_config_version"], 1.1)
+        self.assertEqual(
+            index["images"]["owner/image"],
+            {
+                "tags": {
+                    "latest": {
+                        "digest": "sha256:list",
+                        "platforms": {"linux/amd64": "sha256:a"},
+                    }
+                },
+                "compatible_tags": {"linux/arm64": "arm"},
+            },
+        )
+
+    @patch("utils.checker.ensure_service")
+    @patch("utils.checker.search_registry_compatible_tag", return_value="arm")
+    @patch("utils.checker.fetch_docker_tag", side_effect=_fetch_tag)
+    def test_setup_lookups_seed_the_index(self, mock_fetch, mock_search, _):
+        """Live lookups of a run are saved, so the next run resolves offline."""
+        context = checker.ImageResolutionContext()
+        context.resolve("owner/image", "latest", "linux/arm64", "linux/amd64")
+        context.save_image_index()
+
+        mock_fetch.reset_mock()
+        mock_search.reset_mock()
+        resolution = checker.ImageResolutionContext().resolve(
+            "owner/image", "latest", "linux/arm64", "linux/amd64"
+        )
+
+        self.assertEqual(resolution["image"], "owner/image:arm")
+        mock_fetch.assert_not_called()
+        mock_search.assert_not_called()
+
+
+    def test_check_index(self):
+        self.assertEqual(
+            checker.check_image_index(self.app_config_path, self.index_path),
+            [f"No image index at {self.index_path}"],
+        )
+        self._write_index()
+        self.assertEqual(
+            checker.check_image_index(self.app_config_path, self.index_path), []
+        )
+        self._write_index(app_config_version=1.0)
+        self.assertEqual(
+            len(checker.check_image_index(self.app_config_path, self.index_path)), 1
+        )
+
+
+class TestShippedImageIndex(unittest.TestCase):
+    """Verify the image index shipped next to app-config.json."""
+
+    def test_shipped_index_is_fresh(self):
+        if not os.path.exists(checker.IMAGE_INDEX_PATH):
+            self.skipTest("No image index, it is generated by the release workflow")
+        self.assertEqual(checker.check_image_index(), [])
+
+
+class TestImageResolutionContext(unittest.TestCase):
+    """Verify image resolutions are decided once per run."""
+
+    @patch("utils.checker.fetch_docker_tag", side_effect=_fetch_tag)
+    def test_supported_platform_keeps_tag(self, mock_fetch):
+        context = checker.ImageResolutionContext()
+        resolution = context.resolve(
+            "owner/image", "latest", "linux/amd64", "linux/amd64"
+        )
+        self.assertEqual(
+            resolution,
+            {
+                "image": "owner/image:latest",
+                "platform": "linux/amd64",
+                "emulation": False,
+            },
+        )
+
+    @patch("utils.checker.iter_docker_tags", side_effect=lambda image: iter(_TAGS))
+    @patch("utils.checker.fetch_docker_tag", side_effect=_fetch_tag)
+    def test_unsupported_platform_uses_compatible_tag(self, mock_fetch, mock_iter):
+        context = checker.ImageResolutionContext()
+        resolution = context.resolve(
+            "owner/image", "latest", "linux/arm64", "linux/amd64"
+        )
+        self.assertEqual(resolution["image"], "owner/image:arm")
+        self.assertEqual(resolution["platform"], "linux/arm64")
+        self.assertFalse(resolution["emulation"])
+
+    @patch("utils.checker.iter_docker_tags", side_effect=lambda image: iter(_TAGS))
+    @patch("utils.checker.fetch_docker_tag", side_effect=_fetch_tag)
+    def test_repeated_resolutions_fetch_tags_once(self, mock_fetch, mock_iter):
+        context = checker.ImageResolutionContext()
+        for _ in range(5):
+            context.resolve("owner/image", "latest", "linux/amd64", "linux/amd64")
+            context.resolve("owner/image", "latest", "linux/arm64", "linux/amd64")
+        mock_fetch.assert_called_once_with("owner/image", "latest")
+        mock_iter.assert_called_once_with("owner/image")
+
+    def test_resolve_many_runs_lookups_concurrently(self):
+        """Distinct images are looked up in parallel, each exactly once."""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_fetch(image, tag):
+            with lock:
+                active.append(image)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(image)
+            return _fetch_tag(image, tag)
+
+        context = checker.ImageResolutionContext(max_workers=4)
+        image_requests = [
+            (f"owner/image{i}", "latest", "linux/amd64", "linux/amd64")
+            for i in range(4)
+        ]
+        with patch("utils.checker.fetch_docker_tag", side_effect=slow_fetch) as fetch:
+            context.resolve_many(image_requests + image_requests)
+
+        self.assertEqual(fetch.call_count, 4)
+        self.assertGreater(max(peak), 1)
+
+
+class TestGhcrLookup(unittest.TestCase):
+    """Verify GHCR manifest checks with anonymous pull tokens."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        for name, value in [
+            ("REGISTRY_CACHE_DIR", self.tmp_dir.name),
+            ("_ghcr_tokens", {}),
+        ]:
+            patcher = patch.object(checker, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        session_patcher = patch("utils.checker.get_registry_session")
+        self.mock_get = session_patcher.start().return_value.get
+        self.addCleanup(session_patcher.stop)
+        run_patcher = patch(
+            "utils.checker.subprocess.run", side_effect=FileNotFoundError("docker")
+        )
+        run_patcher.start()
+        self.addCleanup(run_patcher.stop)
+
+    def _registry(self, url, headers=None, params=None):
+        if url == checker.GHCR_AUTH_URL:
+            return _response(data={"token": "anon"})
+        if url.endswith("/manifests/latest"):
+            return _response(
+                data={
+                    "manifests": [
+                        {"digest": "sha256:a", "platform": {"architecture": "amd64"}},
+                        {"digest": "sha256:b", "platform": {"architecture": "arm64"}},
+                    ]
+                },
+                headers={"Docker-Content-Digest": "sha256:index"},
+            )
+        if url.endswith("/manifests/single"):
+            return _response(data={"config": {"digest": "sha256:cfg"}})
+        if url.endswith("/blobs/sha256:cfg"):
+            return _response(data={"architecture": "arm", "os": "linux"})
+        return _response(status_code=404)
+
+    @patch("utils.checker.time.sleep")
+    def test_manifest_list_decides_platform_support(self, mock_sleep):
+        self.mock_get.side_effect = self._registry
+
+        self.assertTrue(
+            checker.check_img_arch_support(
+                "ghcr.io/owner/image", "latest", "linux/arm64"
+            )
+        )
+        mock_sleep.assert_not_called()
+        manifest_call = self.mock_get.call_args_list[-1]
+        self.assertEqual(
+            manifest_call.kwargs["headers"]["Authorization"], "Bearer anon"
+        )
+        self.assertIn(
+            "application/vnd.oci.image.index.v1+json",
+            manifest_call.kwargs["headers"]["Accept"],
+        )
+
+    def test_single_manifest_reads_config_platform(self):
+        self.mock_get.side_effect = self._registry
+        tag_info = checker.fetch_ghcr_tag("ghcr.io/owner/image", "single")
+        self.assertEqual(tag_info["images"][0]["architecture"], "arm")
+
+    def test_results_and_token_are_cached(self):
+        self.mock_get.side_effect = self._registry
+        for _ in range(3):
+            checker.fetch_ghcr_tag("ghcr.io/owner/image", "latest")
+        # One token request and one manifest request
+        self.assertEqual(self.mock_get.call_count, 2)
+
+    def test_native_platform_used_without_emulation(self):
+        self.mock_get.side_effect = self._registry
+        context = checker.ImageResolutionContext()
+        resolution = context.resolve(
+            "ghcr.io/owner/image", "latest", "linux/arm64", "linux/amd64"
+        )
+        self.assertEqual(resolution["platform"], "linux/arm64")
+        self.assertFalse(resolution["emulation"])
+
+    def test_manifest_digest_pins_the_image(self):
+        self.mock_get.side_effect = self._registry
+        lock_path = os.path.join(self.tmp_dir.name, "image-lock.json")
+        context = checker.ImageResolutionContext(lock_path=lock_path)
+
+        resolution = context.resolve(
+            "ghcr.io/owner/image", "latest", "linux/arm64", "linux/amd64"
+        )
+        context.save_image_lock()
+
+        self.assertEqual(
+            checker.get_image_reference(resolution),
+            "ghcr.io/owner/image@sha256:index",
+        )
+        self.assertEqual(
+            checker.load_image_lock(lock_path)[
+                "ghcr.io/owner/image:latest|linux/arm64"
+            ]["digest"],
+            "sha256:index",
+        )
+
+
+class TestDigestPinning(unittest.TestCase):
+    """Verify digest pinning and the image lockfile."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.lock_path = os.path.join(self.tmp_dir.name, "image-lock.json")
+        run_patcher = patch(
+            "utils.checker.subprocess.run", side_effect=FileNotFoundError("docker")
+        )
+        run_patcher.start()
+        self.addCleanup(run_patcher.stop)
+
+    @patch("utils.checker.fetch_docker_tag")
+    def test_resolution_is_pinned_and_locked(self, mock_fetch):
+        mock_fetch.return_value = {**_TAGS[0], "digest": "sha256:one"}
+        context = checker.ImageResolutionContext(lock_path=self.lock_path)
+
+        resolution = context.resolve(
+            "owner/image", "latest", "linux/amd64", "linux/amd64"
+        )
+        context.save_image_lock()
+
+        self.assertEqual(
+            checker.get_image_reference(resolution), "owner/image@sha256:one"
+        )
+        self.assertEqual(
+            checker.load_image_lock(self.lock_path)["owner/image:latest|linux/amd64"][
+                "digest"
+            ],
+            "sha256:one",
+        )
+
+    @patch("utils.checker.fetch_docker_tag")
+    def test_locked_resolution_skips_lookups(self, mock_fetch):
+        checker.write_image_lock(
+            self.lock_path,
+            {
+                "owner/image:latest|linux/amd64": {
+                    "image": "owner/image:latest",
+                    "platform": "linux/amd64",
+                    "emulation": False,
+                    "digest": "sha256:one",
+                }
+            },
+        )
+        context = checker.ImageResolutionContext(lock_path=self.lock_path)
+
+        resolution = context.resolve(
+            "owner/image", "latest", "linux/amd64", "linux/amd64"
+        )
+
+        self.assertEqual(resolution["digest"], "sha256:one")
+        mock_fetch.assert_not_called()
+
+    def test_unpinned_reference_keeps_tag(self):
+        self.assertEqual(
+            checker.get_image_reference({"image": "owner/image:latest"}),
+            "owner/image:latest",
+        )
+
+    @patch("utils.checker.fetch_docker_tag")
+    def test_relock_rewrites_changed_digests(self, mock_fetch):
+        checker.write_image_lock(
+            self.lock_path,
+            {
+                "owner/image:latest|linux/amd64": {
+                    "image": "owner/image:latest",
+                    "platform": "linux/amd64",
+                    "emulation": False,
+                    "digest": "sha256:one",
+                }
+            },
+        )
+        mock_fetch.return_value = {**_TAGS[0], "digest": "sha256:two"}
+
+        changes = checker.relock_images(self.lock_path)
+
+        self.assertEqual(
+            changes, {"owner/image:latest|linux/amd64": ("sha256:one", "sha256:two")}
+        )
+        mock_fetch.assert_called_once_with("owner/image", "latest", ttl=0)
+        self.assertEqual(
+            checker.load_image_lock(self.lock_path)["owner/image:latest|linux/amd64"][
+                "digest"
+            ],
+            "sha256:two",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
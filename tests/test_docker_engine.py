@@ -0,0 +1,253 @@
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from docker.errors import DockerException
+
+from utils.docker_engine import (
+    find_docker_host,
+    get_engine_client,
+    inspect_container,
+    list_containers,
+    reset_engine_client,
+    stream_events,
+    wait_for_containers,
+)
+
+
+class TestFindDockerHost(unittest.TestCase):
+    @patch("utils.docker_engine.platform.system", return_value="Linux")
+    def test_docker_host_wins(self, _mock_system):
+        with patch.dict(os.environ, {"DOCKER_HOST": "tcp://10.0.0.2:2375"}):
+            self.assertEqual(find_docker_host(), "tcp://10.0.0.2:2375")
+
+    @patch("utils.docker_engine.platform.system", return_value="Linux")
+    def test_rootless_socket_is_found(self, _mock_system):
+        with tempfile.TemporaryDirectory() as runtime_dir:
+            socket_path = os.path.join(runtime_dir, "docker.sock")
+            open(socket_path, "w").close()
+            with patch.dict(
+                os.environ, {"DOCKER_HOST": "", "XDG_RUNTIME_DIR": runtime_dir}
+            ):
+                self.assertEqual(find_docker_host(), f"unix://{socket_path}")
+
+
+class TestEngineClient(unittest.TestCase):
+    def setUp(self):
+        reset_engine_client()
+        self.addCleanup(reset_engine_client)
+
+    @patch("utils.docker_engine.find_docker_host", return_value="unix:///docker.sock")
+    @patch("utils.docker_engine.docker.DockerClient")
+    def test_client_is_shared(self, mock_client_class, _mock_host):
+        client = mock_client_class.return_value
+        client.api.containers.return_value = [{"Id": "abc"}]
+
+        self.assertEqual(list_containers(filters={"label": ["x"]}), [{"Id": "abc"}])
+        self.assertEqual(list_containers(), [{"Id": "abc"}])
+
+        mock_client_class.assert_called_once()
+        client.ping.assert_called_once()
+        client.api.containers.assert_called_with(all=False, filters=None)
+
+    @patch("utils.docker_engine.platform.system", return_value="Linux")
+    @patch("utils.docker_engine.is_user_root", return_value=False)
+    @patch("utils.docker_engine.find_docker_host", return_value=None)
+    @patch("utils.docker_engine.subprocess.run")
+    def test_cli_fallback_uses_sudo(self, mock_run, _mock_host, _root, _system):
+        mock_run.return_value = subprocess.CompletedProcess([], 0, stdout="", stderr="")
+
+        self.assertEqual(list_containers(), [])
+        self.assertEqual(mock_run.call_args.args[0][:3], ["sudo", "docker", "ps"])
+
+    @patch("utils.docker_engine.find_docker_host", return_value=None)
+    @patch("utils.docker_engine.subprocess.run")
+    def test_cli_fallback_uses_engine_format(self, mock_run, _mock_host):
+        mock_run.return_value = subprocess.CompletedProcess(
+            [],
+            0,
+            stdout=json.dumps(
+                {
+                    "ID": "abc",
+                    "Names": "dev_app",
+                    "Labels": "com.docker.compose.project=money4band,a=b",
+                    "Ports": "0.0.0.0:8081->80/tcp, [::]:8081->80/tcp, 4449/tcp",
+                    "State": "running",
+                }
+            )
+            + "\n",
+            stderr="",
+        )
+
+        containers = list_containers(filters={"label": ["com.docker.compose.project"]})
+
+        self.assertIsNone(get_engine_client())
+        self.assertIn("label=com.docker.compose.project", mock_run.call_args.args[0])
+        self.assertEqual(containers[0]["Names"], ["/dev_app"])
+        self.assertEqual(
+            containers[0]["Labels"]["com.docker.compose.project"], "money4band"
+        )
+        self.assertEqual(
+            containers[0]["Ports"],
+            [
+                {"PrivatePort": 80, "Type": "tcp", "IP": "0.0.0.0", "PublicPort": 8081},
+                {"PrivatePort": 80, "Type": "tcp", "IP": "::", "PublicPort": 8081},
+                {"PrivatePort": 4449, "Type": "tcp"},
+            ],
+        )
+
+    @patch("utils.docker_engine.find_docker_host", return_value="unix:///docker.sock")
+    @patch("utils.docker_engine.docker.DockerClient")
+    def test_engine_error_is_not_an_empty_list(self, mock_client_class, _mock_host):
+        mock_client_class.return_value.api.containers.side_effect = DockerException(
+            "daemon gone"
+        )
+        self.assertIsNone(list_containers())
+
+    @patch("utils.docker_engine.find_docker_host", return_value=None)
+    @patch("utils.docker_engine.subprocess.run")
+    def test_cli_error_is_not_an_empty_list(self, mock_run, _mock_host):
+        mock_run.return_value = subprocess.CompletedProcess(
+            [], 1, stdout="", stderr="permission denied"
+        )
+        self.assertIsNone(list_containers())
+
+    @patch("utils.docker_engine.find_docker_host", return_value="unix:///docker.sock")
+    @patch("utils.docker_engine.docker.DockerClient")
+    def test_events_are_streamed_from_the_engine(self, mock_client_class, _mock_host):
+        stream = mock_client_class.return_value.api.events.return_value
+        stream.__iter__.return_value = iter([{"Action": "start"}])
+
+        events = list(stream_events({"type": ["container"]}, since=1.0, until=2.0))
+
+        self.assertEqual(events, [{"Action": "start"}])
+        mock_client_class.return_value.api.events.assert_called_once_with(
+            since=1.0, until=2.0, filters={"type": ["container"]}, decode=True
+        )
+        stream.close.assert_called_once()
+
+    @patch("utils.docker_engine.is_user_root", return_value=True)
+    @patch("utils.docker_engine.find_docker_host", return_value=None)
+    @patch("utils.docker_engine.subprocess.run")
+    def test_cli_inspect_fallback(self, mock_run, _mock_host, _root):
+        mock_run.return_value = subprocess.CompletedProcess(
+            [], 0, stdout=json.dumps([{"Id": "abc"}]), stderr=""
+        )
+
+        self.assertEqual(inspect_container("dev_app"), {"Id": "abc"})
+        self.assertEqual(
+            mock_run.call_args.args[0], ["docker", "container", "inspect", "dev_app"]
+        )
+
+
+def _container(name, state, status="Up 1 second"):
+    return {"Names": [f"/{name}"], "State": state, "Status": status}
+
+
+def _event(name, action):
+    return {"Action": action, "Actor": {"ID": name, "Attributes": {"name": name}}}
+
+
+def _events(*events):
+    yield from events
+
+
+@patch("utils.docker_engine.time.sleep")
+@patch("utils.docker_engine.inspect_container")
+@patch("utils.docker_engine.stream_events")
+@patch("utils.docker_engine.list_containers")
+class TestWaitForContainers(unittest.TestCase):
+    def test_follows_events_until_all_are_ready(
+        self, mock_list, mock_events, mock_inspect, _mock_sleep
+    ):
+        mock_list.return_value = [
+            _container("app", "created"),
+            _container("proxy", "running"),
+        ]
+        mock_inspect.return_value = {
+            "State": {"Status": "running", "Health": {"Status": "starting"}}
+        }
+        mock_events.return_value = _events(
+            _event("app", "start"), _event("app", "health_status: healthy")
+        )
+
+        readiness = wait_for_containers({"label": ["project"]}, timeout=60)
+
+        self.assertEqual(readiness, {"app": "ready", "proxy": "ready"})
+        # The containers are listed once, the events tell the rest
+        mock_list.assert_called_once()
+        mock_inspect.assert_called_once_with("app")
+        event_filters = mock_events.call_args.args[0]
+        self.assertEqual(event_filters["label"], ["project"])
+        self.assertIn("health_status", event_filters["event"])
+
+    def test_returns_early_on_failure(
+        self, mock_list, mock_events, _mock_inspect, _mock_sleep
+    ):
+        mock_list.return_value = [
+            _container("app", "running", "Up 1 second (health: starting)"),
+            _container("proxy", "created"),
+        ]
+        mock_events.return_value = _events(_event("app", "die"))
+
+        readiness = wait_for_containers({"label": ["project"]}, timeout=60)
+
+        self.assertEqual(readiness["app"], "failed")
+
+    def test_ready_without_events(
+        self, mock_list, mock_events, _mock_inspect, _mock_sleep
+    ):
+        mock_list.return_value = [_container("app", "running")]
+
+        self.assertEqual(
+            wait_for_containers({"label": ["project"]}, timeout=60), {"app": "ready"}
+        )
+        mock_events.assert_not_called()
+
+    def test_timeout(self, mock_list, mock_events, _mock_inspect, _mock_sleep):
+        mock_list.return_value = [_container("app", "restarting")]
+
+        readiness = wait_for_containers({"label": ["project"]}, timeout=0)
+
+        self.assertEqual(readiness, {"app": "starting"})
+        mock_events.assert_not_called()
+
+    def test_no_containers_ends_after_grace(
+        self, mock_list, mock_events, _mock_inspect, _mock_sleep
+    ):
+        mock_list.return_value = []
+
+        readiness = wait_for_containers(
+            {"label": ["project"]}, timeout=120, empty_grace=0
+        )
+
+        self.assertEqual(readiness, {})
+        mock_events.assert_not_called()
+
+    def test_broken_stream_lists_again(
+        self, mock_list, mock_events, _mock_inspect, mock_sleep
+    ):
+        mock_list.side_effect = [
+            [_container("app", "created")],
+            [_container("app", "running")],
+        ]
+        mock_events.return_value = _events()
+
+        readiness = wait_for_containers({"label": ["project"]}, timeout=60)
+
+        self.assertEqual(readiness, {"app": "ready"})
+        self.assertEqual(mock_list.call_count, 2)
+        mock_sleep.assert_called_once()
+
+    def test_listing_error(self, mock_list, mock_events, _mock_inspect, mock_sleep):
+        mock_list.return_value = None
+
+        self.assertIsNone(wait_for_containers({"label": ["project"]}, timeout=60))
+        mock_events.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
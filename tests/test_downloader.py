@@ -7,11 +7,12 @@ from utils.downloader import download_file
 
 
 class TestDownloadFile(unittest.TestCase):
-    @patch("utils.downloader.requests.get")
-    def test_download_file_success(self, mock_get):
+    @patch("utils.downloader.get_http_session")
+    def test_download_file_success(self, mock_session):
         """
         Test successful download of a file.
         """
+        mock_get = mock_session.return_value.get
         # Mock the response
         mock_response = MagicMock()
         mock_response.iter_content = lambda chunk_size: [b"test data"]
@@ -25,11 +26,12 @@ class TestDownloadFile(unittest.TestCase):
             mocked_file().write.assert_called_once_with(b"test data")
 
     @patch("utils.downloader.logging.error")
-    @patch("utils.downloader.requests.get")
-    def test_download_file_failure(self, mock_get, mock_logging_error):
+    @patch("utils.downloader.get_http_session")
+    def test_download_file_failure(self, mock_session, mock_logging_error):
         """
         Test download failure due to a request exception.
         """
+        mock_get = mock_session.return_value.get
         # Mock the response to raise an exception
         mock_get.side_effect = requests.RequestException("Error")
 
@@ -0,0 +1,147 @@
+import json
+import os
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from utils.dumper import write_file_if_changed, write_json, write_json_overlay
+from utils.loader import load_json_config
+
+
+class TestWriteFileIfChanged(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.filename = os.path.join(self.tmp_dir.name, "file.txt")
+
+    def test_identical_content_is_not_rewritten(self):
+        """
+        Test that writing the same content twice leaves the file untouched.
+        """
+        self.assertTrue(write_file_if_changed("content", self.filename))
+        os.utime(self.filename, (0, 0))
+
+        self.assertFalse(write_file_if_changed("content", self.filename))
+        self.assertEqual(os.stat(self.filename).st_mtime, 0)
+
+    def test_changed_content_is_replaced_atomically(self):
+        """
+        Test that changed content replaces the file without leaving temporary files.
+        """
+        write_file_if_changed("old", self.filename)
+        self.assertTrue(write_file_if_changed("new", self.filename))
+
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "new")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["file.txt"])
+
+    def test_failed_write_keeps_original_file(self):
+        """
+        Test that a failure before the rename leaves the original content in place.
+        """
+        write_file_if_changed("original", self.filename)
+        with patch("utils.dumper.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                write_file_if_changed("partial", self.filename)
+
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), "original")
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["file.txt"])
+
+    @unittest.skipIf(os.name == "nt", "POSIX permissions only")
+    def test_existing_permissions_are_kept(self):
+        """
+        Test that rewriting a file keeps its permissions.
+        """
+        write_file_if_changed("secret", self.filename)
+        os.chmod(self.filename, 0o600)
+        write_file_if_changed("new secret", self.filename)
+        self.assertEqual(stat.S_IMODE(os.stat(self.filename).st_mode), 0o600)
+
+
+class TestWriteJson(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.filename = os.path.join(self.tmp_dir.name, "config.json")
+
+    def test_write_json_indented(self):
+        """
+        Test that JSON is written indented by default.
+        """
+        write_json({"key": "value"}, self.filename)
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), json.dumps({"key": "value"}, indent=4))
+
+    def test_write_json_compact(self):
+        """
+        Test that compact mode writes JSON without whitespace.
+        """
+        write_json({"key": [1, 2]}, self.filename, compact=True)
+        with open(self.filename) as f:
+            self.assertEqual(f.read(), '{"key":[1,2]}')
+
+    def test_write_json_skips_unchanged(self):
+        """
+        Test that unchanged data is not rewritten.
+        """
+        self.assertTrue(write_json({"key": "value"}, self.filename))
+        self.assertFalse(write_json({"key": "value"}, self.filename))
+
+
+class TestWriteJsonOverlay(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.base_path = os.path.join(self.tmp_dir.name, "config", "user-config.json")
+        os.makedirs(os.path.dirname(self.base_path))
+        self.base = {"proxies": {"url": "", "enabled": False}, "apps": {"a": {}}}
+        write_json(self.base, self.base_path)
+        self.filename = os.path.join(
+            self.tmp_dir.name, "instances", "one", "user-config.json"
+        )
+        os.makedirs(os.path.dirname(self.filename))
+
+    def test_overlay_holds_only_differences(self):
+        """
+        Test that only the differences from the base config are stored.
+        """
+        config = {
+            "proxies": {"url": "http://proxy", "enabled": True},
+            "apps": {"a": {}},
+        }
+        write_json_overlay(config, self.base_path, self.filename)
+
+        with open(self.filename) as f:
+            self.assertEqual(
+                json.load(f),
+                {
+                    "$extends": "../../config/user-config.json",
+                    "proxies": {"url": "http://proxy", "enabled": True},
+                },
+            )
+        self.assertEqual(load_json_config(self.filename), config)
+
+    def test_write_json_keeps_existing_overlay(self):
+        """
+        Test that writing a full config over an overlay file keeps it sparse.
+        """
+        write_json_overlay(self.base, self.base_path, self.filename)
+        config = load_json_config(self.filename)
+        config["apps"]["a"]["enabled"] = False
+
+        write_json(config, self.filename)
+
+        with open(self.filename) as f:
+            self.assertEqual(
+                json.load(f),
+                {
+                    "$extends": "../../config/user-config.json",
+                    "apps": {"a": {"enabled": False}},
+                },
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
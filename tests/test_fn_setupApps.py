@@ -1,8 +1,12 @@
 import os
 import tempfile
 import unittest
+from unittest.mock import MagicMock, patch
 
-from utils.fn_setupApps import cleanup_multiproxy_instances_dir
+from utils.fn_setupApps import (
+    cleanup_multiproxy_instances_dir,
+    generate_multiproxy_instances,
+)
 
 
 class TestCleanupMultiproxyInstancesDir(unittest.TestCase):
@@ -63,5 +67,79 @@ class TestCleanupMultiproxyInstancesDir(unittest.TestCase):
             self.assertTrue(os.path.isfile(moved_file))
 
 
+class TestGenerateMultiproxyInstances(unittest.TestCase):
+    def _instances(self, tmp_dir, count):
+        instances = []
+        for i in range(count):
+            instance_dir = os.path.join(tmp_dir, f"money4band_{i:04d}")
+            os.makedirs(instance_dir)
+            instances.append(
+                (
+                    instance_dir,
+                    {"apps": {"app": {"enabled": True}}},
+                    {"system": {"default_docker_platform": "linux/amd64"}},
+                    {
+                        "apps": [
+                            {
+                                "name": "APP",
+                                "compose_config": {"image": "org/app:latest"},
+                            }
+                        ]
+                    },
+                )
+            )
+        return instances
+
+    @patch("utils.fn_setupApps.show_spinner")
+    @patch("utils.fn_setupApps.generate_env_file")
+    @patch("utils.fn_setupApps.assemble_docker_compose")
+    def test_generates_every_instance_and_resolves_images_once(
+        self, mock_assemble, mock_env, _mock_spinner
+    ):
+        context = MagicMock()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            instances = self._instances(tmp_dir, 6)
+
+            failed = generate_multiproxy_instances(
+                instances, resolution_context=context, max_workers=3
+            )
+
+            self.assertEqual(failed, [])
+            for instance_dir, *_ in instances:
+                for name in ("user-config.json", "m4b-config.json", "app-config.json"):
+                    self.assertTrue(os.path.exists(os.path.join(instance_dir, name)))
+        context.resolve_many.assert_called_once_with(
+            [("org/app", "latest", "linux/amd64", "linux/amd64")]
+        )
+        self.assertEqual(mock_assemble.call_count, 6)
+        self.assertEqual(mock_env.call_count, 6)
+        for call in mock_assemble.call_args_list:
+            self.assertIs(call.kwargs["resolution_context"], context)
+            self.assertFalse(call.kwargs["show_progress"])
+
+    @patch("utils.fn_setupApps.show_spinner")
+    @patch("utils.fn_setupApps.generate_env_file")
+    @patch("utils.fn_setupApps.assemble_docker_compose")
+    def test_failed_instances_are_reported_without_stopping_the_others(
+        self, mock_assemble, mock_env, _mock_spinner
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            instances = self._instances(tmp_dir, 4)
+            failing_dir = instances[1][0]
+
+            def assemble(*args, compose_output_path, **kwargs):
+                if os.path.dirname(compose_output_path) == failing_dir:
+                    raise RuntimeError("boom")
+
+            mock_assemble.side_effect = assemble
+
+            failed = generate_multiproxy_instances(
+                instances, resolution_context=MagicMock()
+            )
+
+        self.assertEqual(failed, [failing_dir])
+        self.assertEqual(mock_env.call_count, 3)
+
+
 if __name__ == "__main__":
     unittest.main()
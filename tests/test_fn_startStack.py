@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import yaml
+
+from utils.fn_startStack import (
+    has_healthchecks,
+    start_instances,
+    start_stack,
+    wait_for_stack,
+)
+
+
+class TestStartInstances(unittest.TestCase):
+    @patch("utils.fn_startStack.start_stack")
+    def test_failures_do_not_block_other_instances(self, mock_start_stack):
+        def start(compose_file, env_file, instance_name, **kwargs):
+            if instance_name == "instance_2":
+                raise RuntimeError("docker is unhappy")
+            return instance_name != "instance_3"
+
+        mock_start_stack.side_effect = start
+        instances = [
+            (f"instance_{i}", f"instance_{i}/docker-compose.yaml", f"instance_{i}/.env")
+            for i in range(1, 5)
+        ]
+
+        results = start_instances(instances, jobs=3)
+
+        self.assertEqual(
+            results,
+            {
+                "instance_1": True,
+                "instance_2": False,
+                "instance_3": False,
+                "instance_4": True,
+            },
+        )
+        self.assertEqual(mock_start_stack.call_count, 4)
+        for call in mock_start_stack.call_args_list:
+            self.assertFalse(call.kwargs["show_progress"])
+
+    def test_no_instances(self):
+        self.assertEqual(start_instances([]), {})
+
+
+class TestStartStackWait(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.compose_file = os.path.join(tmp_dir.name, "docker-compose.yaml")
+        self.env_file = os.path.join(tmp_dir.name, ".env")
+        with open(self.env_file, "w") as f:
+            f.write("COMPOSE_PROJECT_NAME=money4band\n")
+
+    def _write_compose(self, service):
+        with open(self.compose_file, "w") as f:
+            yaml.safe_dump({"services": {"app": service}}, f)
+
+    def _start(self):
+        return start_stack(
+            self.compose_file,
+            self.env_file,
+            skip_questions=True,
+            show_progress=False,
+            wait_timeout=60,
+        )
+
+    @patch("utils.fn_startStack.wait_for_stack")
+    @patch("utils.fn_startStack.run_docker_command", return_value=0)
+    def test_compose_waits_for_healthchecks(self, mock_run, mock_wait):
+        self._write_compose({"image": "a", "healthcheck": {"test": ["CMD", "true"]}})
+
+        self.assertTrue(has_healthchecks(self.compose_file))
+        self.assertTrue(self._start())
+        self.assertEqual(
+            mock_run.call_args.args[0][-3:], ["--wait", "--wait-timeout", "60"]
+        )
+        mock_wait.assert_not_called()
+
+    @patch("utils.fn_startStack.wait_for_stack", return_value=False)
+    @patch("utils.fn_startStack.run_docker_command", return_value=0)
+    def test_containers_are_polled_without_healthchecks(self, mock_run, mock_wait):
+        self._write_compose({"image": "a"})
+
+        self.assertFalse(self._start())
+        self.assertNotIn("--wait", mock_run.call_args.args[0])
+        mock_wait.assert_called_once_with("money4band", "money4band", 60)
+
+
+@patch("utils.fn_startStack.wait_for_containers")
+class TestWaitForStack(unittest.TestCase):
+    def test_ready(self, mock_wait):
+        mock_wait.return_value = {"money4band_app": "ready"}
+        self.assertTrue(wait_for_stack("money4band", "money4band", 60))
+
+    def test_no_containers_is_not_ready(self, mock_wait):
+        mock_wait.return_value = {}
+        self.assertFalse(wait_for_stack("money4band", "money4band", 60))
+
+    def test_unknown_state_is_not_ready(self, mock_wait):
+        mock_wait.return_value = None
+        self.assertFalse(wait_for_stack("money4band", "money4band", 60))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from utils.fn_stopStack import (
+    format_stop_summary,
+    get_stop_command,
+    stop_instances,
+    stop_replaced_layout,
+)
+from utils.generator import COMPOSE_FLEET_FILENAME
+from utils.helper import COMMAND_TIMEOUT_EXIT_CODE
+
+
+class TestStopInstances(unittest.TestCase):
+    def test_stop_command_sets_project_and_grace_period(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            compose_file = os.path.join(tmp_dir, "docker-compose.yaml")
+            with open(compose_file, "w") as f:
+                f.write("services: {}\n")
+            with open(os.path.join(tmp_dir, ".env"), "w") as f:
+                f.write("COMPOSE_PROJECT_NAME=money4band_1\n")
+
+            command = get_stop_command(compose_file, grace_period=5)
+
+        self.assertEqual(command[:4], ["docker", "compose", "-p", "money4band_1"])
+        self.assertEqual(command[-3:], ["down", "--timeout", "5"])
+
+    @patch(
+        "utils.fn_stopStack.get_stop_command",
+        side_effect=lambda compose_file, grace_period: ["docker", compose_file],
+    )
+    @patch("utils.fn_stopStack.run_docker_command")
+    def test_results_and_summary(self, mock_run, _mock_command):
+        exit_codes = {"instance_1": 0, "instance_2": 1, "instance_3": None}
+
+        def run(command, use_sudo=False, timeout=None):
+            self.assertEqual(timeout, 30)
+            code = exit_codes[os.path.dirname(command[1])]
+            return COMMAND_TIMEOUT_EXIT_CODE if code is None else code
+
+        mock_run.side_effect = run
+        instances = [(name, f"{name}/docker-compose.yaml") for name in exit_codes]
+
+        results = stop_instances(instances, jobs=3, timeout=30, grace_period=2)
+
+        self.assertEqual(
+            {name: result["status"] for name, result in results.items()},
+            {
+                "instance_1": "stopped",
+                "instance_2": "failed",
+                "instance_3": "timed out",
+            },
+        )
+        summary = format_stop_summary(results)
+        self.assertIn("instance_3", summary)
+        self.assertTrue(summary.endswith("1 stopped, 1 failed, 1 timed out"))
+
+    def test_no_instances(self):
+        self.assertEqual(stop_instances([]), {})
+
+
+class TestStopReplacedLayout(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.instances_dir = self.tmp_dir.name
+        os.makedirs(os.path.join(self.instances_dir, "instance_1"))
+        with open(
+            os.path.join(self.instances_dir, "instance_1", "docker-compose.yaml"), "w"
+        ) as f:
+            f.write("services: {}\n")
+
+    def _write_fleet(self):
+        with open(os.path.join(self.instances_dir, COMPOSE_FLEET_FILENAME), "w") as f:
+            f.write("services: {}\n")
+
+    @patch("utils.fn_stopStack.stop_instances", return_value={})
+    @patch("utils.fn_stopStack.stop_stack")
+    def test_unchanged_layout_stops_nothing(self, mock_stop_stack, mock_instances):
+        stop_replaced_layout(self.instances_dir, "full")
+        self._write_fleet()
+        stop_replaced_layout(self.instances_dir, "fleet")
+
+        mock_stop_stack.assert_not_called()
+        mock_instances.assert_not_called()
+
+    @patch("utils.fn_stopStack.stop_stack")
+    def test_leaving_fleet_stops_the_fleet_project(self, mock_stop_stack):
+        self._write_fleet()
+        stop_replaced_layout(self.instances_dir, "override")
+
+        self.assertEqual(
+            mock_stop_stack.call_args.args[0],
+            os.path.join(self.instances_dir, COMPOSE_FLEET_FILENAME),
+        )
+
+    @patch("utils.fn_stopStack.stop_instances", return_value={})
+    def test_entering_fleet_stops_the_instance_projects(self, mock_instances):
+        stop_replaced_layout(self.instances_dir, "fleet")
+
+        self.assertEqual(
+            mock_instances.call_args.args[0],
+            [
+                (
+                    "instance_1",
+                    os.path.join(
+                        self.instances_dir, "instance_1", "docker-compose.yaml"
+                    ),
+                )
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
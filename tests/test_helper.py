@@ -0,0 +1,46 @@
+import subprocess
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+from utils.helper import (
+    COMMAND_TIMEOUT_EXIT_CODE,
+    run_docker_command,
+    terminate_command,
+)
+
+
+class TestRunDockerCommand(unittest.TestCase):
+    def test_exit_code_is_returned(self):
+        command = [sys.executable, "-c", "import sys; sys.exit(3)"]
+        self.assertEqual(run_docker_command(command), 3)
+
+    def test_timed_out_command_is_terminated(self):
+        """
+        Test that a timed out command gets SIGTERM, which sudo relays, and exits.
+        """
+        command = [sys.executable, "-c", "import time; time.sleep(30)"]
+        with patch(
+            "utils.helper.terminate_command", wraps=terminate_command
+        ) as mock_terminate:
+            result = run_docker_command(command, timeout=0.2)
+
+        self.assertEqual(result, COMMAND_TIMEOUT_EXIT_CODE)
+        process = mock_terminate.call_args.args[0]
+        self.assertIsNotNone(process.poll())
+
+    def test_command_ignoring_sigterm_is_killed(self):
+        process = MagicMock()
+        process.communicate.side_effect = [
+            subprocess.TimeoutExpired("docker", 10),
+            None,
+        ]
+
+        terminate_command(process)
+
+        process.terminate.assert_called_once()
+        process.kill.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
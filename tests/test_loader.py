@@ -1,4 +1,6 @@
+import json
 import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock, mock_open, patch
 
@@ -6,6 +8,8 @@ from utils.loader import (
     load_json_config,
     load_module_from_file,
     load_modules_from_directory,
+    make_config_overlay,
+    merge_config_layers,
 )
 
 
@@ -83,5 +87,87 @@ class TestModuleLoader(unittest.TestCase):
         self.assertEqual(modules, expected_modules)
 
 
+class TestConfigOverlays(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.base = {
+            "device_info": {"device_name": "main"},
+            "proxies": {"url": "", "enabled": False},
+            "apps": {"app": {"enabled": True, "ports": [50000]}},
+            "m4b_dashboard": {"enabled": True, "ports": [8081]},
+        }
+
+    def _write(self, relative_path, data):
+        path = os.path.join(self.tmp_dir.name, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        return path
+
+    def test_overlay_round_trip(self):
+        """
+        Test that merging the computed overlay onto the base gives back the config.
+        """
+        config = {
+            "device_info": {"device_name": "main_ab12"},
+            "proxies": {"url": "socks5://proxy:1080", "enabled": True},
+            "apps": {"app": {"enabled": True, "ports": [50010]}},
+            "m4b_dashboard": {"enabled": False},
+        }
+
+        overlay = make_config_overlay(self.base, config)
+
+        self.assertEqual(
+            overlay,
+            {
+                "device_info": {"device_name": "main_ab12"},
+                "proxies": {"url": "socks5://proxy:1080", "enabled": True},
+                "apps": {"app": {"ports": [50010]}},
+                "m4b_dashboard": {"enabled": False, "ports": None},
+            },
+        )
+        self.assertEqual(merge_config_layers(self.base, overlay), config)
+
+    def test_merge_does_not_modify_base(self):
+        """
+        Test that merging an overlay leaves the base config untouched.
+        """
+        merged = merge_config_layers(self.base, {"apps": {"app": {"enabled": False}}})
+        merged["apps"]["app"]["ports"].append(1)
+
+        self.assertTrue(self.base["apps"]["app"]["enabled"])
+        self.assertEqual(self.base["apps"]["app"]["ports"], [50000])
+
+    def test_load_overlay_merges_current_base(self):
+        """
+        Test that loading an overlay file merges it onto its base file.
+        """
+        self._write("config/user-config.json", self.base)
+        overlay_path = self._write(
+            "instances/one/user-config.json",
+            {
+                "$extends": "../../config/user-config.json",
+                "device_info": {"device_name": "main_ab12"},
+            },
+        )
+
+        config = load_json_config(overlay_path)
+
+        self.assertEqual(config["device_info"]["device_name"], "main_ab12")
+        self.assertEqual(config["apps"], self.base["apps"])
+        self.assertNotIn("$extends", config)
+
+    def test_load_overlay_cycle_raises(self):
+        """
+        Test that overlays extending each other are rejected.
+        """
+        path = self._write("a.json", {"$extends": "b.json"})
+        self._write("b.json", {"$extends": "a.json"})
+
+        with self.assertRaises(ValueError):
+            load_json_config(path)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,6 +5,7 @@ Test networker module functionality.
 import unittest
 from unittest.mock import patch
 
+from utils import networker
 from utils.networker import find_next_available_port, is_port_in_use
 
 
@@ -177,5 +178,46 @@ class TestNetworker(unittest.TestCase):
             self.assertEqual(assigned_ports, [50000, 50002, 50004, 50006, 50007])
 
 
+class TestHttpSession(unittest.TestCase):
+    """Test suite for the shared HTTP session."""
+
+    def test_session_is_shared(self):
+        """Test that the same pooled session is returned on every call."""
+        self.assertIs(networker.get_http_session(), networker.get_http_session())
+
+    def test_session_retries_with_backoff(self):
+        """Test that the adapter retries retryable statuses honoring Retry-After."""
+        adapter = networker.create_http_session().get_adapter("https://example.com")
+        retry = adapter.max_retries
+
+        self.assertEqual(retry.total, networker.HTTP_RETRIES)
+        self.assertEqual(retry.backoff_factor, networker.HTTP_BACKOFF_FACTOR)
+        self.assertIn(429, retry.status_forcelist)
+        self.assertTrue(retry.respect_retry_after_header)
+        self.assertEqual(adapter._pool_maxsize, networker.HTTP_POOL_MAXSIZE)
+
+    def test_registry_session_leaves_429_to_the_caller(self):
+        """Test that registry requests neither retry a 429 nor sleep for Retry-After."""
+        session = networker.get_registry_session()
+        retry = session.get_adapter("https://example.com").max_retries
+
+        self.assertIsNot(session, networker.get_http_session())
+        self.assertNotIn(429, retry.status_forcelist)
+        self.assertFalse(retry.respect_retry_after_header)
+
+    def test_default_timeout_applied(self):
+        """Test that requests without an explicit timeout get the default one."""
+        adapter = networker.TimeoutHTTPAdapter()
+        with patch("requests.adapters.HTTPAdapter.send") as mock_send:
+            adapter.send("request")
+            adapter.send("request", timeout=1)
+
+        self.assertEqual(
+            mock_send.call_args_list[0].kwargs["timeout"],
+            (networker.HTTP_CONNECT_TIMEOUT, networker.HTTP_READ_TIMEOUT),
+        )
+        self.assertEqual(mock_send.call_args_list[1].kwargs["timeout"], 1)
+
+
 if __name__ == "__main__":
     unittest.main()
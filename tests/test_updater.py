@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from utils.updater import get_latest_releases
+
+
+def _session(json_side_effect=None, releases=None):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    if json_side_effect is not None:
+        response.json.side_effect = json_side_effect
+    else:
+        response.json.return_value = releases
+    session = MagicMock()
+    session.get.return_value = response
+    return session
+
+
+class TestGetLatestReleases(unittest.TestCase):
+    @patch("utils.updater.get_http_session")
+    def test_invalid_json(self, mock_session):
+        mock_session.return_value = _session(
+            json_side_effect=requests.exceptions.JSONDecodeError("bad", "", 0)
+        )
+        with self.assertRaisesRegex(Exception, "Failed to parse JSON response"):
+            get_latest_releases()
+
+    @patch("utils.updater.get_http_session")
+    def test_other_value_errors_are_not_json_errors(self, mock_session):
+        mock_session.return_value = _session(
+            releases=[
+                {
+                    "prerelease": False,
+                    "draft": False,
+                    "name": "4.0.0",
+                    "html_url": "https://example.com",
+                    "published_at": "yesterday",
+                }
+            ]
+        )
+        with self.assertRaisesRegex(Exception, "An error occurred") as error:
+            get_latest_releases()
+        self.assertNotIn("JSON", str(error.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import os
+import tempfile
+import unittest
+
+import yaml
+
+from utils.validator import (
+    check_service_references,
+    compile_schema,
+    find_undefined_variables,
+    format_validation_report,
+    get_compose_validator,
+    validate_compose_schema,
+    validate_generated_files,
+)
+
+
+def _write_stack(directory, compose, env):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "docker-compose.yaml"), "w") as f:
+        yaml.safe_dump(compose, f)
+    with open(os.path.join(directory, ".env"), "w") as f:
+        f.write("".join(f"{key}={value}\n" for key, value in env.items()))
+
+
+def _stack(device_name="dev1", port=50001):
+    compose = {
+        "services": {
+            "app": {
+                "container_name": "${DEVICE_NAME}_app",
+                "image": "org/app:1",
+                "environment": ["TOKEN=${APP_TOKEN}", "OPTIONAL=${OPTIONAL:-x}"],
+                "ports": ["${APP_PORT}:4449"],
+                "restart": "always",
+                "cpus": "${APP_CPU_LIMIT}",
+                "network_mode": "service:proxy",
+            },
+            "proxy": {"container_name": "${DEVICE_NAME}_proxy", "image": "tun2socks"},
+        },
+        "x-m4b-version": "test",
+    }
+    env = {
+        "DEVICE_NAME": device_name,
+        "APP_TOKEN": "secret",
+        "APP_PORT": str(port),
+        "APP_CPU_LIMIT": "0.8",
+    }
+    return compose, env
+
+
+class TestCompiledSchema(unittest.TestCase):
+    def test_keywords(self):
+        validate = compile_schema(
+            {
+                "type": "object",
+                "required": ["name"],
+                "properties": {
+                    "name": {"type": "string", "pattern": "^[a-z]+$"},
+                    "mode": {"enum": ["a", "b"]},
+                    "tags": {"type": "array", "items": {"$ref": "#/definitions/tag"}},
+                },
+                "additionalProperties": False,
+                "definitions": {"tag": {"type": "string"}},
+            }
+        )
+
+        self.assertEqual(validate({"name": "ok", "tags": ["a"]}, "doc"), [])
+        problems = validate({"mode": "c", "tags": [1], "typo": True}, "doc")
+        self.assertEqual(len(problems), 4)
+        self.assertIn("doc: missing required key 'name'", problems)
+        self.assertIn("doc: unexpected key 'typo'", problems)
+
+    def test_unsupported_keywords_are_rejected(self):
+        for schema in [
+            {"oneOf": [{"type": "string"}, {"type": "integer"}]},
+            {"properties": {"port": {"type": "integer", "minimum": 1}}},
+            {
+                "items": {"$ref": "#/definitions/tag"},
+                "definitions": {"tag": {"format": "uri"}},
+            },
+        ]:
+            with self.subTest(schema=schema), self.assertRaises(ValueError):
+                compile_schema(schema)
+
+    def test_bundled_schema_compiles(self):
+        self.assertEqual(get_compose_validator()({"services": {}}, "compose"), [])
+
+    def test_booleans_are_not_numbers(self):
+        validate = compile_schema({"type": "number"})
+        self.assertEqual(len(validate(True, "doc")), 1)
+
+
+class TestComposeValidation(unittest.TestCase):
+    def test_generated_service_keys_are_accepted(self):
+        compose = {
+            "services": {
+                "app": {
+                    "image": "org/app:1",
+                    "restart": "on-failure:3",
+                    "mem_limit": "512m",
+                    "ports": ["127.0.0.1:8081:80/tcp", 9000],
+                    "logging": {"driver": "json-file", "options": {"max-size": "10m"}},
+                }
+            },
+            "networks": {
+                "default": {
+                    "driver": "bridge",
+                    "ipam": {"config": [{"subnet": "172.19.7.0/27"}]},
+                }
+            },
+        }
+        self.assertEqual(validate_compose_schema(compose), [])
+
+    def test_typos_and_bad_values_are_reported(self):
+        compose = {
+            "services": {
+                "app": {"image": "org/app:1", "restrat": "always", "restart": "often"}
+            }
+        }
+        problems = validate_compose_schema(compose)
+        self.assertEqual(len(problems), 2)
+        self.assertTrue(any("'restrat'" in problem for problem in problems))
+
+    def test_undefined_variables_ignore_defaults_and_escapes(self):
+        value = ["${SET}", "$UNSET", "${DEFAULTED:-x}", "${ALSO-x}", "$$ESCAPED"]
+        self.assertEqual(find_undefined_variables(value, {"SET": "1"}), ["UNSET"])
+
+    def test_dangling_service_references(self):
+        compose = {
+            "services": {"app": {"network_mode": "service:proxy", "depends_on": ["db"]}}
+        }
+        self.assertEqual(len(check_service_references(compose)), 2)
+
+
+class TestValidateGeneratedFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.root = self.tmp_dir.name
+        self.instances_dir = os.path.join(self.root, "instances")
+
+    def _validate(self):
+        return validate_generated_files(
+            os.path.join(self.root, "docker-compose.yaml"),
+            os.path.join(self.root, ".env"),
+            self.instances_dir,
+        )
+
+    def test_valid_stacks(self):
+        _write_stack(self.root, *_stack())
+        _write_stack(
+            os.path.join(self.instances_dir, "instance_1"), *_stack("dev2", 50002)
+        )
+
+        results = self._validate()
+
+        self.assertEqual(results, {})
+        self.assertEqual(
+            format_validation_report(results),
+            "All generated compose files are valid.",
+        )
+
+    def test_missing_variable_is_reported(self):
+        compose, env = _stack()
+        del env["APP_TOKEN"]
+        _write_stack(self.root, compose, env)
+
+        results = self._validate()
+
+        self.assertEqual(
+            results[os.path.join(self.root, "docker-compose.yaml")],
+            ["compose: variable 'APP_TOKEN' is not defined in .env"],
+        )
+
+    def test_interpolated_values_are_validated(self):
+        compose, env = _stack()
+        env["APP_CPU_LIMIT"] = "a lot"
+        _write_stack(self.root, compose, env)
+
+        problems = self._validate()[os.path.join(self.root, "docker-compose.yaml")]
+
+        self.assertEqual(len(problems), 1)
+        self.assertIn("compose.services.app.cpus", problems[0])
+
+    def test_clashes_across_instances_are_reported(self):
+        """
+        Test that container names and host ports shared by two instances are reported
+        on the second one.
+        """
+        _write_stack(os.path.join(self.instances_dir, "instance_1"), *_stack())
+        _write_stack(os.path.join(self.instances_dir, "instance_2"), *_stack())
+
+        results = self._validate()
+
+        second = os.path.join(self.instances_dir, "instance_2", "docker-compose.yaml")
+        self.assertEqual(list(results), [second])
+        self.assertEqual(len(results[second]), 3)
+        self.assertTrue(any("host port 50001/tcp" in p for p in results[second]))
+
+
+if __name__ == "__main__":
+    unittest.main()
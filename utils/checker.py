@@ -1,11 +1,23 @@
+import argparse
+import hashlib
+import json
 import logging
 import os
+import subprocess
 import sys
+import threading
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any
 
 import requests
 
+from utils import loader
+from utils.dumper import write_json
 from utils.helper import ensure_service
+from utils.networker import get_registry_session
 
 # Ensure the parent directory is in the sys.path
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -18,16 +30,1186 @@ if parent_dir not in sys.path:
 # It is used to construct API requests for fetching image tags from Docker Hub.
 DOCKERHUB_BASE_URL = "https://registry.hub.docker.com/v2/"
 
+# Number of tags requested per page when searching through all tags of an image
+DOCKERHUB_PAGE_SIZE = 100
+
 # Store the GitHub Container Registry base URL in a variable
 # This constant stores the base URL for the GitHub Container Registry (GHCR) API.
 # It is used to construct API requests for fetching image tags from GHCR.
-# Note: GHCR requires authentication (GitHub PAT) for tag compatibility checks.
+# Note: Public GHCR images only need an anonymous pull token, requested from
+# GHCR_AUTH_URL.
 GHCR_BASE_URL = "https://ghcr.io/v2/"
+GHCR_AUTH_URL = "https://ghcr.io/token"
+
+# Manifest media types accepted from OCI registries, multi-platform indexes first
+GHCR_MANIFEST_ACCEPT = ", ".join(
+    [
+        "application/vnd.oci.image.index.v1+json",
+        "application/vnd.docker.distribution.manifest.list.v2+json",
+        "application/vnd.oci.image.manifest.v1+json",
+        "application/vnd.docker.distribution.manifest.v2+json",
+    ]
+)
+
+# Global config loading and global variables
+m4b_config_path = os.path.join(parent_dir, "config", "m4b-config.json")
+try:
+    m4b_config = loader.load_json_config(m4b_config_path)
+except FileNotFoundError:
+    m4b_config = {}  # Fallback to empty config if not found
+    logging.warning("Configuration file not found. Using default values.")
+
+# Registry lookup cache settings (configurable via m4b-config.json)
+registry_config = m4b_config.get("registry", {})
+REGISTRY_CACHE_DIR = registry_config.get(
+    "cache_dir", os.path.join(".resources", ".cache", "registry")
+)  # Relative paths are resolved against the current working directory
+REGISTRY_CACHE_TTL = registry_config.get(
+    "cache_ttl", 21600
+)  # Seconds a cached lookup is used without revalidation (6 hours)
+REGISTRY_CACHE_MAX_BYTES = registry_config.get(
+    "cache_max_bytes", 5 * 1024 * 1024
+)  # Total cache size before least recently used entries are evicted
+REGISTRY_MAX_WORKERS = registry_config.get(
+    "max_workers", 8
+)  # Maximum number of concurrent registry lookups
+DOCKERHUB_RATE_LIMIT_PER_MINUTE = registry_config.get(
+    "rate_limit_per_minute", 60
+)  # Docker Hub API requests allowed per minute, shared by the whole process
+DOCKERHUB_RATE_LIMIT_BURST = registry_config.get(
+    "rate_limit_burst", 20
+)  # Docker Hub API requests allowed back to back before throttling
+DOCKERHUB_RATE_LIMIT_MAX_WAIT = registry_config.get(
+    "rate_limit_max_wait", 30
+)  # Seconds a lookup waits for budget before its result is treated as unknown
+REGISTRY_RESOLUTION_ORDER = registry_config.get(
+    "resolution_order", ["index", "local", "registry"]
+)
+# Backends used to resolve architectures: "index" (bundled image index), "local"
+# (pulled images), "manifest" (docker manifest inspect), "registry" (registry APIs)
+REGISTRY_PIN_DIGESTS = registry_config.get(
+    "pin_digests", False
+)  # Write resolved images as name@sha256:digest and record them in the image lockfile
+
+# Resolution backends answered without registry APIs, always tried before the registry
+LOCAL_RESOLUTION_BACKENDS = ("index", "local", "manifest")
+
+# Offline image index: generated from app-config.json with --refresh-index by the
+# release workflow, and seeded with the live lookups of every setup
+IMAGE_INDEX_PATH = os.path.join(parent_dir, "config", "image-index.json")
+APP_CONFIG_PATH = os.path.join(parent_dir, "config", "app-config.json")
+# Platforms recorded in the image index: every mapped architecture plus the default
+IMAGE_INDEX_PLATFORMS = sorted(
+    {
+        f"linux/{arch}"
+        for arch in m4b_config.get("system", {}).get("arch_map", {}).values()
+    }
+    | {m4b_config.get("system", {}).get("default_docker_platform", "linux/amd64")}
+)
+
+# The loaded image index, under "images" once loaded
+_image_index: dict[str, dict[str, Any]] = {}
+_image_index_lock = threading.Lock()
+
+# Lockfile recording pinned image resolutions, stored next to user-config.json
+IMAGE_LOCK_FILENAME = "image-lock.json"
+# Seconds to wait for a local docker CLI lookup
+DOCKER_INSPECT_TIMEOUT = 15
+
+# Serializes binfmt setup when several lookups need emulation at the same time
+_binfmt_lock = threading.Lock()
+
+# Anonymous GHCR pull tokens by repository, with their expiry time
+_ghcr_tokens = {}
+_ghcr_tokens_lock = threading.Lock()
+
+
+class RegistryRateLimitError(requests.RequestException):
+    """Raised when a registry request is refused because the API budget is exhausted."""
+
+
+class RegistryDisabledError(requests.RequestException):
+    """Raised when a registry lookup is needed but the registry backend is disabled."""
+
+
+def _parse_rate_limit_header(value: str | None) -> int | None:
+    """
+    Parse a rate limit header value such as '100' or '100;w=21600'.
+
+    Args:
+        value (str | None): The header value.
+
+    Returns:
+        int | None: The parsed number, or None if missing or malformed.
+    """
+    if value is None:
+        return None
+    try:
+        return int(str(value).split(";")[0].strip())
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the rate of registry API requests.
+
+    Each request takes a token. Tokens are refilled continuously up to the bucket
+    capacity, so short bursts are allowed while the long-term rate stays bounded.
+    Rate limit headers and 429 responses from the registry pause the bucket
+    until the registry budget resets.
+    """
+
+    def __init__(self, capacity: int, refill_per_minute: float, max_wait: float):
+        self.capacity = max(1, capacity)
+        self.refill_rate = max(refill_per_minute, 1) / 60
+        self.max_wait = max_wait
+        self.registry_remaining = None
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.refill_rate
+        )
+        self._updated_at = now
+
+    def acquire(self) -> bool:
+        """
+        Take a token, waiting up to max_wait seconds for one to become available.
+
+        Returns:
+            bool: True if a token was taken, False if the budget did not allow it in
+            time.
+        """
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(
+                    self._paused_until - now, (1 - self._tokens) / self.refill_rate
+                )
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def update_from_response(self, response: requests.Response) -> None:
+        """
+        Adjust the budget to the rate limit state reported by the registry.
+
+        Args:
+            response (requests.Response): A registry API response.
+        """
+        headers = response.headers
+        remaining = _parse_rate_limit_header(
+            headers.get("X-RateLimit-Remaining") or headers.get("RateLimit-Remaining")
+        )
+        with self._lock:
+            if remaining is not None:
+                self.registry_remaining = remaining
+            if (
+                response.status_code != requests.codes.too_many_requests
+                and remaining != 0
+            ):
+                return
+            delay = _parse_rate_limit_header(headers.get("Retry-After"))
+            if delay is None:
+                reset_at = _parse_rate_limit_header(headers.get("X-RateLimit-Reset"))
+                delay = reset_at - time.time() if reset_at else 60
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            logging.warning(
+                "Registry API budget exhausted. Pausing registry requests for "
+                f"{int(delay)} seconds."
+            )
+
+    def remaining(self) -> dict[str, int | None]:
+        """
+        Get the remaining request budget.
+
+        Returns:
+            dict[str, int | None]: The requests available right now ("local") and
+                the remaining budget last reported by the registry ("registry", None
+                if unknown).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            local = 0 if now < self._paused_until else int(self._tokens)
+            return {"local": local, "registry": self.registry_remaining}
+
+
+# Process-wide budget shared by every Docker Hub API request
+dockerhub_rate_limiter = TokenBucket(
+    capacity=DOCKERHUB_RATE_LIMIT_BURST,
+    refill_per_minute=DOCKERHUB_RATE_LIMIT_PER_MINUTE,
+    max_wait=DOCKERHUB_RATE_LIMIT_MAX_WAIT,
+)
+
+
+def _get_cache_dir() -> str:
+    """
+    Get the absolute path of the registry cache directory.
+
+    Returns:
+        str: The registry cache directory path.
+    """
+    if os.path.isabs(REGISTRY_CACHE_DIR):
+        return REGISTRY_CACHE_DIR
+    return os.path.join(os.getcwd(), REGISTRY_CACHE_DIR)
+
+
+def _get_cache_entry_path(cache_key: str) -> str:
+    """
+    Get the path of the cache file storing the given key.
+
+    Args:
+        cache_key (str): The cache key (e.g. the image name).
+
+    Returns:
+        str: The cache file path.
+    """
+    digest = hashlib.sha256(cache_key.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(_get_cache_dir(), f"{digest}.json")
+
+
+def read_cache_entry(cache_key: str) -> dict[str, Any] | None:
+    """
+    Read a registry cache entry from disk.
+
+    Args:
+        cache_key (str): The cache key (e.g. the image name).
+
+    Returns:
+        dict[str, Any] | None: The cache entry if present and readable, None otherwise.
+    """
+    entry_path = _get_cache_entry_path(cache_key)
+    try:
+        with open(entry_path) as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Ignoring unreadable registry cache entry {entry_path}: {e}")
+        return None
+    if entry.get("key") != cache_key:
+        return None
+    return entry
+
+
+def write_cache_entry(cache_key: str, entry: dict[str, Any]) -> None:
+    """
+    Write a registry cache entry to disk and enforce the cache size limit.
+
+    Args:
+        cache_key (str): The cache key (e.g. the image name).
+        entry (dict[str, Any]): The cache entry to store.
+    """
+    entry_path = _get_cache_entry_path(cache_key)
+    try:
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        write_json({**entry, "key": cache_key}, entry_path, compact=True)
+    except OSError as e:
+        logging.warning(f"Could not write registry cache entry {entry_path}: {e}")
+        return
+    prune_cache()
+
+
+def prune_cache(max_bytes: int | None = None) -> None:
+    """
+    Evict the least recently used registry cache entries until the cache fits its
+    size limit.
+
+    Args:
+        max_bytes (int, optional): Maximum total cache size in bytes.
+            Defaults to REGISTRY_CACHE_MAX_BYTES.
+    """
+    max_bytes = REGISTRY_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    cache_dir = _get_cache_dir()
+    try:
+        entries = []
+        for filename in os.listdir(cache_dir):
+            if filename.endswith(".json"):
+                entry_stat = os.stat(os.path.join(cache_dir, filename))
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, filename))
+    except OSError:
+        return
+
+    total_size = sum(size for _, size, _ in entries)
+    # Oldest first: entries are touched on every cache hit
+    for _, size, filename in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, filename))
+            total_size -= size
+            logging.debug(f"Evicted registry cache entry {filename}")
+        except OSError as e:
+            logging.warning(f"Could not evict registry cache entry {filename}: {e}")
+
+
+def cached_get_json(
+    url: str,
+    cache_key: str,
+    ttl: int | None = None,
+    rate_limiter: TokenBucket | None = None,
+    auth: Callable[[], dict[str, str]] | None = None,
+) -> Any | None:
+    """
+    Fetch a JSON document from a registry API using the persistent on-disk cache.
+
+    See cached_get_entry, which also returns the cached response metadata.
+
+    Args:
+        url (str): The URL to fetch.
+        cache_key (str): The cache key (e.g. the image name).
+        ttl (int, optional): Seconds an entry is considered fresh.
+            Defaults to REGISTRY_CACHE_TTL.
+        rate_limiter (TokenBucket, optional): Budget a network request must take a
+            token from.
+        auth (Callable[[], dict[str, str]], optional): Returns the extra headers of a
+            network request.
+
+    Returns:
+        Any | None: The decoded JSON document, or None if it could not be fetched.
+
+    Raises:
+        requests.RequestException: If the document cannot be fetched and is not cached.
+    """
+    return cached_get_entry(
+        url, cache_key, ttl=ttl, rate_limiter=rate_limiter, auth=auth
+    ).get("data")
+
+
+def cached_get_entry(
+    url: str,
+    cache_key: str,
+    ttl: int | None = None,
+    rate_limiter: TokenBucket | None = None,
+    auth: Callable[[], dict[str, str]] | None = None,
+) -> dict[str, Any]:
+    """
+    Fetch a registry API response using the persistent on-disk cache.
+
+    Fresh entries are returned without any request. Stale entries are revalidated
+    with ETag/Last-Modified conditional requests, so an unchanged document costs
+    a bodiless 304 round-trip. If the registry cannot be reached, stale data is
+    used when available. The manifest digest a registry reports in the
+    Docker-Content-Digest header is kept with the document.
+
+    Args:
+        url (str): The URL to fetch.
+        cache_key (str): The cache key (e.g. the image name).
+        ttl (int, optional): Seconds an entry is considered fresh.
+            Defaults to REGISTRY_CACHE_TTL.
+        rate_limiter (TokenBucket, optional): Budget a network request must take a
+            token from.
+        auth (Callable[[], dict[str, str]], optional): Returns the extra headers (e.g. a
+            bearer token) of a network request. Only called when the registry has to be
+            queried.
+
+    Returns:
+        dict[str, Any]: The cache entry, with the decoded JSON document in "data"
+            and the manifest digest, if reported, in "digest".
+
+    Raises:
+        requests.RequestException: If the document cannot be fetched and is not cached.
+    """
+    ttl = REGISTRY_CACHE_TTL if ttl is None else ttl
+    entry = read_cache_entry(cache_key)
+    now = time.time()
+
+    if entry and now - entry.get("fetched_at", 0) < ttl:
+        logging.debug(f"Registry cache hit for {cache_key}")
+        try:
+            # Mark the entry as recently used for the eviction policy
+            os.utime(_get_cache_entry_path(cache_key))
+        except OSError:
+            pass
+        return entry
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        if rate_limiter is not None and not rate_limiter.acquire():
+            raise RegistryRateLimitError(
+                f"Registry API budget exhausted, skipped request to {url}"
+            )
+        if auth is not None:
+            headers.update(auth())
+        response = get_registry_session().get(url, headers=headers)
+        if rate_limiter is not None:
+            rate_limiter.update_from_response(response)
+        if entry and response.status_code == requests.codes.not_modified:
+            logging.debug(f"Registry cache revalidated for {cache_key}")
+            entry["fetched_at"] = now
+            entry["digest"] = response.headers.get(
+                "Docker-Content-Digest", entry.get("digest")
+            )
+            write_cache_entry(cache_key, entry)
+            return entry
+        response.raise_for_status()
+        data = response.json()
+    except requests.RequestException as e:
+        if entry:
+            logging.warning(
+                f"Using stale registry cache for {cache_key} after request error: "
+                f"{str(e)}"
+            )
+            return entry
+        raise
+
+    entry = {
+        "url": url,
+        "fetched_at": now,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "digest": response.headers.get("Docker-Content-Digest"),
+        "data": data,
+    }
+    write_cache_entry(cache_key, entry)
+    return entry
+
+
+def load_image_index(force: bool = False) -> dict[str, Any]:
+    """
+    Load the bundled image index, if present and fresh.
+
+    The index is fresh when it was generated for the current app_config_version
+    of app-config.json. A missing or stale index is treated as empty, so every
+    lookup falls back to the other resolution backends.
+
+    Args:
+        force (bool, optional): Reload the index from disk. Defaults to False.
+
+    Returns:
+        dict[str, Any]: The indexed images by name, empty if no fresh index is
+        available.
+    """
+    with _image_index_lock:
+        if "images" in _image_index and not force:
+            return _image_index["images"]
+        _image_index["images"] = {}
+        try:
+            index = loader.load_json_config(IMAGE_INDEX_PATH)
+            app_config_version = loader.load_json_config(APP_CONFIG_PATH).get(
+                "app_config_version"
+            )
+        except FileNotFoundError:
+            logging.debug("No image index found, using live lookups")
+            return _image_index["images"]
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable image index: {str(e)}")
+            return _image_index["images"]
+        if index.get("app_config_version") != app_config_version:
+            logging.info(
+                "Image index was generated for app config version "
+                f"{index.get('app_config_version')}, current is {app_config_version}. "
+                "Using live lookups until it is refreshed."
+            )
+            return _image_index["images"]
+        _image_index["images"] = index.get("images", {})
+        return _image_index["images"]
+
+
+def lookup_index_tag_info(image: str, tag: str) -> dict | None:
+    """
+    Get the information of an image tag from the bundled image index.
+
+    Args:
+        image (str): The name of the Docker image.
+        tag (str): The tag of the Docker image.
+
+    Returns:
+        dict | None: The complete tag information, or None if the tag is not indexed.
+    """
+    tag_entry = load_image_index().get(image, {}).get("tags", {}).get(tag)
+    if tag_entry is None:
+        return None
+    images = []
+    for docker_platform, digest in tag_entry.get("platforms", {}).items():
+        os_name, arch, *variant = docker_platform.split("/")
+        images.append(
+            {
+                "architecture": arch,
+                "os": os_name,
+                "variant": variant[0] if variant else None,
+                "digest": digest,
+            }
+        )
+    return {
+        "name": tag,
+        "images": images,
+        "digest": tag_entry.get("digest"),
+        "complete": True,
+    }
+
+
+def lookup_index_compatible_tag(
+    image: str, docker_platform: str
+) -> tuple[bool, str | None]:
+    """
+    Get the compatible tag of an image for a platform from the bundled image index.
+
+    Args:
+        image (str): The name of the Docker image.
+        docker_platform (str): The docker platform (e.g., 'linux/arm64').
+
+    Returns:
+        tuple[bool, str | None]: Whether the index knows the answer, and the compatible
+            tag (None when the index recorded that the image has none).
+    """
+    if "index" not in REGISTRY_RESOLUTION_ORDER:
+        return False, None
+    compatible_tags = load_image_index().get(image, {}).get("compatible_tags", {})
+    if docker_platform not in compatible_tags:
+        return False, None
+    return True, compatible_tags[docker_platform]
+
+
+def _get_tag_platforms(tag_info: dict) -> dict[str, str | None]:
+    """
+    Get the platforms of a tag with the digest of each platform image.
+
+    Args:
+        tag_info (dict): The tag information.
+
+    Returns:
+        dict[str, str | None]: Platform strings (e.g. 'linux/arm/v7') mapped to image
+        digests.
+    """
+    platforms = {}
+    for image_info in tag_info.get("images", []):
+        if (
+            not image_info.get("architecture")
+            or image_info["architecture"] == "unknown"
+        ):
+            continue
+        parts = [image_info.get("os") or "linux", image_info["architecture"]]
+        if image_info.get("variant"):
+            parts.append(image_info["variant"])
+        platforms["/".join(parts)] = image_info.get("digest")
+    return platforms
+
+
+def build_image_index(app_config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Build the image index of every app image from the registries.
+
+    For each configured image tag the index records its platforms with their
+    digests and, for each platform in IMAGE_INDEX_PLATFORMS the tag does not
+    support, the compatible tag found in the registry (or None).
+
+    Args:
+        app_config (dict[str, Any]): The app configuration.
+
+    Returns:
+        dict[str, Any]: The image index.
+    """
+    images = {}
+    for category in ["apps", "extra-apps"]:
+        for app in app_config.get(category, []):
+            image = app.get("compose_config", {}).get("image")
+            if not image:
+                continue
+            image_name, image_tag = image.split(":")
+            tag_info = fetch_tag_info(image_name, image_tag)
+            if not tag_info:
+                logging.warning(
+                    f"Could not index {image_name}:{image_tag}, skipping it"
+                )
+                continue
+
+            entry = images.setdefault(image_name, {"tags": {}, "compatible_tags": {}})
+            entry["tags"][image_tag] = {
+                "digest": tag_info.get("digest"),
+                "platforms": _get_tag_platforms(tag_info),
+            }
+            for docker_platform in IMAGE_INDEX_PLATFORMS:
+                arch = docker_platform.split("/")[1]
+                if _tag_supports_arch(tag_info, arch):
+                    continue
+                try:
+                    entry["compatible_tags"][docker_platform] = (
+                        search_registry_compatible_tag(image_name, docker_platform)
+                    )
+                except requests.RequestException as e:
+                    logging.warning(
+                        f"Could not search compatible tags of {image_name} for "
+                        f"{docker_platform}: {str(e)}"
+                    )
+            platforms = ", ".join(entry["tags"][image_tag]["platforms"])
+            print(f"Indexed {image_name}:{image_tag} ({platforms})")
+
+    return {
+        "app_config_version": app_config.get("app_config_version"),
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "images": images,
+    }
+
+
+def refresh_image_index(
+    app_config_path: str = APP_CONFIG_PATH, index_path: str = IMAGE_INDEX_PATH
+) -> None:
+    """
+    Regenerate the bundled image index from the registries.
+
+    Args:
+        app_config_path (str, optional): Path of the app configuration.
+            Defaults to APP_CONFIG_PATH.
+        index_path (str, optional): Path of the image index to write.
+            Defaults to IMAGE_INDEX_PATH.
+    """
+    app_config = loader.load_json_config(app_config_path)
+    index = build_image_index(app_config)
+    write_json(index, index_path)
+    load_image_index(force=True)
+    print(f"Image index with {len(index['images'])} images written to {index_path}")
+
+
+def check_image_index(
+    app_config_path: str = APP_CONFIG_PATH, index_path: str = IMAGE_INDEX_PATH
+) -> list[str]:
+    """
+    Check that the bundled image index is fresh and covers every app image.
+
+    Args:
+        app_config_path (str, optional): Path of the app configuration.
+            Defaults to APP_CONFIG_PATH.
+        index_path (str, optional): Path of the image index.
+            Defaults to IMAGE_INDEX_PATH.
+
+    Returns:
+        list[str]: The problems found, empty if the index is usable offline.
+    """
+    app_config = loader.load_json_config(app_config_path)
+    try:
+        index = loader.load_json_config(index_path)
+    except FileNotFoundError:
+        return [f"No image index at {index_path}"]
+    if index.get("app_config_version") != app_config.get("app_config_version"):
+        return [
+            f"Image index was generated for app config version "
+            f"{index.get('app_config_version')}, current is "
+            f"{app_config.get('app_config_version')}"
+        ]
+    problems = []
+    images = index.get("images", {})
+    for category in ["apps", "extra-apps"]:
+        for app in app_config.get(category, []):
+            image = app.get("compose_config", {}).get("image")
+            if not image:
+                continue
+            image_name, image_tag = image.split(":")
+            if image_tag not in images.get(image_name, {}).get("tags", {}):
+                problems.append(f"{image} is not in the image index")
+    return problems
+
+
+def _run_docker(args: list[str]) -> str | None:
+    """
+    Run a docker CLI command of a local lookup.
+
+    Args:
+        args (list[str]): The docker CLI arguments
+            (e.g. ['image', 'inspect', 'nginx:latest']).
+
+    Returns:
+        str | None: The output, or None if the command failed or is unavailable.
+    """
+    try:
+        result = subprocess.run(
+            ["docker", *args],
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=DOCKER_INSPECT_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.debug(f"Local docker lookup 'docker {' '.join(args)}' failed: {str(e)}")
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout
+
+
+def _run_docker_json(args: list[str]) -> Any | None:
+    """
+    Run a docker CLI command and decode its JSON output.
+
+    Args:
+        args (list[str]): The docker CLI arguments, see _run_docker.
+
+    Returns:
+        Any | None: The decoded output, or None if the command failed or is
+        unavailable.
+    """
+    output = _run_docker(args)
+    if output is None:
+        return None
+    try:
+        return json.loads(output)
+    except json.JSONDecodeError:
+        return None
+
+
+def inspect_local_image(image: str, tag: str) -> dict | None:
+    """
+    Get the platform of an image already pulled in the local Docker image store.
+
+    The local store only holds the platform that was pulled, so the returned
+    information is not complete: other platforms may still be available remotely.
+
+    Args:
+        image (str): The name of the Docker image.
+        tag (str): The tag of the Docker image.
+
+    Returns:
+        dict | None: The tag information with a single image entry, or None if not
+        pulled.
+    """
+    data = _run_docker_json(["image", "inspect", f"{image}:{tag}"])
+    if not data or not isinstance(data, list):
+        return None
+    image_info = data[0]
+    repo_digests = image_info.get("RepoDigests") or []
+    return {
+        "name": tag,
+        "images": [
+            {
+                "architecture": image_info.get("Architecture"),
+                "os": image_info.get("Os"),
+                "variant": image_info.get("Variant"),
+            }
+        ],
+        "digest": repo_digests[0].split("@")[-1] if repo_digests else None,
+        "complete": False,
+    }
+
+
+def inspect_local_manifest(image: str, tag: str) -> dict | None:
+    """
+    Get the platforms of an image tag from its manifest list with
+    'docker manifest inspect'.
+
+    The docker CLI uses its own credentials, so this also works for registries
+    whose APIs require authentication.
+
+    Args:
+        image (str): The name of the Docker image.
+        tag (str): The tag of the Docker image.
+
+    Returns:
+        dict | None: The complete tag information, or None if no manifest list is
+        available.
+    """
+    data = _run_docker_json(["manifest", "inspect", f"{image}:{tag}"])
+    if not isinstance(data, dict) or not data.get("manifests"):
+        return None
+    return {
+        "name": tag,
+        "images": [
+            {
+                "architecture": manifest["platform"].get("architecture"),
+                "os": manifest["platform"].get("os"),
+                "variant": manifest["platform"].get("variant"),
+                "digest": manifest.get("digest"),
+            }
+            for manifest in data["manifests"]
+            if "platform" in manifest
+        ],
+        "complete": True,
+    }
+
+
+def list_local_image_tags(image: str) -> list[str]:
+    """
+    List the tags of an image already pulled in the local Docker image store.
+
+    Args:
+        image (str): The name of the Docker image.
+
+    Returns:
+        list[str]: The local tags of the image.
+    """
+    output = _run_docker(["image", "ls", image, "--format", "{{.Tag}}"])
+    return [tag for tag in (output or "").split() if tag and tag != "<none>"]
+
+
+def is_registry_enabled() -> bool:
+    """
+    Check if remote registry lookups are part of the resolution order.
+
+    Returns:
+        bool: True if the registry backend is enabled.
+    """
+    return "registry" in REGISTRY_RESOLUTION_ORDER
+
+
+def check_local_img_arch_support(
+    image: str, tag: str, docker_platform: str
+) -> bool | None:
+    """
+    Check if an image tag supports a docker platform without querying registry APIs.
+
+    The bundled image index and the local docker daemon are tried in the
+    configured resolution order. A pulled image can only confirm the platform it
+    was pulled for, while index entries and manifest lists answer both ways.
+
+    Args:
+        image (str): The name of the Docker image.
+        tag (str): The specific tag of the Docker image.
+        docker_platform (str): The docker platform to check for compatibility
+            (e.g., 'linux/arm64').
+
+    Returns:
+        bool | None: True or False if known locally, None if the registry must be asked.
+    """
+    arch = docker_platform.split("/")[1]
+    backends = {
+        "index": lookup_index_tag_info,
+        "local": inspect_local_image,
+        "manifest": inspect_local_manifest,
+    }
+    for backend in REGISTRY_RESOLUTION_ORDER:
+        if backend not in LOCAL_RESOLUTION_BACKENDS:
+            continue
+        tag_info = backends[backend](image, tag)
+        if not tag_info:
+            continue
+        if _tag_supports_arch(tag_info, arch):
+            logging.info(
+                f"Resolved {image}:{tag} on {docker_platform} using the {backend} "
+                "backend"
+            )
+            return True
+        if tag_info["complete"]:
+            return False
+    return None
+
+
+def find_local_compatible_tag(image: str, docker_platform: str) -> str | None:
+    """
+    Find a tag of an already pulled image that supports the given docker platform.
+
+    Args:
+        image (str): The name of the Docker image.
+        docker_platform (str): The docker platform to check for compatibility
+            (e.g., 'linux/arm64').
+
+    Returns:
+        str | None: The compatible local tag if found, None otherwise.
+    """
+    if "local" not in REGISTRY_RESOLUTION_ORDER:
+        return None
+    arch = docker_platform.split("/")[1]
+    for tag in list_local_image_tags(image):
+        tag_info = inspect_local_image(image, tag)
+        if tag_info and _tag_supports_arch(tag_info, arch):
+            return tag
+    return None
+
+
+def _get_dockerhub_repository(image: str) -> str:
+    """
+    Get the Docker Hub repository path of an image.
+
+    Args:
+        image (str): The name of the Docker image.
+
+    Returns:
+        str: The repository path, with official images under the 'library' namespace.
+    """
+    return image if "/" in image else f"library/{image}"
+
+
+def fetch_docker_tag(image: str, tag: str, ttl: int | None = None) -> dict | None:
+    """
+    Fetch the information of a single tag of a Docker image from Docker Hub.
+
+    Only the requested tag is transferred, using the single-tag endpoint, so the
+    answer is correct no matter how many tags the image has.
+
+    Args:
+        image (str): The name of the Docker image.
+        tag (str): The tag of the Docker image.
+        ttl (int, optional): Seconds a cached answer is used without revalidation.
+            Defaults to REGISTRY_CACHE_TTL.
+
+    Returns:
+        dict | None: The tag information, an empty dictionary if the tag does not exist,
+                     or None if the registry could not be queried.
+    """
+    if not is_registry_enabled():
+        logging.debug(f"Registry lookups disabled, not fetching {image}:{tag}")
+        return None
+    repository = _get_dockerhub_repository(image)
+    url = f"{DOCKERHUB_BASE_URL}repositories/{repository}/tags/{tag}"
+    try:
+        return cached_get_json(
+            url,
+            cache_key=f"{image}:{tag}",
+            ttl=ttl,
+            rate_limiter=dockerhub_rate_limiter,
+        )
+    except requests.HTTPError as e:
+        if (
+            e.response is not None
+            and e.response.status_code == requests.codes.not_found
+        ):
+            return {}
+        logging.error(f"Error fetching Docker tag {tag} for {image}: {str(e)}")
+        return None
+    except requests.RequestException as e:
+        logging.error(f"Error fetching Docker tag {tag} for {image}: {str(e)}")
+        return None
+
+
+def iter_docker_tags(image: str, page_size: int = DOCKERHUB_PAGE_SIZE):
+    """
+    Lazily iterate over all the tags of a Docker image on Docker Hub.
+
+    Pages are fetched one at a time and only when the previous one has been
+    consumed, so searches stop transferring data at the first match.
+
+    Args:
+        image (str): The name of the Docker image.
+        page_size (int, optional): Number of tags per page.
+            Defaults to DOCKERHUB_PAGE_SIZE.
+
+    Yields:
+        dict: The information of each tag.
+
+    Raises:
+        requests.RequestException: If a page cannot be fetched or registry lookups are
+            disabled.
+    """
+    if not is_registry_enabled():
+        raise RegistryDisabledError(f"Registry lookups disabled, cannot list {image}")
+    repository = _get_dockerhub_repository(image)
+    url = f"{DOCKERHUB_BASE_URL}repositories/{repository}/tags?page_size={page_size}"
+    page = 1
+    while url:
+        data = cached_get_json(
+            url,
+            cache_key=f"{image}?page={page}&page_size={page_size}",
+            rate_limiter=dockerhub_rate_limiter,
+        )
+        yield from data.get("results", [])
+        url = data.get("next")
+        page += 1
+
+
+def get_ghcr_token(repository: str) -> str:
+    """
+    Get an anonymous pull token for a GHCR repository.
+
+    Tokens are reused until they are about to expire.
+
+    Args:
+        repository (str): The repository path (e.g. 'owner/image').
+
+    Returns:
+        str: The bearer token.
+
+    Raises:
+        requests.RequestException: If the token cannot be obtained.
+    """
+    with _ghcr_tokens_lock:
+        token, expires_at = _ghcr_tokens.get(repository, (None, 0))
+        if token and time.monotonic() < expires_at:
+            return token
+    response = get_registry_session().get(
+        GHCR_AUTH_URL,
+        params={"scope": f"repository:{repository}:pull", "service": "ghcr.io"},
+    )
+    response.raise_for_status()
+    data = response.json()
+    token = data.get("token") or data.get("access_token")
+    if not token:
+        raise requests.RequestException(f"No pull token returned for {repository}")
+    # Renew a little before the token actually expires
+    expires_at = time.monotonic() + max(data.get("expires_in", 300) - 30, 0)
+    with _ghcr_tokens_lock:
+        _ghcr_tokens[repository] = (token, expires_at)
+    return token
+
+
+def _get_ghcr_auth(
+    repository: str, accept: str | None = None
+) -> Callable[[], dict[str, str]]:
+    """
+    Get the headers factory authenticating GHCR requests with an anonymous token.
+
+    Args:
+        repository (str): The repository path (e.g. 'owner/image').
+        accept (str, optional): The Accept header to send.
+
+    Returns:
+        Callable[[], dict[str, str]]: Function returning the request headers.
+    """
+
+    def auth() -> dict[str, str]:
+        headers = {"Authorization": f"Bearer {get_ghcr_token(repository)}"}
+        if accept:
+            headers["Accept"] = accept
+        return headers
+
+    return auth
+
+
+def _fetch_ghcr_tag(image: str, tag: str, ttl: int | None = None) -> dict:
+    """
+    Fetch the platforms of a GHCR image tag from its manifest.
+
+    Multi-platform indexes list their platforms directly. For single-platform
+    manifests the platform is read from the image config blob.
+
+    Args:
+        image (str): The name of the image (ghcr.io/owner/image).
+        tag (str): The tag of the image.
+        ttl (int, optional): Seconds a cached answer is used without revalidation.
+            Defaults to REGISTRY_CACHE_TTL.
+
+    Returns:
+        dict: The tag information.
+
+    Raises:
+        requests.RequestException: If the manifest cannot be fetched.
+    """
+    repository = image.replace("ghcr.io/", "", 1)
+    manifest_entry = cached_get_entry(
+        f"{GHCR_BASE_URL}{repository}/manifests/{tag}",
+        cache_key=f"{image}:{tag}",
+        ttl=ttl,
+        auth=_get_ghcr_auth(repository, accept=GHCR_MANIFEST_ACCEPT),
+    )
+    manifest = manifest_entry.get("data") or {}
+    if manifest.get("manifests"):
+        images = [
+            {
+                "architecture": entry["platform"].get("architecture"),
+                "os": entry["platform"].get("os"),
+                "variant": entry["platform"].get("variant"),
+                "digest": entry.get("digest"),
+            }
+            for entry in manifest["manifests"]
+            if "platform" in entry
+        ]
+    else:
+        config_digest = manifest.get("config", {}).get("digest")
+        # Blobs are content addressed, so a cached config never goes stale
+        config = cached_get_json(
+            f"{GHCR_BASE_URL}{repository}/blobs/{config_digest}",
+            cache_key=f"{image}@{config_digest}",
+            ttl=sys.maxsize,
+            auth=_get_ghcr_auth(repository),
+        )
+        images = [
+            {
+                "architecture": config.get("architecture"),
+                "os": config.get("os"),
+                "variant": config.get("variant"),
+            }
+        ]
+    return {"name": tag, "images": images, "digest": manifest_entry.get("digest")}
+
+
+def fetch_ghcr_tag(image: str, tag: str, ttl: int | None = None) -> dict | None:
+    """
+    Fetch the information of a single tag of a GHCR image.
+
+    Args:
+        image (str): The name of the image (ghcr.io/owner/image).
+        tag (str): The tag of the image.
+        ttl (int, optional): Seconds a cached answer is used without revalidation.
+            Defaults to REGISTRY_CACHE_TTL.
+
+    Returns:
+        dict | None: The tag information, an empty dictionary if the tag does not exist,
+                     or None if the registry could not be queried.
+    """
+    if not is_registry_enabled():
+        logging.debug(f"Registry lookups disabled, not fetching {image}:{tag}")
+        return None
+    try:
+        return _fetch_ghcr_tag(image, tag, ttl=ttl)
+    except requests.HTTPError as e:
+        if (
+            e.response is not None
+            and e.response.status_code == requests.codes.not_found
+        ):
+            return {}
+        logging.error(f"Error fetching GHCR tag {tag} for {image}: {str(e)}")
+        return None
+    except requests.RequestException as e:
+        logging.error(f"Error fetching GHCR tag {tag} for {image}: {str(e)}")
+        return None
+
+
+def iter_ghcr_tags(image: str):
+    """
+    Lazily iterate over the tags of a GHCR image with their platforms.
+
+    The manifest of each tag is only fetched when the previous one has been
+    consumed, so searches stop at the first match.
+
+    Args:
+        image (str): The name of the image (ghcr.io/owner/image).
+
+    Yields:
+        dict: The information of each tag.
+
+    Raises:
+        requests.RequestException: If the tags cannot be fetched or registry lookups
+            are disabled.
+    """
+    if not is_registry_enabled():
+        raise RegistryDisabledError(f"Registry lookups disabled, cannot list {image}")
+    repository = image.replace("ghcr.io/", "", 1)
+    tags = cached_get_json(
+        f"{GHCR_BASE_URL}{repository}/tags/list",
+        cache_key=image,
+        auth=_get_ghcr_auth(repository),
+    ).get("tags", [])
+    for tag in tags:
+        yield _fetch_ghcr_tag(image, tag)
+
+
+def fetch_tag_info(image: str, tag: str) -> dict | None:
+    """
+    Fetch the information of a single image tag from the registry hosting the image.
+
+    Args:
+        image (str): The name of the image.
+        tag (str): The tag of the image.
+
+    Returns:
+        dict | None: The tag information, an empty dictionary if the tag does not exist,
+                     or None if the registry could not be queried.
+    """
+    if image.startswith("ghcr.io/"):
+        return fetch_ghcr_tag(image, tag)
+    return fetch_docker_tag(image, tag)
 
 
 def fetch_docker_tags(image: str) -> dict | None:
     """
-    Fetch the tags of a Docker image from Docker Hub.
+    Fetch all the tags of a Docker image.
+
+    Results are served from the persistent registry cache when fresh. Prefer
+    fetch_docker_tag or iter_docker_tags when only some tags are needed.
 
     Args:
         image (str): The name of the Docker image.
@@ -41,56 +1223,76 @@ def fetch_docker_tags(image: str) -> dict | None:
             # Remove 'ghcr.io/' prefix for API
             ghcr_image = image.replace("ghcr.io/", "")
             url = f"{GHCR_BASE_URL}{ghcr_image}/tags/list"
-            response = requests.get(url)
-            response.raise_for_status()
             # GHCR returns tags in 'tags' key, but does not provide architecture info
-            tags = response.json().get("tags", [])
+            tags = cached_get_json(
+                url, cache_key=image, auth=_get_ghcr_auth(ghcr_image)
+            ).get("tags", [])
             # Return a Docker Hub-like structure for compatibility
             return {"results": [{"name": tag, "images": []} for tag in tags]}
         else:
-            # Docker Hub image (owner/image or library/image)
-            url = f"{DOCKERHUB_BASE_URL}repositories/{image}/tags"
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
+            # Docker Hub image (owner/image or library/image), all pages
+            return {"results": list(iter_docker_tags(image))}
     except requests.RequestException as e:
         logging.error(f"Error fetching Docker tags for {image}: {str(e)}")
         return None
 
 
-def check_img_arch_support(image: str, tag: str, docker_platform: str) -> bool | None:
+def _tag_supports_arch(tag_info: dict, arch: str) -> bool:
+    """
+    Check if any image of a tag is built for the given architecture.
+
+    Args:
+        tag_info (dict): The tag information.
+        arch (str): The architecture (e.g., 'arm64').
+
+    Returns:
+        bool: True if the architecture is available for the tag.
+    """
+    return any(
+        image_info.get("architecture") == arch
+        for image_info in tag_info.get("images", [])
+    )
+
+
+def check_img_arch_support(
+    image: str, tag: str, docker_platform: str, tag_info: dict | None = None
+) -> bool | None:
     """
     Check if a Docker image tag supports the given docker platform.
 
+    The local docker image store is asked first, so images already pulled are
+    resolved without network access.
+
     Args:
         image (str): The name of the Docker image.
         tag (str): The specific tag of the Docker image.
-        docker_platform (str): The docker platform to check for compatibility (e.g., 'linux/arm64').
+        docker_platform (str): The docker platform to check for compatibility
+            (e.g., 'linux/arm64').
+        tag_info (dict, optional): Already fetched information of the tag. Fetched if
+            not provided.
 
     Returns:
         bool | None: True if the architecture is supported, False if not supported,
-                     None if we cannot determine compatibility (e.g., GHCR images without PAT).
+                     None if we cannot determine compatibility (e.g., the registry is
+                     rate limiting or unavailable).
     """
-    if image.startswith("ghcr.io/"):
-        logging.warning(
-            f"Skipping architecture/tag compatibility check for GHCR image: {image}. (As it would require a GH PAT). Will fallback to default platform for emulation compatibility."
-        )
-        print(
-            f"\n[WARNING] Cannot check architecture/tag for GHCR image {image}. (As it would require a GH PAT). Will fallback to default platform (linux/amd64) for emulation compatibility."
-        )
-        time.sleep(4)
-        return None  # Return None to indicate we cannot determine compatibility
+    if tag_info is None:
+        local_support = check_local_img_arch_support(image, tag, docker_platform)
+        if local_support is not None:
+            return local_support
+        if not is_registry_enabled():
+            return None
     arch = docker_platform.split("/")[1]
-    tags_info = fetch_docker_tags(image)
-    if tags_info is None:
-        return False
+    if tag_info is None:
+        tag_info = fetch_tag_info(image, tag)
+    if tag_info is None:
+        return None  # Unknown: the registry could not be queried, retry later
 
-    tag_info = next((t for t in tags_info.get("results", []) if t["name"] == tag), None)
     if not tag_info:
         logging.error(f"Tag {tag} not found for image {image}")
         return False
 
-    return any(image_info["architecture"] == arch for image_info in tag_info["images"])
+    return _tag_supports_arch(tag_info, arch)
 
 
 def get_compatible_tag(image: str, docker_platform: str) -> str | None:
@@ -98,37 +1300,98 @@ def get_compatible_tag(image: str, docker_platform: str) -> str | None:
     Get a compatible tag for the given architecture if the default tag is not supported.
     If no compatible tag is found, ensure multi-arch emulation support with binfmt.
 
+    Tags are streamed page by page and the search stops at the first match.
+
     Args:
         image (str): The name of the Docker image.
-        arch (str): The architecture to check for compatibility.
+        docker_platform (str): The docker platform to check for compatibility
+            (e.g., 'linux/arm64').
 
     Returns:
         Optional[str]: The compatible tag name if found, None otherwise.
     """
-    arch = docker_platform.split("/")[1]
-    tags_info = fetch_docker_tags(image)
-    if tags_info is None:
+    try:
+        return find_compatible_tag(image, docker_platform)
+    except requests.RequestException as e:
+        logging.error(f"Error fetching Docker tags for {image}: {str(e)}")
         return None
 
-    compatible_tag = next(
-        (
-            t["name"]
-            for t in tags_info.get("results", [])
-            if any(image_info["architecture"] == arch for image_info in t["images"])
-        ),
+
+def search_registry_compatible_tag(image: str, docker_platform: str) -> str | None:
+    """
+    Search the registry for the first tag of an image supporting a docker platform.
+
+    Args:
+        image (str): The name of the Docker image.
+        docker_platform (str): The docker platform to check for compatibility
+            (e.g., 'linux/arm64').
+
+    Returns:
+        str | None: The compatible tag name if found, None if the image has none.
+
+    Raises:
+        requests.RequestException: If the tags cannot be fetched.
+    """
+    arch = docker_platform.split("/")[1]
+    tags = (
+        iter_ghcr_tags(image)
+        if image.startswith("ghcr.io/")
+        else iter_docker_tags(image)
+    )
+    return next(
+        (t["name"] for t in tags if _tag_supports_arch(t, arch)),
         None,
     )
 
-    if not compatible_tag:
+
+def find_compatible_tag(
+    image: str, docker_platform: str, setup_emulation: bool = True
+) -> str | None:
+    """
+    Search a compatible tag like get_compatible_tag, without hiding registry errors.
+
+    Args:
+        image (str): The name of the Docker image.
+        docker_platform (str): The docker platform to check for compatibility
+            (e.g., 'linux/arm64').
+        setup_emulation (bool, optional): Whether to set up binfmt emulation when no
+            compatible tag exists. Disabled for dry runs. Defaults to True.
+
+    Returns:
+        Optional[str]: The compatible tag name if found, None if the image has none.
+
+    Raises:
+        requests.RequestException: If the tags cannot be fetched, so compatibility is
+            unknown.
+    """
+    local_tag = find_local_compatible_tag(image, docker_platform)
+    if local_tag:
+        logging.info(
+            f"Found compatible local tag {local_tag} for {image} on platform "
+            f"{docker_platform}"
+        )
+        return local_tag
+
+    indexed, compatible_tag = lookup_index_compatible_tag(image, docker_platform)
+    if not indexed:
+        compatible_tag = search_registry_compatible_tag(image, docker_platform)
+
+    if not compatible_tag and not setup_emulation:
+        logging.warning(
+            f"No compatible tag found for {image} on platform {docker_platform}, "
+            "binfmt multi-arch emulation would be needed."
+        )
+    elif not compatible_tag:
         # Construct the path to the docker.binfmt.service file
         service_file_path = os.path.join(
             os.getcwd(), ".resources", ".files", "docker.binfmt.service"
         )
 
         # Ensure multi-arch emulation support with binfmt if no compatible tag is found
-        ensure_service(
-            service_name="docker.binfmt", service_file_path=service_file_path
-        )
+        with _binfmt_lock:
+            ensure_service(
+                service_name="docker.binfmt", service_file_path=service_file_path
+            )
 
         # Log and inform the user that no compatible tag for the architecture was found
         logging.warning(
@@ -140,3 +1403,719 @@ def get_compatible_tag(image: str, docker_platform: str) -> str | None:
         )
 
     return compatible_tag
+
+
+def get_image_digest(
+    image: str,
+    tag: str,
+    backends: list[str] | None = None,
+    ttl: int | None = None,
+) -> str | None:
+    """
+    Get the manifest digest of an image tag.
+
+    Args:
+        image (str): The name of the Docker image.
+        tag (str): The tag of the Docker image.
+        backends (list[str], optional): Backends to ask, in order.
+            Defaults to REGISTRY_RESOLUTION_ORDER.
+        ttl (int, optional): Registry cache TTL for the lookup.
+            Defaults to REGISTRY_CACHE_TTL.
+
+    Returns:
+        str | None: The digest (e.g. 'sha256:...'), or None if unknown.
+    """
+    lookups = {
+        "index": lambda: lookup_index_tag_info(image, tag),
+        "local": lambda: inspect_local_image(image, tag),
+        "registry": lambda: (
+            fetch_ghcr_tag(image, tag, ttl=ttl)
+            if image.startswith("ghcr.io/")
+            else fetch_docker_tag(image, tag, ttl=ttl)
+        ),
+    }
+    for backend in REGISTRY_RESOLUTION_ORDER if backends is None else backends:
+        if backend not in lookups:
+            continue
+        tag_info = lookups[backend]()
+        if tag_info and tag_info.get("digest"):
+            return tag_info["digest"]
+    return None
+
+
+def get_image_reference(resolution: dict[str, Any]) -> str:
+    """
+    Get the image reference to write in a compose file for a resolution.
+
+    Args:
+        resolution (dict[str, Any]): The image resolution.
+
+    Returns:
+        str: 'name@digest' for pinned resolutions, 'name:tag' otherwise.
+    """
+    if resolution.get("digest"):
+        image_name = resolution["image"].split(":")[0]
+        return f"{image_name}@{resolution['digest']}"
+    return resolution["image"]
+
+
+def get_image_lock_path(user_config_path: str | None = None) -> str | None:
+    """
+    Get the path of the image lockfile, if digest pinning is enabled.
+
+    Args:
+        user_config_path (str, optional): Path of user-config.json.
+            Defaults to ./config/user-config.json.
+
+    Returns:
+        str | None: The lockfile path next to user-config.json, or None if pinning is
+        disabled.
+    """
+    if not REGISTRY_PIN_DIGESTS:
+        return None
+    if user_config_path is None:
+        user_config_path = os.path.join(os.getcwd(), "config", "user-config.json")
+    return os.path.join(
+        os.path.dirname(os.path.abspath(user_config_path)), IMAGE_LOCK_FILENAME
+    )
+
+
+def _get_lock_key(image_name: str, image_tag: str, docker_platform: str) -> str:
+    return f"{image_name}:{image_tag}|{docker_platform}"
+
+
+def load_image_lock(lock_path: str) -> dict[str, dict[str, Any]]:
+    """
+    Load the locked image resolutions.
+
+    Args:
+        lock_path (str): Path of the image lockfile.
+
+    Returns:
+        dict[str, dict[str, Any]]: Locked resolutions by "name:tag|platform", empty
+        if no lockfile exists.
+    """
+    try:
+        return loader.load_json_config(lock_path).get("images", {})
+    except FileNotFoundError:
+        return {}
+
+
+def write_image_lock(lock_path: str, images: dict[str, dict[str, Any]]) -> None:
+    """
+    Write the locked image resolutions.
+
+    Args:
+        lock_path (str): Path of the image lockfile.
+        images (dict[str, dict[str, Any]]): Locked resolutions by "name:tag|platform".
+    """
+    write_json(
+        {
+            "locked_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "images": dict(sorted(images.items())),
+        },
+        lock_path,
+    )
+
+
+def relock_images(
+    lock_path: str,
+    source: str = "registry",
+    max_workers: int | None = None,
+) -> dict[str, tuple[str | None, str | None]]:
+    """
+    Refresh the digests of every locked image in one batch and rewrite the lockfile
+    once.
+
+    Upgrades of pinned images are explicit: run this after Watchtower or a manual
+    pull updated the images, then regenerate the compose files.
+
+    Args:
+        lock_path (str): Path of the image lockfile.
+        source (str, optional): Where new digests come from: "registry" (latest
+            published) or "local" (images already pulled, e.g. by Watchtower).
+            Defaults to "registry".
+        max_workers (int, optional): Maximum concurrent lookups.
+            Defaults to REGISTRY_MAX_WORKERS.
+
+    Returns:
+        dict[str, tuple[str | None, str | None]]: The (old, new) digests of the
+        entries that changed.
+    """
+    images = load_image_lock(lock_path)
+    backends = ["local"] if source == "local" else ["registry", "local"]
+    entries = list(images.items())
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers or REGISTRY_MAX_WORKERS, len(entries) or 1)),
+        thread_name_prefix="m4b-relock",
+    ) as executor:
+        digests = list(
+            executor.map(
+                lambda item: get_image_digest(
+                    *item[1]["image"].split(":"), backends=backends, ttl=0
+                ),
+                entries,
+            )
+        )
+
+    changes = {}
+    for (lock_key, entry), digest in zip(entries, digests, strict=True):
+        if digest is None:
+            logging.warning(f"Could not refresh the digest of {lock_key}, keeping it")
+            continue
+        if digest != entry.get("digest"):
+            changes[lock_key] = (entry.get("digest"), digest)
+            entry["digest"] = digest
+    write_image_lock(lock_path, images)
+    logging.info(f"Relocked {len(images)} images, {len(changes)} changed")
+    return changes
+
+
+class ImageResolutionContext:
+    """
+    Per-run memo of image resolutions.
+
+    Decides once per run which tag and platform an image should use on a given
+    docker platform, and whether emulation is needed. Every app category and
+    every multiproxy instance generated with the same context reuses the result
+    instead of querying the registry again. The context is thread-safe, so the
+    lookups of a run can be resolved concurrently with resolve_many.
+
+    When the registry is rate limiting or unavailable, compatibility is unknown:
+    the configured tag is kept and the image is recorded in unverified, instead
+    of being treated as incompatible.
+
+    With a lockfile, resolutions are pinned to their manifest digest: locked
+    entries are reused as they are, and new ones are added to the lockfile by
+    save_image_lock.
+
+    A dry-run context only plans: it never sets up binfmt emulation, so it must
+    not be reused to generate files.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        lock_path: str | None = None,
+        dry_run: bool = False,
+    ):
+        self.max_workers = REGISTRY_MAX_WORKERS if max_workers is None else max_workers
+        self.lock_path = lock_path
+        self.dry_run = dry_run
+        self._image_lock = load_image_lock(lock_path) if lock_path else {}
+        self._image_lock_changed = False
+        self._tag_info = {}
+        self._compatible_tags = {}
+        self._resolutions = {}
+        # Lookups already written to the image index
+        self._indexed = set()
+        self.unverified = set()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _memoize(self, store: dict, key: Any, compute) -> Any:
+        """
+        Compute a value once per key, even when requested from several threads.
+
+        Args:
+            store (dict): The dictionary holding the memoized values.
+            key (Any): The key of the value.
+            compute (Callable[[], Any]): Function computing the value.
+
+        Returns:
+            Any: The memoized value.
+        """
+        with self._lock:
+            if key in store:
+                return store[key]
+            key_lock = self._key_locks.setdefault((id(store), key), threading.Lock())
+        with key_lock:
+            if key not in store:
+                store[key] = compute()
+            return store[key]
+
+    def get_tag_info(self, image: str, tag: str) -> dict | None:
+        """
+        Get the information of an image tag, fetching it at most once per run.
+
+        Args:
+            image (str): The name of the Docker image.
+            tag (str): The tag of the Docker image.
+
+        Returns:
+            dict | None: The tag information, an empty dictionary if the tag does not
+                exist, or None if it could not be fetched.
+        """
+        return self._memoize(
+            self._tag_info, (image, tag), lambda: fetch_tag_info(image, tag)
+        )
+
+    def get_compatible_tag(self, image: str, docker_platform: str) -> str | None:
+        """
+        Get a compatible tag of an image for a platform, searching at most once per run.
+
+        Args:
+            image (str): The name of the Docker image.
+            docker_platform (str): The docker platform to check for compatibility.
+
+        Returns:
+            str | None: The compatible tag name if found, None otherwise.
+
+        Raises:
+            requests.RequestException: If the tags cannot be fetched. Failures are not
+                memoized.
+        """
+        return self._memoize(
+            self._compatible_tags,
+            (image, docker_platform),
+            lambda: find_compatible_tag(
+                image, docker_platform, setup_emulation=not self.dry_run
+            ),
+        )
+
+    def resolve(
+        self,
+        image_name: str,
+        image_tag: str,
+        docker_platform: str,
+        default_docker_platform: str,
+    ) -> dict[str, Any] | None:
+        """
+        Resolve the image and platform to use for an app.
+
+        Args:
+            image_name (str): The name of the Docker image.
+            image_tag (str): The configured tag of the Docker image.
+            docker_platform (str): The docker platform requested for the app.
+            default_docker_platform (str): The platform to fall back to for emulation.
+
+        Returns:
+            dict[str, Any] | None: A dictionary with the "image" reference, the
+                "platform", whether "emulation" is needed and, when pinning, the
+                manifest "digest".
+                None if no compatible tag exists.
+        """
+        key = (image_name, image_tag, docker_platform, default_docker_platform)
+        return self._memoize(self._resolutions, key, lambda: self._resolve_pinned(*key))
+
+    def resolve_many(self, image_requests: list[tuple[str, str, str, str]]) -> None:
+        """
+        Resolve several images concurrently with a bounded thread pool.
+
+        Results are memoized, so later calls to resolve return immediately and the
+        run waits only as long as the slowest single lookup.
+
+        Args:
+            image_requests (list[tuple[str, str, str, str]]): Tuples of
+                (image_name, image_tag, docker_platform, default_docker_platform).
+        """
+        pending = [
+            request
+            for request in dict.fromkeys(image_requests)
+            if request not in self._resolutions
+        ]
+        if not pending:
+            return
+        if len(pending) == 1 or self.max_workers <= 1:
+            for request in pending:
+                self.resolve(*request)
+        else:
+            logging.info(
+                f"Resolving {len(pending)} images with up to {self.max_workers} "
+                "concurrent lookups"
+            )
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(pending)),
+                thread_name_prefix="m4b-resolver",
+            ) as executor:
+                futures = [
+                    executor.submit(self.resolve, *request) for request in pending
+                ]
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # The failing lookup is retried when the app is assembled
+                        logging.error(f"Error resolving image: {str(e)}")
+        self.report_budget()
+
+    def save_image_lock(self) -> None:
+        """
+        Write the lockfile if new resolutions were pinned during the run.
+        """
+        with self._lock:
+            if not self.lock_path or not self._image_lock_changed:
+                return
+            write_image_lock(self.lock_path, self._image_lock)
+            self._image_lock_changed = False
+
+    def save_image_index(
+        self,
+        index_path: str | None = None,
+        app_config_path: str | None = None,
+    ) -> None:
+        """
+        Add the tags and compatible tags looked up live during the run to the image
+        index.
+
+        This seeds the offline index on the first setup, so later runs resolve the
+        same images without registry requests. Entries of a stale index are dropped.
+
+        Args:
+            index_path (str, optional): Path of the image index.
+                Defaults to IMAGE_INDEX_PATH.
+            app_config_path (str, optional): Path of the app configuration the
+                index is generated for. Defaults to APP_CONFIG_PATH.
+        """
+        index_path = IMAGE_INDEX_PATH if index_path is None else index_path
+        if app_config_path is None:
+            app_config_path = APP_CONFIG_PATH
+        with self._lock:
+            tag_infos = {
+                key: info
+                for key, info in self._tag_info.items()
+                if info and ("tag", *key) not in self._indexed
+            }
+            compatible_tags = {
+                key: tag
+                for key, tag in self._compatible_tags.items()
+                if ("compatible", *key) not in self._indexed
+            }
+            self._indexed.update(("tag", *key) for key in tag_infos)
+            self._indexed.update(("compatible", *key) for key in compatible_tags)
+        if not tag_infos and not compatible_tags:
+            return
+
+        try:
+            app_config_version = loader.load_json_config(app_config_path).get(
+                "app_config_version"
+            )
+        except Exception as e:
+            logging.warning(f"Could not update the image index: {str(e)}")
+            return
+        try:
+            index = loader.load_json_config(index_path)
+        except Exception:
+            index = {}
+        images = (
+            index.get("images", {})
+            if index.get("app_config_version") == app_config_version
+            else {}
+        )
+
+        def entry(image: str) -> dict[str, Any]:
+            return images.setdefault(image, {"tags": {}, "compatible_tags": {}})
+
+        for (image, tag), tag_info in tag_infos.items():
+            entry(image)["tags"][tag] = {
+                "digest": tag_info.get("digest"),
+                "platforms": _get_tag_platforms(tag_info),
+            }
+        for (image, docker_platform), tag in compatible_tags.items():
+            entry(image)["compatible_tags"][docker_platform] = tag
+
+        try:
+            write_json(
+                {
+                    "app_config_version": app_config_version,
+                    "generated_at": datetime.now(timezone.utc).strftime(
+                        "%Y-%m-%dT%H:%M:%SZ"
+                    ),
+                    "images": images,
+                },
+                index_path,
+            )
+        except OSError as e:
+            logging.warning(f"Could not write the image index {index_path}: {e}")
+            return
+        load_image_index(force=True)
+        logging.info(f"Image index {index_path} updated with {len(images)} images")
+
+    def report_budget(self) -> None:
+        """
+        Log the remaining Docker Hub API budget and warn about unverified images.
+        """
+        budget = dockerhub_rate_limiter.remaining()
+        registry_remaining = (
+            "unknown" if budget["registry"] is None else budget["registry"]
+        )
+        logging.info(
+            f"Docker Hub API budget left: {budget['local']} requests now, "
+            f"{registry_remaining} reported by the registry"
+        )
+        if self.unverified:
+            print(
+                f"\n[WARNING] Could not verify {len(self.unverified)} image(s) because "
+                "Docker Hub is rate limiting or unreachable "
+                f"(budget left: {budget['local']} now, {registry_remaining} reported). "
+                "Configured tags were kept and will be checked again on the next run."
+            )
+
+    def _unverified_resolution(
+        self, image_name: str, image_tag: str, docker_platform: str
+    ) -> dict[str, Any]:
+        """
+        Build the resolution of an image whose compatibility could not be checked.
+
+        Args:
+            image_name (str): The name of the Docker image.
+            image_tag (str): The configured tag of the Docker image.
+            docker_platform (str): The docker platform requested for the app.
+
+        Returns:
+            dict[str, Any]: The resolution keeping the configured tag and platform.
+        """
+        logging.warning(
+            f"Could not verify {image_name}:{image_tag} on {docker_platform} because "
+            "the registry is rate limiting or unavailable. "
+            "Keeping the configured tag; it will be checked again on the next run."
+        )
+        with self._lock:
+            self.unverified.add(f"{image_name}:{image_tag}")
+        return {
+            "image": f"{image_name}:{image_tag}",
+            "platform": docker_platform,
+            "emulation": False,
+        }
+
+    def _resolve_pinned(
+        self,
+        image_name: str,
+        image_tag: str,
+        docker_platform: str,
+        default_docker_platform: str,
+    ) -> dict[str, Any] | None:
+        if not self.lock_path:
+            return self._resolve(
+                image_name, image_tag, docker_platform, default_docker_platform
+            )
+
+        lock_key = _get_lock_key(image_name, image_tag, docker_platform)
+        locked = self._image_lock.get(lock_key)
+        if locked:
+            logging.debug(f"Using locked resolution for {lock_key}")
+            return locked
+
+        resolution = self._resolve(
+            image_name, image_tag, docker_platform, default_docker_platform
+        )
+        if resolution is None or resolution["image"] in self.unverified:
+            return resolution
+        digest = get_image_digest(*resolution["image"].split(":"))
+        if digest is None:
+            logging.warning(
+                f"Could not get the digest of {resolution['image']}, it will not be "
+                "pinned"
+            )
+            return resolution
+
+        resolution = {**resolution, "digest": digest}
+        with self._lock:
+            self._image_lock[lock_key] = resolution
+            self._image_lock_changed = True
+        return resolution
+
+    def _resolve(
+        self,
+        image_name: str,
+        image_tag: str,
+        docker_platform: str,
+        default_docker_platform: str,
+    ) -> dict[str, Any] | None:
+        # Images known to the local docker daemon are resolved without network access
+        arch_support = check_local_img_arch_support(
+            image_name, image_tag, docker_platform
+        )
+        if arch_support is None and not is_registry_enabled():
+            return self._unverified_resolution(image_name, image_tag, docker_platform)
+        if arch_support is None:
+            tag_info = self.get_tag_info(image_name, image_tag)
+            if tag_info is None:
+                return self._unverified_resolution(
+                    image_name, image_tag, docker_platform
+                )
+            arch_support = check_img_arch_support(
+                image_name, image_tag, docker_platform, tag_info=tag_info
+            )
+
+        if arch_support:
+            # Add platform only when we've confirmed the image supports it
+            return {
+                "image": f"{image_name}:{image_tag}",
+                "platform": docker_platform,
+                "emulation": False,
+            }
+        return self._resolve_compatible_tag(
+            image_name, image_tag, docker_platform, default_docker_platform
+        )
+
+    def _resolve_compatible_tag(
+        self,
+        image_name: str,
+        image_tag: str,
+        docker_platform: str,
+        default_docker_platform: str,
+    ) -> dict[str, Any] | None:
+        try:
+            compatible_tag = self.get_compatible_tag(image_name, docker_platform)
+        except requests.RequestException as e:
+            logging.error(f"Error fetching Docker tags for {image_name}: {str(e)}")
+            return self._unverified_resolution(image_name, image_tag, docker_platform)
+        if compatible_tag:
+            logging.info(
+                f"Using compatible tag {compatible_tag} for {image_name} "
+                f"on {docker_platform}"
+            )
+            return {
+                "image": f"{image_name}:{compatible_tag}",
+                "platform": docker_platform,
+                "emulation": False,
+            }
+
+        logging.warning(
+            f"No compatible tag found for {image_name} with architecture "
+            f"{docker_platform}. Searching for a suitable tag for default emulation "
+            f"architecture {default_docker_platform}."
+        )
+        # find a compatibile tag with default docker platform
+        try:
+            compatible_tag = self.get_compatible_tag(
+                image_name, default_docker_platform
+            )
+        except requests.RequestException as e:
+            logging.error(f"Error fetching Docker tags for {image_name}: {str(e)}")
+            return self._unverified_resolution(image_name, image_tag, docker_platform)
+        if compatible_tag:
+            logging.warning(
+                f"Compatible tag found to run {image_name} with emulation on "
+                f"{default_docker_platform} architecture. Using binfmt emulation "
+                f"with image {image_name}:{compatible_tag}"
+            )
+            return {
+                "image": f"{image_name}:{compatible_tag}",
+                "platform": default_docker_platform,
+                "emulation": default_docker_platform != docker_platform,
+            }
+
+        logging.error(
+            f"No compatible tag found for {image_name} either with "
+            f"specified architecture {docker_platform} or with default "
+            f"architecture {default_docker_platform}."
+        )
+        return None
+
+
+if __name__ == "__main__":
+    # Get the script absolute path and name
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    script_name = os.path.basename(__file__)
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description=f"Run the {script_name} module standalone."
+    )
+    parser.add_argument(
+        "--refresh-index",
+        action="store_true",
+        help="Regenerate the bundled image index from the registries",
+    )
+    parser.add_argument(
+        "--check-index",
+        action="store_true",
+        help=(
+            "Exit with an error if the bundled image index is stale or misses an "
+            "app image"
+        ),
+    )
+    parser.add_argument(
+        "--relock",
+        action="store_true",
+        help="Refresh the digests of every image in the image lockfile",
+    )
+    parser.add_argument(
+        "--relock-source",
+        choices=["registry", "local"],
+        default="registry",
+        help=(
+            "Take new digests from the registry or from locally pulled images "
+            "(e.g. after Watchtower updates)"
+        ),
+    )
+    parser.add_argument(
+        "--user-config-path",
+        type=str,
+        default=os.path.join(parent_dir, "config", "user-config.json"),
+        help=(
+            "Path to the user configuration file, next to which the image lockfile "
+            "is stored"
+        ),
+    )
+    parser.add_argument(
+        "--app-config-path",
+        type=str,
+        default=APP_CONFIG_PATH,
+        help="Path to the app configuration file",
+    )
+    parser.add_argument(
+        "--index-path",
+        type=str,
+        default=IMAGE_INDEX_PATH,
+        help="Path to the image index file",
+    )
+    parser.add_argument(
+        "--log-dir",
+        default=os.path.join(script_dir, "logs"),
+        help="Set the logging directory",
+    )
+    parser.add_argument(
+        "--log-file", default=f"{script_name}.log", help="Set the logging file name"
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        default="INFO",
+        help="Set the logging level",
+    )
+    args = parser.parse_args()
+
+    # Set logging level based on command-line arguments
+    log_level = getattr(logging, args.log_level.upper(), None)
+    if not isinstance(log_level, int):
+        raise ValueError(f"Invalid log level: {args.log_level}")
+
+    # Start logging
+    os.makedirs(args.log_dir, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(args.log_dir, args.log_file),
+        format="%(asctime)s - [%(levelname)s] - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=log_level,
+    )
+
+    logging.info(f"Starting {script_name} script...")
+
+    try:
+        if args.refresh_index:
+            refresh_image_index(args.app_config_path, args.index_path)
+        if args.check_index:
+            problems = check_image_index(args.app_config_path, args.index_path)
+            for problem in problems:
+                print(problem)
+            if problems:
+                sys.exit(1)
+            print(f"Image index {args.index_path} is fresh")
+        if args.relock:
+            lock_path = os.path.join(
+                os.path.dirname(os.path.abspath(args.user_config_path)),
+                IMAGE_LOCK_FILENAME,
+            )
+            changes = relock_images(lock_path, source=args.relock_source)
+            for lock_key, (old_digest, new_digest) in changes.items():
+                print(f"{lock_key}: {old_digest} -> {new_digest}")
+            print(f"Image lockfile {lock_path} updated, {len(changes)} digests changed")
+        if not (args.refresh_index or args.check_index or args.relock):
+            parser.print_help()
+        logging.info(f"{script_name} script completed successfully")
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {str(e)}")
+        raise
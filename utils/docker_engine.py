@@ -0,0 +1,488 @@
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+
+import docker
+import requests
+from docker.errors import DockerException, NotFound
+
+from utils.helper import is_user_root
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+# Seconds to wait for an Engine API response, or for the docker CLI fallback
+ENGINE_API_TIMEOUT = 30
+
+# Seconds wait_for_containers keeps waiting while no container matches the filters
+EMPTY_WAIT_GRACE = 5.0
+
+# Seconds an event stream of wait_for_containers stays open before it is reopened
+EVENT_WINDOW = 10.0
+
+# Container events that can change the readiness of a container
+READINESS_EVENTS = ["create", "start", "health_status", "die", "oom", "destroy"]
+
+# Published port in the docker CLI output, e.g. "0.0.0.0:8081->80/tcp" or "4449/tcp"
+CLI_PORT_PATTERN = re.compile(
+    r"^(?:(?P<ip>[0-9.]+|\[[0-9a-fA-F:]*\]|::):(?P<public>\d+)->)?"
+    r"(?P<private>\d+)/(?P<type>\w+)$"
+)
+
+# The shared Engine API client under "client", None if the daemon is unreachable
+_engine_client: dict[str, "docker.DockerClient | None"] = {}
+_engine_client_lock = threading.Lock()
+
+
+def find_docker_host() -> str | None:
+    """
+    Find the address of the Docker daemon, including rootless and Docker Desktop
+    sockets.
+
+    DOCKER_HOST wins when set. Otherwise the sockets of a rootless daemon
+    ($XDG_RUNTIME_DIR/docker.sock, /run/user/<uid>/docker.sock), of Docker Desktop
+    (~/.docker/run/docker.sock) and of the system daemon (/var/run/docker.sock)
+    are tried in this order.
+
+    Returns:
+        str | None: The daemon address (e.g. unix:///var/run/docker.sock), or None if
+        no socket exists.
+    """
+    docker_host = os.environ.get("DOCKER_HOST")
+    if docker_host:
+        return docker_host
+    if platform.system().lower() == "windows":
+        return "npipe:////./pipe/docker_engine"
+
+    candidates = []
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        candidates.append(os.path.join(os.environ["XDG_RUNTIME_DIR"], "docker.sock"))
+    if hasattr(os, "getuid"):
+        candidates.append(f"/run/user/{os.getuid()}/docker.sock")
+    candidates.extend(
+        [
+            os.path.expanduser(os.path.join("~", ".docker", "run", "docker.sock")),
+            "/var/run/docker.sock",
+        ]
+    )
+    for socket_path in candidates:
+        if os.path.exists(socket_path):
+            return f"unix://{socket_path}"
+    return None
+
+
+def get_engine_client() -> "docker.DockerClient | None":
+    """
+    Get the Engine API client shared by the whole process.
+
+    The client keeps its connections to the daemon open between calls. It is
+    created on first use and None is returned, once and for all, when the daemon
+    cannot be reached directly (e.g. the socket needs sudo), so callers fall back
+    to the docker CLI.
+
+    Returns:
+        docker.DockerClient | None: The client, or None if the daemon is not reachable.
+    """
+    with _engine_client_lock:
+        if "client" not in _engine_client:
+            _engine_client["client"] = None
+            docker_host = find_docker_host()
+            if docker_host:
+                try:
+                    client = docker.DockerClient(
+                        base_url=docker_host, timeout=ENGINE_API_TIMEOUT
+                    )
+                    client.ping()
+                    _engine_client["client"] = client
+                    logging.info(f"Connected to the Docker Engine API at {docker_host}")
+                except DockerException as e:
+                    logging.info(
+                        f"Docker Engine API at {docker_host} is not reachable, using "
+                        f"the docker CLI: {e}"
+                    )
+            else:
+                logging.info("No Docker socket found, using the docker CLI")
+        return _engine_client["client"]
+
+
+def reset_engine_client() -> None:
+    """
+    Close the shared Engine API client, the next call connects again.
+    """
+    with _engine_client_lock:
+        client = _engine_client.pop("client", None)
+        if client is not None:
+            client.close()
+
+
+def _filter_args(filters: dict[str, list[str]] | None) -> list[str]:
+    return [
+        arg
+        for key, values in (filters or {}).items()
+        for value in values
+        for arg in ("--filter", f"{key}={value}")
+    ]
+
+
+def _run_docker_cli(args: list[str]) -> str | None:
+    # Same as run_docker_command: the socket usually needs sudo when not root
+    command = ["docker", *args]
+    if not is_user_root() and platform.system().lower() == "linux":
+        command.insert(0, "sudo")
+    try:
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=ENGINE_API_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logging.error(f"Error running 'docker {' '.join(args)}': {e}")
+        return None
+    if result.returncode != 0:
+        logging.error(f"'docker {' '.join(args)}' failed: {result.stderr.strip()}")
+        return None
+    return result.stdout
+
+
+def _container_from_cli(container: dict[str, Any]) -> dict[str, Any]:
+    """
+    Convert a 'docker ps --format {{json .}}' entry to the Engine API container list
+    format.
+    """
+    ports = []
+    for port in filter(None, container.get("Ports", "").split(", ")):
+        match = CLI_PORT_PATTERN.match(port.strip())
+        if not match:
+            continue
+        entry = {
+            "PrivatePort": int(match.group("private")),
+            "Type": match.group("type"),
+        }
+        if match.group("public"):
+            entry["IP"] = match.group("ip").strip("[]") or "::"
+            entry["PublicPort"] = int(match.group("public"))
+        ports.append(entry)
+    labels = dict(
+        label.split("=", 1)
+        for label in container.get("Labels", "").split(",")
+        if "=" in label
+    )
+    return {
+        "Id": container.get("ID", ""),
+        "Names": [f"/{name}" for name in container.get("Names", "").split(",") if name],
+        "Image": container.get("Image", ""),
+        "Labels": labels,
+        "Ports": ports,
+        "State": container.get("State", ""),
+        "Status": container.get("Status", ""),
+    }
+
+
+def list_containers(
+    filters: dict[str, list[str]] | None = None, all_containers: bool = False
+) -> list[dict[str, Any]] | None:
+    """
+    List containers in the Engine API format (GET /containers/json).
+
+    Args:
+        filters (dict[str, list[str]], optional): Engine filters,
+            e.g. {"label": ["com.docker.compose.project=x"]}.
+        all_containers (bool): Whether to include stopped containers.
+
+    Returns:
+        list[dict[str, Any]] | None: The containers, or None if Docker cannot be
+        queried.
+    """
+    client = get_engine_client()
+    if client is not None:
+        try:
+            return client.api.containers(all=all_containers, filters=filters)
+        except DockerException as e:
+            logging.error(f"Error listing containers: {e}")
+            return None
+
+    args = ["ps", "--no-trunc", "--format", "{{json .}}", *_filter_args(filters)]
+    if all_containers:
+        args.append("--all")
+    output = _run_docker_cli(args)
+    if output is None:
+        return None
+    containers = []
+    for line in output.splitlines():
+        try:
+            containers.append(_container_from_cli(json.loads(line)))
+        except ValueError:
+            continue
+    return containers
+
+
+def inspect_container(container: str) -> dict[str, Any] | None:
+    """
+    Get the low-level information of a container (GET /containers/{id}/json).
+
+    Args:
+        container (str): The container id or name.
+
+    Returns:
+        dict[str, Any] | None: The container information, or None if it does not
+        exist or cannot be inspected.
+    """
+    client = get_engine_client()
+    if client is not None:
+        try:
+            return client.api.inspect_container(container)
+        except NotFound:
+            return None
+        except DockerException as e:
+            logging.error(f"Error inspecting container {container}: {e}")
+            return None
+
+    output = _run_docker_cli(["container", "inspect", container])
+    try:
+        return json.loads(output)[0] if output else None
+    except (ValueError, IndexError):
+        return None
+
+
+def stop_container(container: str, timeout: int = 10) -> bool:
+    """
+    Stop a container, killing it if it does not exit within the timeout.
+
+    Args:
+        container (str): The container id or name.
+        timeout (int): Seconds the container gets to exit before being killed.
+
+    Returns:
+        bool: True if the container is stopped.
+    """
+    client = get_engine_client()
+    if client is not None:
+        try:
+            client.api.stop(container, timeout=timeout)
+            return True
+        except DockerException as e:
+            logging.error(f"Error stopping container {container}: {e}")
+            return False
+    return _run_docker_cli(["stop", "--time", str(timeout), container]) is not None
+
+
+def stream_events(
+    filters: dict[str, list[str]] | None = None,
+    since: float | None = None,
+    until: float | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Stream the daemon events (GET /events) until the until time, until the caller
+    stops iterating, or until the stream breaks off.
+
+    Args:
+        filters (dict[str, list[str]], optional): Engine filters,
+            e.g. {"type": ["container"]}.
+        since (float, optional): Unix timestamp of the first event to return.
+        until (float, optional): Unix timestamp at which the stream ends.
+
+    Yields:
+        dict[str, Any]: The decoded events.
+    """
+    client = get_engine_client()
+    if client is not None:
+        try:
+            stream = client.api.events(
+                since=since, until=until, filters=filters, decode=True
+            )
+        except (DockerException, requests.exceptions.RequestException) as e:
+            logging.error(f"Error streaming Docker events: {e}")
+            return
+        try:
+            yield from stream
+        except (DockerException, requests.exceptions.RequestException) as e:
+            logging.error(f"Docker event stream broke off: {e}")
+        finally:
+            stream.close()
+        return
+
+    command = ["docker", "events", "--format", "{{json .}}", *_filter_args(filters)]
+    if since is not None:
+        command.extend(["--since", f"{since:.3f}"])
+    if until is not None:
+        command.extend(["--until", f"{until:.3f}"])
+    if not is_user_root() and platform.system().lower() == "linux":
+        command.insert(0, "sudo")
+    try:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+    except OSError as e:
+        logging.error(f"Error running 'docker events': {e}")
+        return
+    try:
+        for line in process.stdout:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+    finally:
+        process.kill()
+        process.wait()
+
+
+def get_container_readiness(container: dict[str, Any]) -> str:
+    """
+    Classify a container of the Engine API container list by readiness.
+
+    Args:
+        container (dict[str, Any]): The container, as returned by list_containers.
+
+    Returns:
+        str: "ready" if running (and healthy when it has a healthcheck), "failed"
+        if it exited, died or is unhealthy, "starting" otherwise.
+    """
+    state = container.get("State", "")
+    status = container.get("Status", "")
+    if state == "running":
+        if "(unhealthy)" in status:
+            return "failed"
+        if "(health: starting)" in status:
+            return "starting"
+        return "ready"
+    if state in ("exited", "dead", "removing"):
+        return "failed"
+    return "starting"
+
+
+def get_inspected_readiness(info: dict[str, Any]) -> str:
+    """
+    Classify an inspected container by readiness, like get_container_readiness.
+
+    Args:
+        info (dict[str, Any]): The container, as returned by inspect_container.
+
+    Returns:
+        str: "ready", "failed" or "starting".
+    """
+    state = info.get("State") or {}
+    status = state.get("Status", "")
+    if status == "running":
+        health = (state.get("Health") or {}).get("Status")
+        if health == "unhealthy":
+            return "failed"
+        if health == "starting":
+            return "starting"
+        return "ready"
+    if status in ("exited", "dead", "removing"):
+        return "failed"
+    return "starting"
+
+
+def _apply_event(readiness: dict[str, str], event: dict[str, Any]) -> None:
+    actor = event.get("Actor") or {}
+    name = (actor.get("Attributes") or {}).get("name")
+    if not name:
+        return
+    action = event.get("Action", "")
+    if action == "create":
+        readiness[name] = "starting"
+    elif action == "start":
+        info = inspect_container(actor.get("ID") or name)
+        readiness[name] = get_inspected_readiness(info) if info else "starting"
+    elif action.startswith("health_status"):
+        health = action.partition(":")[2].strip()
+        readiness[name] = {"healthy": "ready", "unhealthy": "failed"}.get(
+            health, "starting"
+        )
+    elif action in ("die", "oom"):
+        readiness[name] = "failed"
+    elif action == "destroy":
+        readiness.pop(name, None)
+
+
+def _is_settled(readiness: dict[str, str]) -> bool:
+    states = set(readiness.values())
+    return "failed" in states or (bool(readiness) and states == {"ready"})
+
+
+def wait_for_containers(
+    filters: dict[str, list[str]],
+    timeout: float = 120,
+    empty_grace: float = EMPTY_WAIT_GRACE,
+    retry_delay: float = 1.0,
+) -> dict[str, str] | None:
+    """
+    Wait until every container matching the filters is ready.
+
+    The containers are listed once, then the wait follows the container events
+    (start, health_status, die, ...) of the daemon instead of listing them again.
+    They are only listed again when the event stream breaks off. The wait ends as
+    soon as all containers are ready, as soon as one of them fails, when the
+    containers cannot be listed, when no container matches the filters after the
+    empty grace period, or when the timeout expires.
+
+    Args:
+        filters (dict[str, list[str]]): Engine filters selecting the containers,
+            e.g. a compose project label.
+        timeout (float): Seconds to wait at most.
+        empty_grace (float): Seconds to keep waiting while no container matches.
+        retry_delay (float): Seconds to wait before listing the containers again
+            when the event stream breaks off.
+
+    Returns:
+        dict[str, str] | None: The readiness of each container by name, see
+        get_container_readiness, or None if the containers cannot be listed.
+    """
+    started_at = time.monotonic()
+    deadline = started_at + timeout
+    event_filters = {**filters, "type": ["container"], "event": READINESS_EVENTS}
+    readiness = None
+    since = time.time()
+    while True:
+        if readiness is None:
+            since = time.time()
+            containers = list_containers(filters=filters, all_containers=True)
+            if containers is None:
+                return None
+            readiness = {
+                (container.get("Names") or [""])[0].lstrip("/"): (
+                    get_container_readiness(container)
+                )
+                for container in containers
+            }
+        if _is_settled(readiness):
+            return readiness
+        now = time.monotonic()
+        if not readiness and now - started_at >= empty_grace:
+            logging.warning(f"No containers match {filters} after {empty_grace}s")
+            return readiness
+        if now >= deadline:
+            logging.warning(f"Containers matching {filters} not ready after {timeout}s")
+            return readiness
+
+        window_end = min(deadline, now + EVENT_WINDOW)
+        if not readiness:
+            window_end = min(window_end, started_at + empty_grace)
+        until = time.time() + (window_end - now)
+        events = stream_events(event_filters, since=since, until=until)
+        try:
+            for event in events:
+                _apply_event(readiness, event)
+                if _is_settled(readiness):
+                    return readiness
+        finally:
+            events.close()
+        if time.time() < until:
+            # The stream broke off before its end, list the containers again
+            time.sleep(min(retry_delay, max(deadline - time.monotonic(), 0)))
+            readiness = None
+        else:
+            since = until
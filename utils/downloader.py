@@ -4,6 +4,8 @@ import os
 
 import requests
 
+from utils.networker import get_http_session
+
 
 def download_file(url: str, dest_path: str) -> None:
     """
@@ -18,7 +20,7 @@ def download_file(url: str, dest_path: str) -> None:
     """
     try:
         logging.info(f"Starting download from {url}")
-        response = requests.get(url, stream=True)
+        response = get_http_session().get(url, stream=True)
         response.raise_for_status()
 
         # Create the directory if it doesn't exist
@@ -2,21 +2,153 @@ import argparse
 import json
 import logging
 import os
+import shutil
+import threading
 from typing import Any
 
+from utils.loader import (
+    CONFIG_EXTENDS_KEY,
+    get_config_base_path,
+    load_json_config,
+    make_config_overlay,
+)
 
-def write_json(data: dict[str, Any], filename: str) -> None:
+
+def write_file_if_changed(content: str | bytes, filename: str) -> bool:
     """
-    Write data to a JSON file.
+    Atomically write content to a file, skipping the write if the file already holds it.
+
+    The content is written to a temporary file in the same directory, flushed to
+    disk with fsync and renamed over the target, so a crash mid-write never
+    leaves a truncated file behind. The permissions of an existing file are kept.
+
+    Arguments:
+    content -- the text or bytes to write
+    filename -- the file to write the content to
+
+    Returns:
+    True if the file was written, False if it was already up to date
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    try:
+        with open(filename, "rb") as existing_file:
+            if existing_file.read() == data:
+                logging.debug(f"{filename} is unchanged, not rewriting it")
+                return False
+    except OSError:
+        pass  # Missing or unreadable, write it
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    tmp_path = os.path.join(
+        directory,
+        f".{os.path.basename(filename)}.{os.getpid()}.{threading.get_ident()}.tmp",
+    )
+    try:
+        with open(tmp_path, "wb") as tmp_file:
+            tmp_file.write(data)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        if os.path.exists(filename):
+            shutil.copymode(filename, tmp_path)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself (not supported on Windows)
+    try:
+        directory_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return True
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+    return True
+
+
+def _keep_config_overlay(data: Any, filename: str) -> Any:
+    """
+    Turn a full config back into a sparse overlay if the file it replaces is one.
+    """
+    if not isinstance(data, dict) or CONFIG_EXTENDS_KEY in data:
+        return data
+    try:
+        with open(filename) as existing_file:
+            existing = json.load(existing_file)
+    except (OSError, ValueError):
+        return data
+    if not isinstance(existing, dict):
+        return data
+    base_path = get_config_base_path(filename, existing)
+    if base_path is None:
+        return data
+    base = load_json_config(base_path)
+    return {
+        CONFIG_EXTENDS_KEY: existing[CONFIG_EXTENDS_KEY],
+        **make_config_overlay(base, data),
+    }
+
+
+def write_json_overlay(data: dict[str, Any], base_path: str, filename: str) -> bool:
+    """
+    Write a config as a sparse overlay holding only its differences from a base config.
+
+    The base path is stored relative to the overlay file, so the loader merges
+    the current base config each time the overlay is loaded.
+
+    Arguments:
+    data -- the full config to write
+    base_path -- the path of the base config file
+    filename -- the file to write the overlay to
+
+    Returns:
+    True if the file was written, False if it was already up to date
+    """
+    base = load_json_config(base_path)
+    directory = os.path.dirname(os.path.abspath(filename))
+    try:
+        relative_base_path = os.path.relpath(os.path.abspath(base_path), directory)
+    except ValueError:
+        # Different drives on Windows
+        relative_base_path = os.path.abspath(base_path)
+    overlay = {
+        CONFIG_EXTENDS_KEY: relative_base_path.replace(os.sep, "/"),
+        **make_config_overlay(base, data),
+    }
+    return write_json(overlay, filename)
+
+
+def write_json(data: dict[str, Any], filename: str, compact: bool = False) -> bool:
+    """
+    Write data to a JSON file, atomically and only if its content changed.
+
+    If the file is a sparse config overlay, the data is written back as an
+    overlay of the same base config instead of a full copy.
 
     Arguments:
     data -- the data to write
     filename -- the file to write the data to
+    compact -- write without indentation or whitespace (default: False)
+
+    Returns:
+    True if the file was written, False if it was already up to date
     """
     try:
-        with open(filename, "w") as json_file:
-            json.dump(data, json_file, indent=4)
-        logging.info(f"Data written to {filename} successfully!")
+        data = _keep_config_overlay(data, filename)
+        if compact:
+            content = json.dumps(data, separators=(",", ":"))
+        else:
+            content = json.dumps(data, indent=4)
+        written = write_file_if_changed(content, filename)
+        if written:
+            logging.info(f"Data written to {filename} successfully!")
+        return written
     except Exception as e:
         logging.error(f"Error writing to {filename}: {e}")
         raise
@@ -4,13 +4,15 @@ import time
 
 from colorama import Fore, Style, just_fix_windows_console
 
+from utils.checker import ImageResolutionContext, get_image_lock_path
 from utils.cls import cls
 from utils.dumper import write_json
 from utils.fn_startStack import start_all_stacks
 from utils.fn_stopStack import stop_all_stacks
-from utils.generator import assemble_docker_compose, generate_env_file
+from utils.generator import apply_configured_compose_layout, generate_instance_files
 from utils.loader import load_json_config
 from utils.prompt_helper import ask_question_yn
+from utils.validator import report_generated_files
 
 
 def update_multiproxy_instances(
@@ -70,6 +72,11 @@ def update_multiproxy_instances(
     # Stop all stacks
     stop_all_stacks(skip_questions=True)
 
+    # Share image resolutions between the main instance and all multiproxy instances
+    resolution_context = ImageResolutionContext(
+        lock_path=get_image_lock_path(user_config_path)
+    )
+
     # Update main instance proxy
     try:
         logging.info(f"Updating main instance proxy with {proxies[0]}")
@@ -93,17 +100,15 @@ def update_multiproxy_instances(
             f"{Fore.GREEN}Updated main instance proxy URL: {old_proxy} -> {new_proxy}{Style.RESET_ALL}"
         )
 
-        # Regenerate docker-compose.yaml file for the main instance
-        assemble_docker_compose(
+        # Regenerate docker-compose.yaml and .env files for the main instance
+        generate_instance_files(
             m4b_config_path,
             app_config_path,
             user_config_path,
             compose_output_path="./docker-compose.yaml",
+            env_output_path="./.env",
             is_main_instance=True,
-        )
-        # Reenerate .env file for the main instance
-        generate_env_file(
-            m4b_config_path, app_config_path, user_config_path, env_output_path="./.env"
+            resolution_context=resolution_context,
         )
     except Exception as e:
         logging.error(f"Failed to update main instance proxy: {str(e)}")
@@ -117,7 +122,11 @@ def update_multiproxy_instances(
         os.makedirs(instances_dir, exist_ok=True)
 
     # Check if there are any instances in the instances directory.
-    instances = os.listdir(instances_dir)
+    instances = [
+        instance
+        for instance in os.listdir(instances_dir)
+        if os.path.isdir(os.path.join(instances_dir, instance))
+    ]
     if not instances:
         logging.error(f"No instances found in instances directory '{instances_dir}'.")
         print(
@@ -180,21 +189,19 @@ def update_multiproxy_instances(
             f"{Fore.GREEN}Updated instance '{instance}' proxy URL: {old_proxy} -> {new_proxy}{Style.RESET_ALL}"
         )
 
-        # Regenerate docker-compose.yaml and .env files for the instance
-        assemble_docker_compose(
+        # Regenerate docker-compose.yaml and .env files, only if the instance changed
+        if not generate_instance_files(
             instance_m4b_config_path,
             instance_app_config_path,
             instance_user_config_path,
             compose_output_path=os.path.join(instance_dir, "docker-compose.yaml"),
-        )
-        generate_env_file(
-            instance_m4b_config_path,
-            instance_app_config_path,
-            instance_user_config_path,
             env_output_path=os.path.join(instance_dir, ".env"),
-        )
+            resolution_context=resolution_context,
+        ):
+            logging.info(f"Instance '{instance}' is unchanged, files not rewritten.")
 
-        time.sleep(sleep_time)
+    apply_configured_compose_layout(instances_dir, m4b_config_path)
+    report_generated_files(instances_dir=instances_dir)
 
     # Start all stacks
     start_all_stacks(skip_questions=True)
@@ -8,24 +8,32 @@ import re
 import shutil
 import stat
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
 from typing import Any
 
 from colorama import Fore, Style
 
 from utils import loader
+from utils.checker import ImageResolutionContext, get_image_lock_path
 from utils.cls import cls
-from utils.dumper import write_json
-from utils.fn_stopStack import stop_all_stacks
+from utils.dumper import write_file_if_changed, write_json, write_json_overlay
+from utils.fn_stopStack import stop_all_stacks, stop_replaced_layout
 from utils.generator import (
+    apply_configured_compose_layout,
     assemble_docker_compose,
+    collect_image_requests,
     generate_device_name,
     generate_env_file,
     generate_uuid,
+    get_compose_layout,
 )
+from utils.helper import show_spinner
 from utils.networker import find_next_available_port
 from utils.prompt_helper import ask_email, ask_question_yn, ask_string, ask_uuid
+from utils.validator import report_generated_files
 
 # Ensure the parent directory is in the sys.path
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -402,8 +410,10 @@ def configure_uuid(app: dict, flag_config: dict, config: dict):
             f"{Fore.BLUE}{Style.BRIGHT}{flag_config['claimURLBase']}{uuid}{Style.RESET_ALL}"
         )
         try:
-            with open(f"claim_instructions_{app['name'].lower()}.txt", "w") as f:
-                f.write(f"{flag_config['claimURLBase']}{uuid}")
+            write_file_if_changed(
+                f"{flag_config['claimURLBase']}{uuid}",
+                f"claim_instructions_{app['name'].lower()}.txt",
+            )
             print(
                 f"{Fore.GREEN}Claim instructions written to claim_instructions_{app['name'].lower()}.txt{Style.RESET_ALL}"
             )
@@ -856,22 +866,180 @@ def setup_watchtower(user_config: dict[str, Any]) -> None:
         logging.info("User disabled M4B built-in Watchtower.")
 
 
+def generate_multiproxy_instance(
+    instance: tuple[str, dict[str, Any], dict[str, Any], dict[str, Any]],
+    *,
+    resolution_context: ImageResolutionContext,
+    base_config_paths: dict[str, str] | None = None,
+) -> None:
+    """
+    Write the configuration files, docker-compose.yaml and .env of an allocated proxy
+    instance.
+
+    Args:
+        instance (tuple): The instance_dir, user_config, m4b_config and app_config
+            of the instance.
+        resolution_context (ImageResolutionContext): Image resolutions shared by all
+            the instances.
+        base_config_paths (dict, optional): Main config paths by file name
+            ("user-config.json", "m4b-config.json", "app-config.json"). The instance
+            configs are stored as sparse overlays of the given files instead of full
+            copies.
+    """
+    instance_dir, instance_user_config, instance_m4b_config, instance_app_config = (
+        instance
+    )
+    base_config_paths = base_config_paths or {}
+    instance_configs = {
+        "user-config.json": instance_user_config,
+        "m4b-config.json": instance_m4b_config,
+        "app-config.json": instance_app_config,
+    }
+    for filename, config in instance_configs.items():
+        instance_config_path = os.path.join(instance_dir, filename)
+        base_config_path = base_config_paths.get(filename)
+        if base_config_path and os.path.isfile(base_config_path):
+            write_json_overlay(config, base_config_path, instance_config_path)
+        else:
+            write_json(config, instance_config_path)
+
+    instance_user_config_path = os.path.join(instance_dir, "user-config.json")
+    instance_m4b_config_path = os.path.join(instance_dir, "m4b-config.json")
+    instance_app_config_path = os.path.join(instance_dir, "app-config.json")
+
+    assemble_docker_compose(
+        instance_m4b_config_path,
+        instance_app_config_path,
+        instance_user_config_path,
+        compose_output_path=os.path.join(instance_dir, "docker-compose.yaml"),
+        resolution_context=resolution_context,
+        show_progress=False,
+    )
+    generate_env_file(
+        instance_m4b_config_path,
+        instance_app_config_path,
+        instance_user_config_path,
+        env_output_path=os.path.join(instance_dir, ".env"),
+        show_progress=False,
+    )
+
+
+def generate_multiproxy_instances(
+    instances: list[tuple[str, dict[str, Any], dict[str, Any], dict[str, Any]]],
+    resolution_context: ImageResolutionContext,
+    max_workers: int | None = None,
+    base_config_paths: dict[str, str] | None = None,
+) -> list[str]:
+    """
+    Generate the files of the allocated proxy instances concurrently.
+
+    Threads are used so that every instance shares the same image resolution context;
+    the images are resolved once up front and the workers only render and write files.
+
+    Args:
+        instances (list): Tuples of (instance_dir, user_config, m4b_config, app_config).
+        resolution_context (ImageResolutionContext): Image resolutions shared by all
+            the instances.
+        max_workers (int, optional): Number of concurrent workers. Defaults to a value
+            based on the CPU count.
+        base_config_paths (dict, optional): Main config paths by file name, to store the
+            instance configs as sparse overlays.
+
+    Returns:
+        list[str]: The directories of the instances that failed to generate.
+    """
+    if not instances:
+        return []
+
+    # All instances share the same apps, resolve their images once before fanning out
+    image_requests = {}
+    for _, instance_user_config, instance_m4b_config, instance_app_config in instances:
+        default_docker_platform = instance_m4b_config["system"].get(
+            "default_docker_platform", "linux/amd64"
+        )
+        for request in collect_image_requests(
+            instance_app_config, instance_user_config, default_docker_platform
+        ):
+            image_requests[request] = True
+    resolution_context.resolve_many(list(image_requests))
+
+    if not max_workers or max_workers < 1:
+        max_workers = min(32, (os.cpu_count() or 1) + 4)
+    max_workers = min(max_workers, len(instances))
+    logging.info(
+        f"Generating {len(instances)} proxy instances with {max_workers} workers"
+    )
+
+    failed_instances = []
+    event = threading.Event()
+    spinner_thread = threading.Thread(
+        target=show_spinner,
+        args=(f"Generating {len(instances)} proxy instances...", event),
+    )
+    spinner_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    generate_multiproxy_instance,
+                    instance,
+                    resolution_context=resolution_context,
+                    base_config_paths=base_config_paths,
+                ): instance[0]
+                for instance in instances
+            }
+            for future in as_completed(futures):
+                instance_dir = futures[future]
+                try:
+                    future.result()
+                    logging.info(f"Generated proxy instance files in {instance_dir}")
+                except Exception as e:
+                    logging.error(
+                        f"Failed to generate proxy instance {instance_dir}: {e}"
+                    )
+                    failed_instances.append(instance_dir)
+    finally:
+        event.set()
+        spinner_thread.join()
+    return sorted(failed_instances)
+
+
 def setup_multiproxy_instances(
     user_config: dict[str, Any],
     app_config: dict[str, Any],
     m4b_config: dict[str, Any],
     proxies: list,
+    *,
+    resolution_context: ImageResolutionContext | None = None,
+    max_workers: int | None = None,
+    base_config_paths: dict[str, str] | None = None,
 ) -> None:
     """
     Setup multiple proxy instances based on the given proxies list.
 
+    Device names, project names, subnets and ports are allocated serially so they
+    stay unique across instances; the instance files are then generated in parallel.
+    When the paths of the main config files are given, each instance only stores
+    its differences from them (proxy, ports, subnet, names and UUIDs), so later
+    changes to the main configs reach every instance without running the setup again.
+
     Args:
         user_config (dict): The user configuration dictionary.
         app_config (dict): The app configuration dictionary.
         m4b_config (dict): The m4b configuration dictionary.
         proxies (list): List of proxy configurations.
+        resolution_context (ImageResolutionContext, optional): Image resolutions shared
+            by all the instances. A new context is used if not provided.
+        max_workers (int, optional): Number of instances generated concurrently.
+            Defaults to system.generation_workers from the m4b config, or to a value
+            based on the CPU count when that is null.
+        base_config_paths (dict, optional): Paths of the main config files the
+            instances extend, by file name ("user-config.json", "m4b-config.json",
+            "app-config.json").
     """
     instances_dir = "m4b_proxy_instances"
+    if resolution_context is None:
+        resolution_context = ImageResolutionContext(lock_path=get_image_lock_path())
     os.makedirs(instances_dir, exist_ok=True)
 
     base_device_name = user_config["device_info"]["device_name"]
@@ -909,6 +1077,8 @@ def setup_multiproxy_instances(
             print(
                 f"{Fore.YELLOW}Keeping existing instances alongside new ones.{Style.RESET_ALL}"
             )
+            # The kept instances are rewritten in the configured layout below
+            stop_replaced_layout(instances_dir, get_compose_layout(m4b_config))
 
     # Keep a global reservation set to avoid collisions with existing/main/new instances.
     reserved_ports = collect_assigned_ports(user_config)
@@ -919,18 +1089,21 @@ def setup_multiproxy_instances(
         )
         if os.path.isfile(existing_user_cfg):
             try:
-                existing_config = load_json_config(existing_user_cfg)
+                existing_config = loader.load_json_config(existing_user_cfg)
                 reserved_ports.update(collect_assigned_ports(existing_config))
             except Exception as e:
                 logging.warning(
                     f"Failed to preload ports from existing instance '{existing_instance}': {e}"
                 )
 
+    # Allocate names, subnets and ports serially, the generation itself runs in parallel
+    pending_instances = []
     for i, proxy in enumerate(proxies):
         logging.info(f"Creating instance {i + 1}/{len(proxies)} with proxy: {proxy}")
         instance_user_config = deepcopy(user_config)
         instance_m4b_config = deepcopy(m4b_config)
-        instance_app_config = deepcopy(app_config)
+        # The app config is only read while allocating, all instances share it
+        instance_app_config = app_config
 
         # Generate a unique suffix for device and project names
         while True:
@@ -1049,29 +1222,34 @@ def setup_multiproxy_instances(
         # Regenerate UUIDs for apps that require them
         regenerate_uuids_for_apps(instance_user_config, instance_app_config)
 
-        instance_user_config_path = os.path.join(instance_dir, "user-config.json")
-        instance_m4b_config_path = os.path.join(instance_dir, "m4b-config.json")
-        instance_app_config_path = os.path.join(instance_dir, "app-config.json")
-
-        write_json(instance_user_config, instance_user_config_path)
-        write_json(instance_m4b_config, instance_m4b_config_path)
-        write_json(instance_app_config, instance_app_config_path)
-
-        assemble_docker_compose(
-            instance_m4b_config_path,
-            instance_app_config_path,
-            instance_user_config_path,
-            compose_output_path=os.path.join(instance_dir, "docker-compose.yaml"),
+        pending_instances.append(
+            (
+                instance_dir,
+                instance_user_config,
+                instance_m4b_config,
+                instance_app_config,
+            )
         )
-        generate_env_file(
-            instance_m4b_config_path,
-            instance_app_config_path,
-            instance_user_config_path,
-            env_output_path=os.path.join(instance_dir, ".env"),
+
+    failed_instances = generate_multiproxy_instances(
+        pending_instances,
+        resolution_context=resolution_context,
+        max_workers=max_workers
+        or m4b_config.get("system", {}).get("generation_workers"),
+        base_config_paths=base_config_paths,
+    )
+    apply_configured_compose_layout(instances_dir, m4b_config)
+    report_generated_files(instances_dir=instances_dir)
+    if failed_instances:
+        print(
+            f"{Fore.RED}Failed to generate {len(failed_instances)} proxy instances: "
+            f"{', '.join(failed_instances)}. Check the logs for details."
+            f"{Style.RESET_ALL}"
         )
 
     print(
-        f"{Fore.GREEN}Created {len(proxies)} proxy instances with unique device names.{Style.RESET_ALL}"
+        f"{Fore.GREEN}Created {len(proxies) - len(failed_instances)} proxy instances "
+        f"with unique device names.{Style.RESET_ALL}"
     )
     print(f"{Fore.GREEN}Multiproxy instances setup completed.{Style.RESET_ALL}")
     time.sleep(sleep_time)
@@ -1164,12 +1342,17 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
             user_config["proxies"]["url"] = proxies.pop(-1)
             user_config["proxies"]["enabled"] = True
             write_json(user_config, user_config_path)
+            # Share image resolutions between the main and all multiproxy instances
+            resolution_context = ImageResolutionContext(
+                lock_path=get_image_lock_path(user_config_path)
+            )
             assemble_docker_compose(
                 m4b_config_path_or_dict=m4b_config,
                 app_config_path_or_dict=app_config,
                 user_config_path_or_dict=user_config,
                 compose_output_path="./docker-compose.yaml",
                 is_main_instance=True,
+                resolution_context=resolution_context,
             )
             generate_env_file(
                 m4b_config_path_or_dict=m4b_config,
@@ -1179,7 +1362,18 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
                 is_main_instance=True,
             )
 
-            setup_multiproxy_instances(user_config, app_config, m4b_config, proxies)
+            setup_multiproxy_instances(
+                user_config,
+                app_config,
+                m4b_config,
+                proxies,
+                resolution_context=resolution_context,
+                base_config_paths={
+                    "user-config.json": user_config_path,
+                    "m4b-config.json": m4b_config_path,
+                    "app-config.json": app_config_path,
+                },
+            )
             logging.info("Multiproxy instances setup completed")
         else:
             # Disable proxy if proxy setup is not selected
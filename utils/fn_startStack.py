@@ -4,17 +4,24 @@ import logging
 import os
 import platform
 import re
-import subprocess
 
 # Ensure the parent directory is in the sys.path
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from colorama import Fore, Style, just_fix_windows_console
 
 from utils import loader
-from utils.generator import generate_dashboard_urls
+from utils.docker_engine import list_containers, stop_container, wait_for_containers
+from utils.generator import (
+    COMPOSE_FLEET_FILENAME,
+    COMPOSE_PROJECT_LABEL,
+    generate_all_dashboard_urls,
+    get_compose_files,
+    load_instance_compose_config,
+)
 from utils.helper import (
     check_required_files,
     create_docker_group_if_needed,
@@ -43,6 +50,12 @@ sleep_time = m4b_config.get("system", {}).get(
     "sleep_time", 3
 )  # Default to 3 seconds if not specified
 
+# Number of proxy instances started at once
+stack_jobs = m4b_config.get("system", {}).get("stack_jobs", 4)
+
+# Seconds to wait for the containers of a started stack to be running or healthy
+ready_timeout = m4b_config.get("system", {}).get("ready_timeout", 120)
+
 
 def get_compose_project_name(env_file: str) -> str:
     """
@@ -96,11 +109,86 @@ def get_device_name_from_env(env_file: str) -> str:
     return device_name
 
 
+def has_healthchecks(compose_file: str) -> bool:
+    """
+    Check if any service of a compose file, including the layers it extends, has a
+    healthcheck.
+
+    Args:
+        compose_file (str): The path to the Docker Compose file.
+
+    Returns:
+        bool: True if at least one service defines an enabled healthcheck.
+    """
+    try:
+        services = load_instance_compose_config(compose_file).get("services") or {}
+    except Exception as e:
+        logging.warning(f"Could not read the services of {compose_file}: {e}")
+        return False
+    return any(
+        isinstance(service, dict)
+        and service.get("healthcheck")
+        and not service["healthcheck"].get("disable")
+        for service in services.values()
+    )
+
+
+def wait_for_stack(project_name: str, instance_name: str, timeout: float) -> bool:
+    """
+    Wait until every container of a compose project is running, or healthy if it has
+    a healthcheck.
+
+    Args:
+        project_name (str): The compose project name.
+        instance_name (str): The name of the instance, for messages.
+        timeout (float): Seconds to wait at most.
+
+    Returns:
+        bool: True if all containers are ready, False if one failed, was not ready
+        in time, none was found, or the containers could not be listed.
+    """
+    started_at = time.monotonic()
+    readiness = wait_for_containers(
+        {"label": [f"{COMPOSE_PROJECT_LABEL}={project_name}"]}, timeout
+    )
+    if readiness is None:
+        print(
+            f"{Fore.RED}Could not check the containers of '{instance_name}' "
+            f"instance.{Style.RESET_ALL}"
+        )
+        logging.error(f"Could not list the containers of project '{project_name}'")
+        return False
+    if not readiness:
+        print(
+            f"{Fore.RED}No containers found for '{instance_name}' "
+            f"instance.{Style.RESET_ALL}"
+        )
+        logging.error(f"No containers found for project '{project_name}'")
+        return False
+    not_ready = sorted(name for name, state in readiness.items() if state != "ready")
+    if not_ready:
+        details = ", ".join(f"{name} ({readiness[name]})" for name in not_ready)
+        print(
+            f"{Fore.RED}Containers of '{instance_name}' instance not ready: "
+            f"{details}{Style.RESET_ALL}"
+        )
+        logging.error(f"Containers of '{instance_name}' not ready: {details}")
+    else:
+        logging.info(
+            f"All {len(readiness)} containers of '{instance_name}' ready after "
+            f"{time.monotonic() - started_at:.1f}s"
+        )
+    return not not_ready
+
+
 def start_stack(
     compose_file: str = "./docker-compose.yaml",
     env_file: str = "./.env",
     instance_name: str = "money4band",
     skip_questions: bool = False,
+    *,
+    show_progress: bool = True,
+    wait_timeout: float | None = None,
 ) -> bool:
     """
     Start the Docker Compose stack using the provided compose and env files.
@@ -110,6 +198,10 @@ def start_stack(
         env_file (str): The path to the environment file.
         instance_name (str): The name of the instance.
         skip_questions (bool): Whether to skip the confirmation question.
+        show_progress (bool): Whether to show a spinner, disabled when stacks are
+            started concurrently.
+        wait_timeout (float, optional): Seconds to wait for the containers to be
+            running or healthy before reporting success, no wait if None or 0.
 
     Returns:
         bool: True if the stack started successfully, False otherwise.
@@ -132,7 +224,8 @@ def start_stack(
     spinner_thread = threading.Thread(
         target=show_spinner, args=(f"Starting stack for '{instance_name}'...", event)
     )
-    spinner_thread.start()
+    if show_progress:
+        spinner_thread.start()
 
     use_sudo = not is_user_root() and platform.system().lower() == "linux"
     try:
@@ -158,11 +251,25 @@ def start_stack(
                 f"COMPOSE_PROJECT_NAME not found in {env_file}, relying on Docker Compose defaults"
             )
 
-        command.extend(
-            ["-f", compose_file, "--env-file", env_file, "up", "-d", "--remove-orphans"]
-        )
+        compose_files = get_compose_files(compose_file)
+        for file in compose_files:
+            command.extend(["-f", file])
+        if len(compose_files) > 1:
+            # Relative paths in the shared base resolve against the instance directory
+            command.extend(
+                ["--project-directory", os.path.dirname(os.path.abspath(compose_file))]
+            )
+
+        command.extend(["--env-file", env_file, "up", "-d", "--remove-orphans"])
+        # Compose itself waits for the healthchecks, and reports unhealthy services
+        compose_waits = bool(wait_timeout) and has_healthchecks(compose_file)
+        if compose_waits:
+            command.extend(["--wait", "--wait-timeout", str(int(wait_timeout))])
 
         result = run_docker_command(command, use_sudo=use_sudo)
+        if result == 0 and wait_timeout and project_name and not compose_waits:
+            if not wait_for_stack(project_name, instance_name, wait_timeout):
+                result = 1
         if result == 0:
             print(
                 f"{Fore.GREEN}All Apps for '{instance_name}' instance started.{Style.RESET_ALL}"
@@ -175,20 +282,86 @@ def start_stack(
             logging.error(
                 f"Stack for '{instance_name}' failed to start with exit code {result}."
             )
-            time.sleep(sleep_time)
+            if show_progress:
+                time.sleep(sleep_time)
         return result == 0
     except Exception as e:
         print(
             f"{Fore.RED}An unexpected error occurred while starting the stack for '{instance_name}' instance.{Style.RESET_ALL}"
         )
         logging.error(f"Unexpected error: {str(e)}")
-        time.sleep(sleep_time)
+        if show_progress:
+            time.sleep(sleep_time)
     finally:
         event.set()
-        spinner_thread.join()
+        if show_progress:
+            spinner_thread.join()
     return False
 
 
+def start_instances(
+    instances: list[tuple[str, str, str]],
+    jobs: int | None = None,
+    wait_timeout: float | None = None,
+) -> dict[str, bool]:
+    """
+    Start the stacks of several proxy instances concurrently.
+
+    A failing instance does not prevent the others from starting.
+
+    Args:
+        instances (list): Tuples of (instance_name, compose_file, env_file).
+        jobs (int, optional): Number of stacks started at once.
+            Defaults to the configured stack_jobs.
+        wait_timeout (float, optional): Seconds each instance gets to be running or
+            healthy, no wait if None or 0.
+
+    Returns:
+        dict[str, bool]: Whether each instance started, by instance name.
+    """
+    if not instances:
+        return {}
+    if not jobs or jobs < 1:
+        jobs = stack_jobs
+    jobs = min(jobs, len(instances))
+    logging.info(f"Starting {len(instances)} proxy instances with {jobs} workers")
+
+    results = {}
+    event = threading.Event()
+    spinner_thread = threading.Thread(
+        target=show_spinner,
+        args=(f"Starting {len(instances)} proxy instances...", event),
+    )
+    spinner_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(
+                    start_stack,
+                    compose_file,
+                    env_file,
+                    instance_name,
+                    skip_questions=True,
+                    show_progress=False,
+                    wait_timeout=wait_timeout,
+                ): instance_name
+                for instance_name, compose_file, env_file in instances
+            }
+            for future in as_completed(futures):
+                instance_name = futures[future]
+                try:
+                    results[instance_name] = future.result()
+                except Exception as e:
+                    logging.error(f"Error starting instance '{instance_name}': {e}")
+                    results[instance_name] = False
+                if not results[instance_name]:
+                    logging.error(f"Failed to start instance '{instance_name}'")
+    finally:
+        event.set()
+        spinner_thread.join()
+    return dict(sorted(results.items()))
+
+
 def start_all_stacks(
     main_compose_file: str = "./docker-compose.yaml",
     main_env_file: str = "./.env",
@@ -196,6 +369,9 @@ def start_all_stacks(
     instances_dir: str = "m4b_proxy_instances",
     skip_questions: bool = False,
     force_clean: bool = False,
+    *,
+    jobs: int | None = None,
+    wait_timeout: float | None = None,
 ) -> None:
     """
     Start the main stack and all multi-proxy instances.
@@ -207,7 +383,12 @@ def start_all_stacks(
         instances_dir (str): The directory containing the proxy instances.
         skip_questions (bool): Whether to skip the confirmation question.
         force_clean (bool): Whether to stop all containers before starting.
+        jobs (int, optional): Number of proxy instances started at once.
+            Defaults to the configured stack_jobs.
+        wait_timeout (float, optional): Seconds each stack gets to be running or
+            healthy. Defaults to the configured ready_timeout, 0 disables the wait.
     """
+    wait_timeout = ready_timeout if wait_timeout is None else wait_timeout
     if not skip_questions and not ask_question_yn(
         f"This will launch all the apps for '{main_instance_name}' and any multi-proxy instances using the configured .env files and docker-compose.yaml files. Docker must be already installed and running. Do you wish to proceed?"
     ):
@@ -227,17 +408,22 @@ def start_all_stacks(
             return
 
         print(f"{Fore.YELLOW}Stopping all Docker containers...{Style.RESET_ALL}")
-        subprocess.run(["docker", "stop", "$(docker ps -q)"], check=False, shell=True)
+        containers = list_containers()
+        if containers is None:
+            print(
+                f"{Fore.RED}Could not list the Docker containers. Please check that "
+                f"Docker is running.{Style.RESET_ALL}"
+            )
+            return
+        for container in containers:
+            stop_container(container["Id"])
         print(f"{Fore.GREEN}All containers stopped.{Style.RESET_ALL}")
 
     # Check for any running containers that might conflict
-    result = subprocess.run(
-        ["docker", "ps", "--format", "{{.Names}}"],
-        check=False,
-        capture_output=True,
-        text=True,
-    )
-    running_containers = result.stdout.splitlines()
+    running_containers = [
+        (container.get("Names") or [""])[0].lstrip("/")
+        for container in list_containers() or []
+    ]
 
     # Print warning if any containers already exist
     if running_containers:
@@ -339,45 +525,64 @@ def start_all_stacks(
             )
 
         # Start main stack
+        # The proxy instances are only started once the main stack is up
         all_started = start_stack(
-            main_compose_file, main_env_file, main_instance_name, skip_questions=True
+            main_compose_file,
+            main_env_file,
+            main_instance_name,
+            skip_questions=True,
+            wait_timeout=wait_timeout,
         )
 
-        # Wait a moment for main stack to initialize
-        time.sleep(3)
-
-        # Start proxy instances
-        if all_started and os.path.isdir(instances_dir):
-            for instance in os.listdir(instances_dir):
+        # Start proxy instances, all at once if they are generated as one fleet project
+        fleet_compose_file = os.path.join(instances_dir, COMPOSE_FLEET_FILENAME)
+        if all_started and os.path.isfile(fleet_compose_file):
+            print(
+                f"{Fore.YELLOW}Starting all multi-proxy instances as one fleet project"
+                f"{Style.RESET_ALL}"
+            )
+            all_started &= start_stack(
+                fleet_compose_file,
+                os.path.join(instances_dir, ".env"),
+                "multi-proxy fleet",
+                skip_questions=True,
+                wait_timeout=wait_timeout,
+            )
+        elif all_started and os.path.isdir(instances_dir):
+            instances = []
+            for instance in sorted(os.listdir(instances_dir)):
                 instance_dir = os.path.join(instances_dir, instance)
                 compose_file = os.path.join(instance_dir, "docker-compose.yaml")
                 env_file = os.path.join(instance_dir, ".env")
                 if os.path.isfile(compose_file) and os.path.isfile(env_file):
-                    try:
-                        print(
-                            f"{Fore.YELLOW}Starting instance: {instance}{Style.RESET_ALL}"
-                        )
-                        instance_started = start_stack(
-                            compose_file, env_file, instance, skip_questions=True
-                        )
-                        all_started &= instance_started
-                        if not instance_started:
-                            logging.error(f"Failed to start instance '{instance}'")
-
-                        # Add small delay between instance starts to prevent race conditions
-                        time.sleep(2)
-                    except Exception as e:
-                        all_started = False
-                        logging.error(f"Error starting instance '{instance}': {str(e)}")
+                    instances.append((instance, compose_file, env_file))
+            results = start_instances(instances, jobs, wait_timeout)
+            failed_instances = [
+                name for name, started in results.items() if not started
+            ]
+            if failed_instances:
+                all_started = False
+                print(
+                    f"{Fore.RED}Failed to start {len(failed_instances)} of "
+                    f"{len(results)} proxy instances: {', '.join(failed_instances)}. "
+                    f"Check the logs for details.{Style.RESET_ALL}"
+                )
+            elif results:
+                print(
+                    f"{Fore.GREEN}All {len(results)} proxy instances started."
+                    f"{Style.RESET_ALL}"
+                )
 
         if all_started:
-            generate_dashboard_urls(None, None, main_env_file)
+            generate_all_dashboard_urls(main_env_file, instances_dir)
             print(
                 f"{Fore.YELLOW}Use the previously generated apps nodes URLs to add your device in any apps dashboard that require node claiming/registration (e.g., Earnapp, ProxyRack, etc.){Style.RESET_ALL}"
             )
             logging.info("All stacks started.")
     finally:
-        time.sleep(sleep_time)
+        # Let the user read the outcome before the menu is redrawn
+        if not skip_questions:
+            time.sleep(sleep_time)
 
 
 def get_container_names_from_env(env_file):
@@ -473,7 +678,14 @@ def validate_env_files(main_env_file: str, instances_dir: str) -> bool:
     return True
 
 
-def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> None:
+def main(
+    app_config_path: str,
+    m4b_config_path: str,
+    user_config_path: str,
+    *,
+    jobs: int | None = None,
+    wait_timeout: float | None = None,
+) -> None:
     try:
         m4b_config = loader.load_json_config(m4b_config_path)
         user_config = loader.load_json_config(user_config_path)
@@ -492,7 +704,9 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
             time.sleep(sleep_time)
             return
 
-        start_all_stacks(main_instance_name=base_instance_name)
+        start_all_stacks(
+            main_instance_name=base_instance_name, jobs=jobs, wait_timeout=wait_timeout
+        )
     except FileNotFoundError as e:
         logging.error(f"File not found: {str(e)}")
         print(f"{Fore.RED}File not found: {str(e)}{Style.RESET_ALL}")
@@ -531,6 +745,23 @@ if __name__ == "__main__":
     parser.add_argument(
         "--force-clean", action="store_true", help="Stop all containers before starting"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help=(
+            "Number of proxy instances started at once (defaults to system.stack_jobs)"
+        ),
+    )
+    parser.add_argument(
+        "--ready-timeout",
+        type=float,
+        default=None,
+        help=(
+            "Seconds each stack gets to be running or healthy, 0 to not wait "
+            "(defaults to system.ready_timeout)"
+        ),
+    )
     args = parser.parse_args()
 
     log_level = getattr(logging, args.log_level.upper(), None)
@@ -552,6 +783,8 @@ if __name__ == "__main__":
             app_config_path=args.app_config,
             m4b_config_path=args.m4b_config,
             user_config_path=args.user_config,
+            jobs=args.jobs,
+            wait_timeout=args.ready_timeout,
         )
         logging.info("fn_startStack script completed successfully")
     except FileNotFoundError as e:
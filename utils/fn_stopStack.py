@@ -8,11 +8,15 @@ import platform
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any
 
 from colorama import Fore, Style, just_fix_windows_console
 
 from utils import loader
+from utils.generator import COMPOSE_FLEET_FILENAME, get_compose_files
 from utils.helper import (
+    COMMAND_TIMEOUT_EXIT_CODE,
     check_required_files,
     create_docker_group_if_needed,
     is_user_in_docker_group,
@@ -41,6 +45,12 @@ sleep_time = m4b_config.get("system", {}).get(
     "sleep_time", 3
 )  # Default to 3 seconds if not specified
 
+# Number of proxy instances stopped at once, seconds allowed per instance teardown
+# and seconds containers get to exit before being killed
+stack_jobs = m4b_config.get("system", {}).get("stack_jobs", 4)
+stack_stop_timeout = m4b_config.get("system", {}).get("stack_stop_timeout", 300)
+stop_grace_period = m4b_config.get("system", {}).get("stop_grace_period", 10)
+
 
 def get_compose_project_name(env_file: str) -> str:
     """
@@ -72,10 +82,59 @@ def get_compose_project_name(env_file: str) -> str:
     return project_name
 
 
+def get_stop_command(compose_file: str, grace_period: int | None = None) -> list[str]:
+    """
+    Build the docker compose command tearing down the stack of a compose file.
+
+    Args:
+        compose_file (str): The path to the Docker Compose file.
+        grace_period (int, optional): Seconds containers get to exit before being
+            killed.
+
+    Returns:
+        list[str]: The docker compose down command.
+    """
+    # Get the env file path based on the compose file directory
+    compose_dir = os.path.dirname(compose_file)
+    if compose_dir == "":
+        compose_dir = "."
+    env_file = os.path.join(compose_dir, ".env")
+
+    # Read COMPOSE_PROJECT_NAME from the .env file
+    project_name = get_compose_project_name(env_file)
+
+    # Build the docker compose command, adding -p flag if project_name was found
+    command = ["docker", "compose"]
+
+    if project_name:
+        command.extend(["-p", project_name])
+        logging.info(f"Using project name '{project_name}' for {compose_file}")
+    else:
+        logging.warning(
+            f"COMPOSE_PROJECT_NAME not found in {env_file}, relying on Docker Compose "
+            "defaults"
+        )
+
+    compose_files = get_compose_files(compose_file)
+    for file in compose_files:
+        command.extend(["-f", file])
+    if len(compose_files) > 1:
+        # Relative paths in the shared base resolve against the instance directory
+        command.extend(
+            ["--project-directory", os.path.dirname(os.path.abspath(compose_file))]
+        )
+
+    command.append("down")
+    if grace_period is not None:
+        command.extend(["--timeout", str(grace_period)])
+    return command
+
+
 def stop_stack(
     compose_file: str = "./docker-compose.yaml",
     instance_name: str = "money4band",
     skip_questions: bool = False,
+    grace_period: int | None = None,
 ) -> bool:
     """
     Stop the Docker Compose stack using the provided compose file.
@@ -84,6 +143,8 @@ def stop_stack(
         compose_file (str): The path to the Docker Compose file.
         instance_name (str): The name of the instance.
         skip_questions (bool): Whether to skip the confirmation question.
+        grace_period (int, optional): Seconds containers get to exit before being
+            killed.
 
     Returns:
         bool: True if the stack stopped successfully, False otherwise.
@@ -110,29 +171,7 @@ def stop_stack(
 
     use_sudo = not is_user_root() and platform.system().lower() == "linux"
     try:
-        # Get the env file path based on the compose file directory
-        compose_dir = os.path.dirname(compose_file)
-        if compose_dir == "":
-            compose_dir = "."
-        env_file = os.path.join(compose_dir, ".env")
-
-        # Read COMPOSE_PROJECT_NAME from the .env file
-        project_name = get_compose_project_name(env_file)
-
-        # Build the docker compose command, adding -p flag if project_name was found
-        command = ["docker", "compose"]
-
-        if project_name:
-            command.extend(["-p", project_name])
-            logging.info(
-                f"Using project name '{project_name}' for stopping instance '{instance_name}'"
-            )
-        else:
-            logging.warning(
-                f"COMPOSE_PROJECT_NAME not found in {env_file}, relying on Docker Compose defaults"
-            )
-
-        command.extend(["-f", compose_file, "down"])
+        command = get_stop_command(compose_file, grace_period)
 
         result = run_docker_command(command, use_sudo=use_sudo)
         if result == 0:
@@ -159,11 +198,221 @@ def stop_stack(
     return False
 
 
+def stop_instance(
+    compose_file: str,
+    instance_name: str,
+    *,
+    timeout: float | None = None,
+    grace_period: int | None = None,
+) -> dict[str, Any]:
+    """
+    Tear down the stack of a proxy instance without a spinner, for concurrent use.
+
+    Args:
+        compose_file (str): The path to the Docker Compose file.
+        instance_name (str): The name of the instance.
+        timeout (float, optional): Seconds after which the teardown is abandoned.
+        grace_period (int, optional): Seconds containers get to exit before being
+            killed.
+
+    Returns:
+        dict: The "status" ("stopped", "failed" or "timed out") and "duration" in
+        seconds.
+    """
+    use_sudo = not is_user_root() and platform.system().lower() == "linux"
+    started_at = time.monotonic()
+    try:
+        result = run_docker_command(
+            get_stop_command(compose_file, grace_period),
+            use_sudo=use_sudo,
+            timeout=timeout,
+        )
+    except Exception as e:
+        logging.error(f"Failed to stop instance '{instance_name}': {e}")
+        result = None
+    if result == 0:
+        status = "stopped"
+        logging.info(f"Stack for '{instance_name}' stopped successfully.")
+    elif result == COMMAND_TIMEOUT_EXIT_CODE:
+        status = "timed out"
+        logging.error(f"Stack for '{instance_name}' did not stop within {timeout}s.")
+    else:
+        status = "failed"
+        logging.error(f"Stack for '{instance_name}' failed to stop: {result}")
+    return {"status": status, "duration": time.monotonic() - started_at}
+
+
+def stop_instances(
+    instances: list[tuple[str, str]],
+    *,
+    jobs: int | None = None,
+    timeout: float | None = None,
+    grace_period: int | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    Tear down the stacks of several proxy instances concurrently.
+
+    Args:
+        instances (list): Tuples of (instance_name, compose_file).
+        jobs (int, optional): Number of stacks stopped at once.
+            Defaults to the configured stack_jobs.
+        timeout (float, optional): Seconds allowed per instance.
+            Defaults to the configured stack_stop_timeout.
+        grace_period (int, optional): Seconds containers get to exit before being
+            killed. Defaults to the configured stop_grace_period.
+
+    Returns:
+        dict: The result of stop_instance for each instance, by instance name.
+    """
+    if not instances:
+        return {}
+    if not jobs or jobs < 1:
+        jobs = stack_jobs
+    jobs = min(jobs, len(instances))
+    timeout = stack_stop_timeout if timeout is None else timeout
+    grace_period = stop_grace_period if grace_period is None else grace_period
+    logging.info(f"Stopping {len(instances)} proxy instances with {jobs} workers")
+
+    results = {}
+    event = threading.Event()
+    spinner_thread = threading.Thread(
+        target=show_spinner,
+        args=(f"Stopping {len(instances)} proxy instances...", event),
+    )
+    spinner_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(
+                    stop_instance,
+                    compose_file,
+                    instance_name,
+                    timeout=timeout,
+                    grace_period=grace_period,
+                ): instance_name
+                for instance_name, compose_file in instances
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    finally:
+        event.set()
+        spinner_thread.join()
+    return dict(sorted(results.items()))
+
+
+def format_stop_summary(results: dict[str, dict[str, Any]]) -> str:
+    """
+    Format the results of stop_instances as a table.
+
+    Args:
+        results (dict): The result of each instance, by instance name.
+
+    Returns:
+        str: The summary table.
+    """
+    colors = {"stopped": Fore.GREEN, "failed": Fore.RED, "timed out": Fore.YELLOW}
+    width = max([len("Instance"), *(len(name) for name in results)])
+    lines = [f"{'Instance':<{width}}  {'Status':<9}  {'Time (s)':>8}"]
+    for name, result in results.items():
+        status = result["status"]
+        lines.append(
+            f"{name:<{width}}  {colors[status]}{status:<9}{Style.RESET_ALL}  "
+            f"{result['duration']:>8.1f}"
+        )
+    counts = {
+        status: sum(result["status"] == status for result in results.values())
+        for status in colors
+    }
+    lines.append(
+        f"{counts['stopped']} stopped, {counts['failed']} failed, "
+        f"{counts['timed out']} timed out"
+    )
+    return "\n".join(lines)
+
+
+def get_instance_compose_files(instances_dir: str) -> list[tuple[str, str]]:
+    """
+    List the compose files of the proxy instances.
+
+    Args:
+        instances_dir (str): The directory containing the proxy instances.
+
+    Returns:
+        list[tuple[str, str]]: Tuples of (instance_name, compose_file), sorted by name.
+    """
+    instances = []
+    for instance in sorted(os.listdir(instances_dir)):
+        compose_file = os.path.join(instances_dir, instance, "docker-compose.yaml")
+        if os.path.isfile(compose_file):
+            instances.append((instance, compose_file))
+    return instances
+
+
+def stop_replaced_layout(
+    instances_dir: str,
+    layout: str,
+    *,
+    jobs: int | None = None,
+    timeout: float | None = None,
+    grace_period: int | None = None,
+) -> None:
+    """
+    Tear down the compose projects of the current multiproxy layout if the new one
+    replaces them.
+
+    The fleet layout runs every instance in one project, the other layouts run
+    one project per instance. Switching between them would leave the old
+    projects running under their old names, out of reach of stop_all_stacks.
+    Call this before the new layout is applied.
+
+    Args:
+        instances_dir (str): The directory containing the proxy instances.
+        layout (str): The layout about to be applied: "full", "override" or
+            "fleet".
+        jobs (int, optional): Number of proxy instances stopped at once.
+            Defaults to the configured stack_jobs.
+        timeout (float, optional): Seconds allowed per proxy instance.
+            Defaults to the configured stack_stop_timeout.
+        grace_period (int, optional): Seconds containers get to exit before being
+            killed. Defaults to the configured stop_grace_period.
+    """
+    if not os.path.isdir(instances_dir):
+        return
+    grace_period = stop_grace_period if grace_period is None else grace_period
+    fleet_compose_file = os.path.join(instances_dir, COMPOSE_FLEET_FILENAME)
+    fleet_applied = os.path.isfile(fleet_compose_file)
+    if fleet_applied and layout != "fleet":
+        logging.info(
+            f"Compose layout changed to '{layout}', stopping the fleet project"
+        )
+        stop_stack(
+            fleet_compose_file,
+            "multi-proxy fleet",
+            skip_questions=True,
+            grace_period=grace_period,
+        )
+    elif not fleet_applied and layout == "fleet":
+        instances = get_instance_compose_files(instances_dir)
+        if not instances:
+            return
+        logging.info(
+            "Compose layout changed to 'fleet', stopping the instance projects"
+        )
+        results = stop_instances(
+            instances, jobs=jobs, timeout=timeout, grace_period=grace_period
+        )
+        print(format_stop_summary(results))
+
+
 def stop_all_stacks(
     main_compose_file: str = "./docker-compose.yaml",
     main_instance_name: str = "money4band",
     instances_dir: str = "m4b_proxy_instances",
     skip_questions: bool = False,
+    *,
+    jobs: int | None = None,
+    timeout: float | None = None,
+    grace_period: int | None = None,
 ) -> None:
     """
     Stop the main stack and all multi-proxy instances.
@@ -173,7 +422,14 @@ def stop_all_stacks(
         main_instance_name (str): The name of the main instance.
         instances_dir (str): The directory containing the proxy instances.
         skip_questions (bool): Whether to skip the confirmation question.
+        jobs (int, optional): Number of proxy instances stopped at once.
+            Defaults to the configured stack_jobs.
+        timeout (float, optional): Seconds allowed per proxy instance.
+            Defaults to the configured stack_stop_timeout.
+        grace_period (int, optional): Seconds containers get to exit before being
+            killed. Defaults to the configured stop_grace_period.
     """
+    grace_period = stop_grace_period if grace_period is None else grace_period
     if not skip_questions and not ask_question_yn(
         f"This will stop all the apps for '{main_instance_name}' and any multi-proxy instances and delete the docker stacks previously created. Do you wish to proceed?"
     ):
@@ -185,27 +441,55 @@ def stop_all_stacks(
         create_docker_group_if_needed()
 
     try:
-        stop_stack(main_compose_file, main_instance_name, skip_questions=True)
-        if os.path.isdir(instances_dir):
+        stop_stack(
+            main_compose_file,
+            main_instance_name,
+            skip_questions=True,
+            grace_period=grace_period,
+        )
+        fleet_compose_file = os.path.join(instances_dir, COMPOSE_FLEET_FILENAME)
+        if os.path.isfile(fleet_compose_file):
+            print(
+                f"{Fore.YELLOW}Stopping the multi-proxy fleet project..."
+                f"{Style.RESET_ALL}"
+            )
+            stop_stack(
+                fleet_compose_file,
+                "multi-proxy fleet",
+                skip_questions=True,
+                grace_period=grace_period,
+            )
+        elif os.path.isdir(instances_dir):
             print(f"{Fore.YELLOW}Stopping multi-proxy instances...{Style.RESET_ALL}")
-            for instance in os.listdir(instances_dir):
-                instance_dir = os.path.join(instances_dir, instance)
-                compose_file = os.path.join(instance_dir, "docker-compose.yaml")
-                if os.path.isfile(compose_file):
-                    try:
-                        stop_stack(compose_file, instance, skip_questions=True)
-                    except Exception as e:
-                        logging.error(f"Failed to stop instance '{instance}': {str(e)}")
-            print(f"{Fore.GREEN}All multi-proxy instances stopped.{Style.RESET_ALL}")
+            instances = get_instance_compose_files(instances_dir)
+            results = stop_instances(
+                instances, jobs=jobs, timeout=timeout, grace_period=grace_period
+            )
+            if results:
+                print(format_stop_summary(results))
+            if all(result["status"] == "stopped" for result in results.values()):
+                print(
+                    f"{Fore.GREEN}All multi-proxy instances stopped.{Style.RESET_ALL}"
+                )
         else:
             logging.warning(
                 f"Multi-proxy instances directory '{instances_dir}' does not exist."
             )
     finally:
-        time.sleep(sleep_time)
+        # Let the user read the outcome before the menu is redrawn
+        if not skip_questions:
+            time.sleep(sleep_time)
 
 
-def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> None:
+def main(
+    app_config_path: str,
+    m4b_config_path: str,
+    user_config_path: str,
+    *,
+    jobs: int | None = None,
+    timeout: float | None = None,
+    grace_period: int | None = None,
+) -> None:
     try:
         m4b_config = loader.load_json_config(m4b_config_path)
         user_config = loader.load_json_config(user_config_path)
@@ -216,14 +500,21 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
         # Check if required files exist before proceeding
         missing = check_required_files(
             ["./docker-compose.yaml"],
-            error_message="Cannot stop the stack. The following required files are missing:",
+            error_message=(
+                "Cannot stop the stack. The following required files are missing:"
+            ),
             hint_message="It looks like there is nothing to stop.",
         )
         if missing:
             time.sleep(sleep_time)
             return
 
-        stop_all_stacks(main_instance_name=base_instance_name)
+        stop_all_stacks(
+            main_instance_name=base_instance_name,
+            jobs=jobs,
+            timeout=timeout,
+            grace_period=grace_period,
+        )
     except FileNotFoundError as e:
         logging.error(f"File not found: {str(e)}")
         print(f"{Fore.RED}File not found: {str(e)}{Style.RESET_ALL}")
@@ -259,6 +550,32 @@ if __name__ == "__main__":
     parser.add_argument(
         "--skip-questions", action="store_true", help="Skip confirmation questions"
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help=(
+            "Number of proxy instances stopped at once (defaults to system.stack_jobs)"
+        ),
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help=(
+            "Seconds allowed per proxy instance teardown "
+            "(defaults to system.stack_stop_timeout)"
+        ),
+    )
+    parser.add_argument(
+        "--grace-period",
+        type=int,
+        default=None,
+        help=(
+            "Seconds containers get to exit before being killed "
+            "(defaults to system.stop_grace_period)"
+        ),
+    )
     args = parser.parse_args()
 
     log_level = getattr(logging, args.log_level.upper(), None)
@@ -280,6 +597,9 @@ if __name__ == "__main__":
             app_config_path=args.app_config,
             m4b_config_path=args.m4b_config,
             user_config_path=args.user_config,
+            jobs=args.jobs,
+            timeout=args.timeout,
+            grace_period=args.grace_period,
         )
         logging.info("fn_stopStack script completed successfully")
     except FileNotFoundError as e:
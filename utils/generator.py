@@ -1,8 +1,14 @@
+import argparse
 import copy
+import hashlib
+import ipaddress
+import json
 import logging
 import os
+import posixpath
 import re
 import secrets
+import shutil
 import subprocess
 import sys
 import threading
@@ -11,16 +17,124 @@ from typing import Any
 
 import yaml  # Import PyYAML
 
-from utils.checker import check_img_arch_support, get_compatible_tag
-from utils.dumper import write_json
+from utils.checker import (
+    ImageResolutionContext,
+    get_image_lock_path,
+    get_image_reference,
+)
+from utils.docker_engine import list_containers
+from utils.dumper import write_file_if_changed, write_json
 from utils.helper import show_spinner
-from utils.loader import load_json_config
+from utils.loader import load_json_config, make_config_overlay
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
+# File storing the fingerprint of the inputs of the files generated in a directory
+GENERATION_FINGERPRINT_FILENAME = ".m4b-fingerprint"
+
+# Shared compose file of the multiproxy instances in the "override" compose layout,
+# named after its content so overrides never point to a half-updated base, with the
+# compose format as extension
+COMPOSE_BASE_FILENAME_PREFIX = "docker-compose.base."
+# Top-level extension key of an instance override file pointing to the shared base
+COMPOSE_BASE_KEY = "x-m4b-base"
+# Single compose project running every multiproxy instance in the "fleet" compose layout
+COMPOSE_FLEET_FILENAME = "docker-compose.fleet.yaml"
+COMPOSE_LAYOUTS = ("full", "override", "fleet")
+# First lines of an override file in YAML or JSON format, holding the base reference
+COMPOSE_BASE_PATTERN = re.compile(rf'^\s*"?{COMPOSE_BASE_KEY}"?\s*:\s*"?([^"\s,]+)')
+
+# Compose files can be written as YAML or as JSON, which Compose also accepts
+COMPOSE_FORMATS = ("yaml", "json")
+# Use the libyaml bindings when PyYAML was built with them
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Variable references interpolated by Docker Compose: $$, ${VAR}, ${VAR:-default},
+# ${VAR-default}, $VAR
+ENV_REFERENCE_PATTERN = re.compile(
+    r"\$\$|\$\{([A-Za-z_][A-Za-z0-9_]*)(?:(:?-)([^}]*))?\}|\$([A-Za-z_][A-Za-z0-9_]*)"
+)
+
+# Timing of the healthchecks generated from the app-config "healthcheck" field
+HEALTHCHECK_DEFAULTS = {
+    "interval": "30s",
+    "timeout": "5s",
+    "retries": 3,
+    "start_period": "60s",
+}
+
+# Labels Docker Compose sets on the containers it creates
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+COMPOSE_SERVICE_LABEL = "com.docker.compose.service"
+
+# Changes to the generator itself must invalidate previously generated files
+with open(os.path.abspath(__file__), "rb") as _generator_source:
+    GENERATOR_SOURCE_DIGEST = hashlib.sha256(_generator_source.read()).hexdigest()
+
+
+def dump_compose_config(config: dict[str, Any], compose_format: str = "yaml") -> str:
+    """
+    Serialize a compose configuration.
+
+    Args:
+        config (dict[str, Any]): The compose configuration.
+        compose_format (str, optional): "yaml" or "json". Defaults to "yaml".
+
+    Returns:
+        str: The serialized compose configuration.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if compose_format == "json":
+        return json.dumps(config, indent=2) + "\n"
+    if compose_format != "yaml":
+        raise ValueError(
+            f"Unknown compose format '{compose_format}', expected one of "
+            f"{', '.join(COMPOSE_FORMATS)}"
+        )
+    return yaml.dump(
+        config, Dumper=YAML_DUMPER, sort_keys=False, default_flow_style=False
+    )
+
+
+def parse_yaml(content: str, loader_class: type = YAML_LOADER) -> Any:
+    """
+    Parse a YAML document with one of the safe loaders, like yaml.safe_load.
+
+    Args:
+        content (str): The YAML document.
+        loader_class (type, optional): yaml.SafeLoader or yaml.CSafeLoader.
+            Defaults to YAML_LOADER.
+
+    Returns:
+        Any: The parsed document.
+    """
+    loader = loader_class(content)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def load_compose_content(content: str) -> dict[str, Any]:
+    """
+    Parse a compose configuration written in YAML or JSON format.
+
+    Args:
+        content (str): The serialized compose configuration.
+
+    Returns:
+        dict[str, Any]: The compose configuration.
+    """
+    if content.lstrip().startswith("{"):
+        return json.loads(content)
+    return parse_yaml(content) or {}
+
 
 def substitute_port_placeholders(
     port_placeholders: list[str], actual_ports: list[int]
@@ -61,6 +175,63 @@ def substitute_port_placeholders(
     return new_ports
 
 
+def build_healthcheck(healthcheck: dict[str, Any]) -> dict[str, Any]:
+    """
+    Build the compose healthcheck of an app from its app-config "healthcheck" field.
+
+    The probes only use builtins of /bin/sh, so they also run in busybox images:
+    "process" looks for a process name in /proc (as truncated to 15 characters by
+    the kernel) and "port" for a TCP socket listening on a local port. Images
+    without a shell cannot run them, such apps get no "healthcheck" field, or
+    {"disable": true} to turn off the one of the image.
+    A compose "test" can also be given as is. Timing keys (interval, timeout,
+    retries, start_period) override HEALTHCHECK_DEFAULTS.
+
+    Args:
+        healthcheck (dict[str, Any]): The app healthcheck, e.g. {"port": 4449} or
+            {"process": "earnapp"}.
+
+    Returns:
+        dict[str, Any]: The compose healthcheck.
+
+    Raises:
+        ValueError: If no probe is defined.
+    """
+    if healthcheck.get("disable"):
+        return {"disable": True}
+    if "test" in healthcheck:
+        test = healthcheck["test"]
+    elif "port" in healthcheck:
+        # Listening sockets (state 0A) of /proc/net/tcp[6] on the port, in hex.
+        # "$$" escapes "$" from the Compose interpolation.
+        port = f"{int(healthcheck['port']):04X}"
+        test = [
+            "CMD-SHELL",
+            "for t in /proc/net/tcp /proc/net/tcp6; do "
+            '[ -r "$$t" ] || continue; '
+            "while read -r _ addr _ state _; do "
+            f"case \"$$addr $$state\" in *:{port}' '0A) exit 0;; esac; "
+            'done < "$$t"; done; exit 1',
+        ]
+    elif "process" in healthcheck:
+        test = [
+            "CMD-SHELL",
+            "for f in /proc/[0-9]*/comm; do "
+            f'read -r n < "$$f" && [ "$$n" = \'{healthcheck["process"]}\' ] '
+            "&& exit 0; done; exit 1",
+        ]
+    else:
+        raise ValueError(f"Healthcheck without a test, port or process: {healthcheck}")
+
+    return {
+        "test": test,
+        **{
+            key: healthcheck.get(key, default)
+            for key, default in HEALTHCHECK_DEFAULTS.items()
+        },
+    }
+
+
 def validate_uuid(uuid: str, length: int) -> bool:
     """
     Validate a UUID against the specified length.
@@ -94,49 +265,117 @@ def generate_uuid(length: int) -> str:
     return str(os.urandom(length // 2 + 1).hex())[:length]
 
 
+def collect_image_requests(
+    app_config: dict[str, Any],
+    user_config: dict[str, Any],
+    default_docker_platform: str,
+) -> list[tuple[str, str, str, str]]:
+    """
+    Collect the images that need to be resolved for the enabled apps.
+
+    Args:
+        app_config (dict[str, Any]): The app configuration dictionary.
+        user_config (dict[str, Any]): The user configuration dictionary.
+        default_docker_platform (str): The platform to fall back to for emulation.
+
+    Returns:
+        list[tuple[str, str, str, str]]: Unique tuples of (image_name, image_tag,
+            docker_platform, default_docker_platform) in app order.
+    """
+    image_requests = {}
+    for category in ["apps", "extra-apps"]:
+        for app in app_config.get(category, []):
+            user_app_config = user_config.get("apps", {}).get(app["name"].lower(), {})
+            if not user_app_config.get("enabled"):
+                continue
+            image_name, image_tag = app["compose_config"]["image"].split(":")
+            docker_platform = user_app_config.get(
+                "docker_platform", default_docker_platform
+            )
+            image_requests[
+                (image_name, image_tag, docker_platform, default_docker_platform)
+            ] = True
+    return list(image_requests)
+
+
 def assemble_docker_compose(
     m4b_config_path_or_dict: Any,
     app_config_path_or_dict: Any,
     user_config_path_or_dict: Any,
     compose_output_path: str = str(os.path.join(os.getcwd(), "docker-compose.yaml")),
     is_main_instance: bool = False,
-) -> None:
+    *,
+    resolution_context: ImageResolutionContext | None = None,
+    show_progress: bool = True,
+    dry_run: bool = False,
+) -> dict[str, Any]:
     """
     Assemble a Docker Compose file based on the app and user configuration.
 
     Args:
-        m4b_config_path_or_dict (Any): The path to the m4b configuration file or the config dictionary.
-        app_config_path_or_dict (Any): The path to the app configuration file or the config dictionary.
-        user_config_path_or_dict (Any): The path to the user configuration file or the config dictionary.
+        m4b_config_path_or_dict (Any): The path to the m4b configuration file or
+            the config dictionary.
+        app_config_path_or_dict (Any): The path to the app configuration file or
+            the config dictionary.
+        user_config_path_or_dict (Any): The path to the user configuration file or
+            the config dictionary.
         compose_output_path (str, optional): The path to save the assembled docker-compose.yaml file. Defaults to './docker-compose.yaml'.
-        is_main_instance (bool, optional): Whether this is the main instance. Defaults to False.
+        is_main_instance (bool, optional): Whether this is the main instance.
+            Defaults to False.
+        resolution_context (ImageResolutionContext, optional): Image resolutions shared
+            across the instances generated in the same run. A new context is used if
+            not provided.
+        show_progress (bool, optional): Whether to show a spinner while assembling.
+            Defaults to True.
+        dry_run (bool, optional): Only return the compose configuration, without
+            writing the compose file, the image lockfile or apps disabled for
+            incompatibility. Defaults to False.
+
+    Returns:
+        dict[str, Any]: The assembled compose configuration.
 
     Raises:
         Exception: If an error occurs during the assembly process.
     """
     event = threading.Event()
-    spinner_thread = threading.Thread(
-        target=show_spinner, args=("Assembling Docker Compose file...", event)
-    )
-    spinner_thread.start()
+    spinner_thread = None
+    if show_progress:
+        spinner_thread = threading.Thread(
+            target=show_spinner, args=("Assembling Docker Compose file...", event)
+        )
+        spinner_thread.start()
 
     try:
         m4b_config = load_json_config(m4b_config_path_or_dict)
         app_config = load_json_config(app_config_path_or_dict)
         user_config = load_json_config(user_config_path_or_dict)
+        if dry_run:
+            # Apps disabled for incompatibility must not leak into the caller's config
+            user_config = copy.deepcopy(user_config)
 
         default_docker_platform = m4b_config["system"].get(
             "default_docker_platform", "linux/amd64"
         )
         proxy_enabled = user_config["proxies"].get("enabled", False)
+        if resolution_context is None:
+            resolution_context = ImageResolutionContext(
+                lock_path=get_image_lock_path(
+                    user_config_path_or_dict
+                    if isinstance(user_config_path_or_dict, str)
+                    else None
+                ),
+                dry_run=dry_run,
+            )
 
         services = {}
         disabled_apps_due_to_incompatibility = []
-        apps_categories = ["apps"]
         # Overrides extra apps exclusion from m4b proxies instances
-        apps_categories.append("extra-apps")
-        if is_main_instance:
-            apps_categories.append("extra-apps")
+        apps_categories = ["apps", "extra-apps"]
+
+        # Resolve all enabled apps' images concurrently before building the services
+        resolution_context.resolve_many(
+            collect_image_requests(app_config, user_config, default_docker_platform)
+        )
 
         # Collect ports for proxy service if proxy is enabled
         proxy_ports = []
@@ -161,68 +400,38 @@ def assemble_docker_compose(
                         "docker_platform", default_docker_platform
                     )
 
-                    arch_support = check_img_arch_support(
-                        image_name, image_tag, docker_platform
+                    resolution = resolution_context.resolve(
+                        image_name, image_tag, docker_platform, default_docker_platform
                     )
 
-                    if arch_support is None:
-                        # Cannot determine compatibility (e.g., GHCR images without PAT)
-                        # Fallback to default platform (linux/amd64) for safety - emulation will be used if needed
-                        app_compose_config["platform"] = default_docker_platform
+                    if resolution is None:
+                        logging.error(
+                            "Please check the image tag and architecture "
+                            f"compatibility on the registry. Disabling {app_name}..."
+                        )
+                        user_app_config["enabled"] = False
+                        user_config["apps"][app_name] = user_app_config
+                        if isinstance(user_config_path_or_dict, str) and not dry_run:
+                            write_json(user_config, user_config_path_or_dict)
                         logging.info(
-                            f"Cannot verify architecture support for {image_name}. "
-                            f"Falling back to default platform {default_docker_platform} for emulation compatibility."
+                            f"{app_name} has been disabled in user-config.json due "
+                            "to lack of compatible image tag."
                         )
-                    elif not arch_support:
-                        compatible_tag = get_compatible_tag(image_name, docker_platform)
-                        if compatible_tag:
-                            app_compose_config["image"] = (
-                                f"{image_name}:{compatible_tag}"
-                            )
-                            # Add platform also on all already compatible images tags
-                            app_compose_config["platform"] = docker_platform
-                            logging.info(
-                                f"Updated {app_name} to compatible tag: {compatible_tag}"
-                            )
-                        else:
-                            logging.warning(
-                                f"No compatible tag found for {image_name} with architecture {docker_platform}. Searching for a suitable tag for default emulation architecture {default_docker_platform}."
-                            )
-                            # find a compatibile tag with default docker platform
-                            compatible_tag = get_compatible_tag(
-                                image_name, default_docker_platform
-                            )
-                            if compatible_tag:
-                                app_compose_config["image"] = (
-                                    f"{image_name}:{compatible_tag}"
-                                )
-                                # Add platform to the compose configuration to force image pull for emulation
-                                app_compose_config["platform"] = default_docker_platform
-                                logging.warning(
-                                    f"Compatible tag found to run {image_name} with emulation on {default_docker_platform} architecture. Using binfmt emulation for {app_name} with image {image_name}:{image_tag}"
-                                )
-                            else:
-                                error_msg = (
-                                    f"No compatible tag found for {image_name} either with "
-                                    f"specified architecture {docker_platform} or with default "
-                                    f"architecture {default_docker_platform}."
-                                )
-                                logging.error(error_msg)
-                                logging.error(
-                                    f"Please check the image tag and architecture compatibility "
-                                    f"on the registry. Disabling {app_name}..."
-                                )
-                                user_app_config["enabled"] = False
-                                user_config["apps"][app_name] = user_app_config
-                                write_json(user_config, user_config_path_or_dict)
-                                logging.info(
-                                    f"{app_name} has been disabled in user-config.json due to lack of compatible image tag."
-                                )
-                                disabled_apps_due_to_incompatibility.append(app_name)
-                                continue  # Do not add the app to the compose file
-                    elif arch_support:
-                        # Add platform only when we've confirmed the image supports it
-                        app_compose_config["platform"] = docker_platform
+                        disabled_apps_due_to_incompatibility.append(app_name)
+                        continue  # Do not add the app to the compose file
+
+                    if resolution["image"] != image:
+                        logging.info(
+                            f"Updated {app_name} to compatible image: "
+                            f"{resolution['image']}"
+                        )
+                    if resolution["emulation"]:
+                        logging.warning(
+                            f"Using binfmt emulation for {app_name} on "
+                            f"{resolution['platform']}"
+                        )
+                    app_compose_config["image"] = get_image_reference(resolution)
+                    app_compose_config["platform"] = resolution["platform"]
 
                     if proxy_enabled:
                         app_proxy_compose = app.get("compose_config_proxy", {})
@@ -296,8 +505,22 @@ def assemble_docker_compose(
                             if app_compose_config[key] is None:
                                 del app_compose_config[key]
 
+                    if (
+                        app.get("healthcheck")
+                        and "healthcheck" not in app_compose_config
+                    ):
+                        app_compose_config["healthcheck"] = build_healthcheck(
+                            app["healthcheck"]
+                        )
+
                     services[app_name] = app_compose_config
 
+        # Record the digests pinned and the tags looked up while resolving this
+        # instance's images
+        if not dry_run:
+            resolution_context.save_image_lock()
+            resolution_context.save_image_index()
+
         # Add common services only if this is the main instance
         compose_config_common = user_config.get("compose_config_common", {})
         if is_main_instance:
@@ -419,8 +642,16 @@ def assemble_docker_compose(
         # Append network configuration at the bottom
         compose_dict.update(network_config)
 
-        with open(compose_output_path, "w") as f:
-            yaml.dump(compose_dict, f, sort_keys=False, default_flow_style=False)
+        if dry_run:
+            return compose_dict
+
+        write_file_if_changed(
+            dump_compose_config(
+                compose_dict,
+                m4b_config.get("files", {}).get("compose_format", "yaml"),
+            ),
+            compose_output_path,
+        )
         logging.info(
             f"Docker Compose file assembled and saved to {compose_output_path}"
         )
@@ -434,12 +665,14 @@ def assemble_docker_compose(
             for app in disabled_apps_due_to_incompatibility:
                 print(f"- {app}")
             time.sleep(2 * m4b_config.get("system", {}).get("sleep_time", 2))
+        return compose_dict
     except Exception as e:
         logging.error(f"Error during Docker Compose assembly: {e}")
         raise
     finally:
         event.set()
-        spinner_thread.join()
+        if spinner_thread is not None:
+            spinner_thread.join()
 
 
 def generate_env_file(
@@ -448,25 +681,41 @@ def generate_env_file(
     user_config_path_or_dict: Any,
     env_output_path: str = str(os.path.join(os.getcwd(), ".env")),
     is_main_instance: bool = False,
-) -> None:
+    *,
+    show_progress: bool = True,
+    dry_run: bool = False,
+) -> str:
     """
     Generate a .env file based on the m4b and user configuration.
 
     Args:
-        m4b_config_path_or_dict (Any): The path to the m4b configuration file or the config dictionary.
-        app_config_path_or_dict (Any): The path to the app configuration file or the config dictionary.
-        user_config_path_or_dict (Any): The path to the user configuration file or the config dictionary.
+        m4b_config_path_or_dict (Any): The path to the m4b configuration file or
+            the config dictionary.
+        app_config_path_or_dict (Any): The path to the app configuration file or
+            the config dictionary.
+        user_config_path_or_dict (Any): The path to the user configuration file or
+            the config dictionary.
         env_output_path (str, optional): The path to save the generated .env file. Defaults to './.env'.
-        is_main_instance (bool, optional): Whether this is the main instance. Defaults to False.
+        is_main_instance (bool, optional): Whether this is the main instance.
+            Defaults to False.
+        show_progress (bool, optional): Whether to show a spinner while generating.
+            Defaults to True.
+        dry_run (bool, optional): Only return the content, without writing the file.
+            Defaults to False.
+
+    Returns:
+        str: The content of the .env file.
 
     Raises:
         Exception: If an error occurs during the file generation process.
     """
     event = threading.Event()
-    spinner_thread = threading.Thread(
-        target=show_spinner, args=("Generating .env file...", event)
-    )
-    spinner_thread.start()
+    spinner_thread = None
+    if show_progress:
+        spinner_thread = threading.Thread(
+            target=show_spinner, args=("Generating .env file...", event)
+        )
+        spinner_thread.start()
 
     try:
         m4b_config = load_json_config(m4b_config_path_or_dict)
@@ -562,13 +811,1141 @@ def generate_env_file(
                                 env_lines.append(f"{app_name.upper()}_PORT={port}")
                                 env_lines.append(f"{app_lower.upper()}_PORT={port}")
 
+        env_content = "\n".join(env_lines)
+        if dry_run:
+            return env_content
+
         # Write to .env file
-        with open(env_output_path, "w") as f:
-            f.write("\n".join(env_lines))
+        write_file_if_changed(env_content, env_output_path)
         logging.info(f".env file generated and saved to {env_output_path}")
+        return env_content
     finally:
         event.set()
-        spinner_thread.join()
+        if spinner_thread is not None:
+            spinner_thread.join()
+
+
+def get_generation_fingerprint_path(compose_output_path: str) -> str:
+    """
+    Get the path of the fingerprint file stored next to the generated files.
+
+    Args:
+        compose_output_path (str): The path of the generated docker-compose.yaml file.
+
+    Returns:
+        str: The fingerprint file path.
+    """
+    return os.path.join(
+        os.path.dirname(os.path.abspath(compose_output_path)),
+        GENERATION_FINGERPRINT_FILENAME,
+    )
+
+
+def get_instance_config_slice(
+    app_config: dict[str, Any],
+    user_config: dict[str, Any],
+    is_main_instance: bool = False,
+) -> dict[str, Any]:
+    """
+    Get the parts of the app and user configs an instance's compose and .env files
+    depend on.
+
+    Only the enabled apps are kept, and settings that only reach the main
+    instance (Watchtower, the dashboard) or that are disabled are left out, so
+    unrelated edits do not change the fingerprint of every instance.
+
+    Args:
+        app_config (dict[str, Any]): The app configuration dictionary.
+        user_config (dict[str, Any]): The user configuration dictionary.
+        is_main_instance (bool, optional): Whether this is the main instance.
+            Defaults to False.
+
+    Returns:
+        dict[str, Any]: The configuration slice.
+    """
+    user_apps = user_config.get("apps", {})
+    enabled_apps = {
+        category: [
+            [app, user_apps[app["name"].lower()]]
+            for app in app_config.get(category, [])
+            if user_apps.get(app["name"].lower(), {}).get("enabled")
+        ]
+        for category in ["apps", "extra-apps"]
+    }
+
+    def enabled_section(key: str) -> Any:
+        section = user_config.get(key, {})
+        return section if section.get("enabled") else None
+
+    proxies = user_config.get("proxies", {})
+    compose_config_common = user_config.get("compose_config_common", {})
+    common_services = {"network": True, "proxy_service": proxies.get("enabled")}
+    if is_main_instance:
+        common_services["watchtower_service"] = user_config.get(
+            "watchtower", {}
+        ).get("enabled", True)
+        common_services["m4b_dashboard_service"] = bool(
+            enabled_section("m4b_dashboard")
+        )
+    return {
+        "apps": enabled_apps,
+        "proxies": proxies,
+        "resource_limits": user_config.get("resource_limits"),
+        "device_info": user_config.get("device_info"),
+        "notifications": enabled_section("notifications"),
+        "m4b_dashboard": enabled_section("m4b_dashboard"),
+        "watchtower": common_services.get("watchtower_service"),
+        "compose_config_common": {
+            key: compose_config_common.get(key)
+            for key, used in common_services.items()
+            if used
+        },
+    }
+
+
+def compute_generation_fingerprint(
+    m4b_config_path_or_dict: Any,
+    app_config_path_or_dict: Any,
+    user_config_path_or_dict: Any,
+    compose_output_path: str,
+    env_output_path: str,
+    *,
+    is_main_instance: bool = False,
+    resolution_context: ImageResolutionContext | None = None,
+) -> str:
+    """
+    Compute the fingerprint of everything the generated compose and .env files depend
+    on.
+
+    The fingerprint is a content hash of the configuration slices read by the
+    generator for this instance (see get_instance_config_slice), the resolved
+    image decisions, the output names and the generator code itself.
+
+    Args:
+        m4b_config_path_or_dict (Any): The path to the m4b configuration file or
+            the config dictionary.
+        app_config_path_or_dict (Any): The path to the app configuration file or
+            the config dictionary.
+        user_config_path_or_dict (Any): The path to the user configuration file or
+            the config dictionary.
+        compose_output_path (str): The path of the docker-compose.yaml file.
+        env_output_path (str): The path of the .env file.
+        is_main_instance (bool, optional): Whether this is the main instance.
+            Defaults to False.
+        resolution_context (ImageResolutionContext, optional): Image resolutions shared
+            across the instances generated in the same run. A new context is used if
+            not provided.
+
+    Returns:
+        str: The hex digest fingerprint.
+    """
+    m4b_config = load_json_config(m4b_config_path_or_dict)
+    app_config = load_json_config(app_config_path_or_dict)
+    user_config = load_json_config(user_config_path_or_dict)
+    if resolution_context is None:
+        resolution_context = ImageResolutionContext()
+
+    default_docker_platform = m4b_config.get("system", {}).get(
+        "default_docker_platform", "linux/amd64"
+    )
+    image_requests = collect_image_requests(
+        app_config, user_config, default_docker_platform
+    )
+    resolution_context.resolve_many(image_requests)
+
+    fingerprint_inputs = {
+        "generator": GENERATOR_SOURCE_DIGEST,
+        "m4b_config": {
+            key: m4b_config.get(key)
+            for key in ["project", "network", "watchtower", "files"]
+        },
+        "default_docker_platform": default_docker_platform,
+        "config": get_instance_config_slice(
+            app_config, user_config, is_main_instance
+        ),
+        "resolutions": [
+            [list(request), resolution_context.resolve(*request)]
+            for request in image_requests
+        ],
+        "is_main_instance": is_main_instance,
+        "outputs": [
+            os.path.basename(compose_output_path),
+            os.path.basename(env_output_path),
+        ],
+    }
+    return hashlib.sha256(
+        json.dumps(fingerprint_inputs, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def generate_instance_files(
+    m4b_config_path_or_dict: Any,
+    app_config_path_or_dict: Any,
+    user_config_path_or_dict: Any,
+    compose_output_path: str = str(os.path.join(os.getcwd(), "docker-compose.yaml")),
+    env_output_path: str = str(os.path.join(os.getcwd(), ".env")),
+    *,
+    is_main_instance: bool = False,
+    resolution_context: ImageResolutionContext | None = None,
+    backup_dir: str | None = None,
+    force: bool = False,
+) -> bool:
+    """
+    Generate the docker-compose.yaml and .env files of an instance, unless they are up
+    to date.
+
+    A fingerprint of the inputs is stored next to the outputs. When it matches
+    the current inputs and both outputs exist, nothing is written at all.
+
+    Args:
+        m4b_config_path_or_dict (Any): The path to the m4b configuration file or
+            the config dictionary.
+        app_config_path_or_dict (Any): The path to the app configuration file or
+            the config dictionary.
+        user_config_path_or_dict (Any): The path to the user configuration file or
+            the config dictionary.
+        compose_output_path (str, optional): The path to save the docker-compose.yaml
+            file. Defaults to './docker-compose.yaml'.
+        env_output_path (str, optional): The path to save the .env file.
+            Defaults to './.env'.
+        is_main_instance (bool, optional): Whether this is the main instance.
+            Defaults to False.
+        resolution_context (ImageResolutionContext, optional): Image resolutions shared
+            across the instances generated in the same run. A new context is used if
+            not provided.
+        backup_dir (str, optional): Directory where existing outputs are copied before
+            being replaced.
+        force (bool, optional): Regenerate even if the fingerprint is unchanged.
+            Defaults to False.
+
+    Returns:
+        bool: True if the files were regenerated, False if they were up to date.
+    """
+    if resolution_context is None:
+        resolution_context = ImageResolutionContext(
+            lock_path=get_image_lock_path(
+                user_config_path_or_dict
+                if isinstance(user_config_path_or_dict, str)
+                else None
+            )
+        )
+    fingerprint_args = (
+        m4b_config_path_or_dict,
+        app_config_path_or_dict,
+        user_config_path_or_dict,
+        compose_output_path,
+        env_output_path,
+    )
+    fingerprint_kwargs = {
+        "is_main_instance": is_main_instance,
+        "resolution_context": resolution_context,
+    }
+    fingerprint_path = get_generation_fingerprint_path(compose_output_path)
+    fingerprint = compute_generation_fingerprint(
+        *fingerprint_args, **fingerprint_kwargs
+    )
+
+    outputs = [compose_output_path, env_output_path]
+    if not force and all(os.path.exists(path) for path in outputs):
+        try:
+            with open(fingerprint_path) as f:
+                if f.read().strip() == fingerprint:
+                    logging.info(
+                        f"Inputs of {compose_output_path} and {env_output_path} are "
+                        "unchanged, skipping generation"
+                    )
+                    return False
+        except OSError:
+            pass
+
+    if backup_dir:
+        os.makedirs(backup_dir, exist_ok=True)
+        for path in outputs:
+            if os.path.exists(path):
+                try:
+                    shutil.copy2(path, os.path.join(backup_dir, os.path.basename(path)))
+                except OSError as e:
+                    logging.warning(f"Could not backup {path}: {e}")
+
+    assemble_docker_compose(
+        m4b_config_path_or_dict,
+        app_config_path_or_dict,
+        user_config_path_or_dict,
+        compose_output_path=compose_output_path,
+        is_main_instance=is_main_instance,
+        resolution_context=resolution_context,
+    )
+    generate_env_file(
+        m4b_config_path_or_dict,
+        app_config_path_or_dict,
+        user_config_path_or_dict,
+        env_output_path=env_output_path,
+        is_main_instance=is_main_instance,
+    )
+
+    # Generation may have changed the user config (e.g. disabled incompatible apps)
+    fingerprint = compute_generation_fingerprint(
+        *fingerprint_args, **fingerprint_kwargs
+    )
+    write_file_if_changed(fingerprint, fingerprint_path)
+    return True
+
+
+def get_common_compose_config(configs: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Get the part shared by all the given compose configurations.
+
+    Only mappings are descended into; any other value (including lists) is
+    shared only if it is equal in every configuration, so an override built on
+    top of the result never needs Compose to merge two lists.
+
+    Args:
+        configs (list[dict[str, Any]]): The compose configurations.
+
+    Returns:
+        dict[str, Any]: The common compose configuration.
+    """
+
+    def intersect(a: dict[str, Any], b: dict[str, Any]) -> dict[str, Any]:
+        common = {}
+        for key, value in a.items():
+            if key not in b:
+                continue
+            if isinstance(value, dict) and isinstance(b[key], dict):
+                nested = intersect(value, b[key])
+                if nested:
+                    common[key] = nested
+            elif value == b[key]:
+                common[key] = value
+        return common
+
+    if not configs:
+        return {}
+    common = copy.deepcopy(configs[0])
+    for config in configs[1:]:
+        common = intersect(common, config)
+    return common
+
+
+def merge_compose_configs(
+    base: dict[str, Any], override: dict[str, Any]
+) -> dict[str, Any]:
+    """
+    Merge a compose override onto its base the way Compose merges disjoint files.
+
+    Args:
+        base (dict[str, Any]): The base compose configuration.
+        override (dict[str, Any]): The override compose configuration.
+
+    Returns:
+        dict[str, Any]: The merged compose configuration.
+    """
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_compose_configs(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def get_compose_files(compose_file: str) -> list[str]:
+    """
+    Get the compose files to pass to Docker Compose for an instance.
+
+    Args:
+        compose_file (str): The docker-compose.yaml file of the instance.
+
+    Returns:
+        list[str]: The shared base file followed by the override if the instance
+            uses the "override" compose layout, otherwise only the compose file.
+    """
+    try:
+        with open(compose_file) as f:
+            first_lines = f.readline() + f.readline()
+    except OSError:
+        return [compose_file]
+    # The base reference is always written first, no need to parse the whole file
+    match = next(
+        filter(None, map(COMPOSE_BASE_PATTERN.match, first_lines.splitlines())), None
+    )
+    if match is None:
+        return [compose_file]
+    base_ref = match.group(1)
+    return [
+        os.path.normpath(os.path.join(os.path.dirname(compose_file), base_ref)),
+        compose_file,
+    ]
+
+
+def load_instance_compose_config(compose_file: str) -> dict[str, Any]:
+    """
+    Load the full compose configuration of an instance, merging its shared base if any.
+
+    Args:
+        compose_file (str): The docker-compose.yaml file of the instance.
+
+    Returns:
+        dict[str, Any]: The full compose configuration.
+    """
+    config = {}
+    for path in get_compose_files(compose_file):
+        with open(path) as f:
+            layer = load_compose_content(f.read())
+        layer.pop(COMPOSE_BASE_KEY, None)
+        config = merge_compose_configs(config, layer)
+    return config
+
+
+def parse_env_content(content: str) -> dict[str, str]:
+    """
+    Parse the variables of a generated .env file content.
+
+    Args:
+        content (str): The .env file content.
+
+    Returns:
+        dict[str, str]: The variables by name.
+    """
+    env = {}
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        env[key.strip()] = value
+    return env
+
+
+def read_env_file(env_file: str) -> dict[str, str]:
+    """
+    Read the variables of a generated .env file.
+
+    Args:
+        env_file (str): Path to the .env file.
+
+    Returns:
+        dict[str, str]: The variables by name.
+    """
+    with open(env_file) as f:
+        return parse_env_content(f.read())
+
+
+def interpolate_compose_config(value: Any, env: dict[str, str]) -> Any:
+    """
+    Substitute the variable references of a compose configuration the way Docker
+    Compose does.
+
+    Substituted values have their "$" escaped, so Compose does not interpolate them
+    again.
+
+    Args:
+        value (Any): The compose configuration or a value of it.
+        env (dict[str, str]): The variables to substitute.
+
+    Returns:
+        Any: The interpolated configuration.
+    """
+    if isinstance(value, dict):
+        return {
+            key: interpolate_compose_config(item, env) for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [interpolate_compose_config(item, env) for item in value]
+    if not isinstance(value, str):
+        return value
+
+    def replace(match: re.Match) -> str:
+        if match.group(0) == "$$":
+            return "$$"
+        name = match.group(1) or match.group(4)
+        operator, default = match.group(2), match.group(3)
+        if name in env and not (operator == ":-" and env[name] == ""):
+            return env[name].replace("$", "$$")
+        if operator:
+            return default
+        logging.warning(f"Variable {name} is not set, substituting an empty string")
+        return ""
+
+    return ENV_REFERENCE_PATTERN.sub(replace, value)
+
+
+def namespace_fleet_instance(
+    instance_name: str, compose_config: dict[str, Any], env: dict[str, str]
+) -> dict[str, Any]:
+    """
+    Prefix the services, networks and named volumes of an instance with its name for
+    the fleet project.
+
+    References between them (network_mode, depends_on, links, networks) are
+    renamed accordingly, relative bind mounts are rebased on the instance
+    directory and the instance's variables are substituted.
+
+    Args:
+        instance_name (str): The instance directory name inside the fleet directory.
+        compose_config (dict[str, Any]): The compose configuration of the instance.
+        env (dict[str, str]): The variables of the instance's .env file.
+
+    Returns:
+        dict[str, Any]: The namespaced "services", "networks" and "volumes".
+    """
+    config = interpolate_compose_config(compose_config, env)
+    networks = config.get("networks") or {"default": {}}
+    volumes = config.get("volumes") or {}
+
+    def namespaced(name: str) -> str:
+        return f"{instance_name}_{name}"
+
+    def rebase_volume_source(source: str) -> str:
+        if source.startswith("."):
+            return "./" + posixpath.normpath(posixpath.join(instance_name, source))
+        if source in volumes:
+            return namespaced(source)
+        return source
+
+    def rebase_volume(volume: Any) -> Any:
+        if isinstance(volume, dict):
+            volume = dict(volume)
+            volume["source"] = rebase_volume_source(volume.get("source", ""))
+            return volume
+        source, separator, target = str(volume).partition(":")
+        return f"{rebase_volume_source(source)}{separator}{target}"
+
+    services = {}
+    for service_name, instance_service in (config.get("services") or {}).items():
+        service = dict(instance_service)
+        network_mode = service.get("network_mode", "")
+        if network_mode.startswith("service:"):
+            service["network_mode"] = (
+                f"service:{namespaced(network_mode.split(':', 1)[1])}"
+            )
+        if isinstance(service.get("depends_on"), list):
+            service["depends_on"] = [namespaced(s) for s in service["depends_on"]]
+        elif isinstance(service.get("depends_on"), dict):
+            service["depends_on"] = {
+                namespaced(s): condition
+                for s, condition in service["depends_on"].items()
+            }
+        if "links" in service:
+            service["links"] = [
+                namespaced(link.split(":", 1)[0])
+                + (":" + link.split(":", 1)[1] if ":" in link else "")
+                for link in service["links"]
+            ]
+        if isinstance(service.get("networks"), list):
+            service["networks"] = [namespaced(n) for n in service["networks"]]
+        elif isinstance(service.get("networks"), dict):
+            service["networks"] = {
+                namespaced(n): options for n, options in service["networks"].items()
+            }
+        elif not network_mode:
+            # Services without networks join the instance's default network
+            service["networks"] = [namespaced("default")]
+        if "volumes" in service:
+            service["volumes"] = [rebase_volume(v) for v in service["volumes"]]
+        services[namespaced(service_name)] = service
+
+    return {
+        "services": services,
+        "networks": {namespaced(name): network for name, network in networks.items()},
+        "volumes": {namespaced(name): volume for name, volume in volumes.items()},
+    }
+
+
+def build_fleet_compose_config(
+    instances: list[tuple[str, dict[str, Any], dict[str, str]]],
+) -> dict[str, Any]:
+    """
+    Combine the compose configurations of the multiproxy instances into a single
+    project.
+
+    Each instance is namespaced with namespace_fleet_instance, since a single
+    project only has one environment.
+
+    Args:
+        instances (list): Tuples of (instance_name, compose_config, env) where
+            instance_name is the instance directory name inside the fleet directory.
+
+    Returns:
+        dict[str, Any]: The fleet compose configuration.
+    """
+    fleet_config = {"services": {}, "networks": {}, "volumes": {}}
+    for instance_name, compose_config, env in instances:
+        namespaced = namespace_fleet_instance(instance_name, compose_config, env)
+        for key, entries in fleet_config.items():
+            entries.update(namespaced[key])
+    if not fleet_config["volumes"]:
+        del fleet_config["volumes"]
+    return fleet_config
+
+
+def apply_compose_layout(
+    instances_dir: str,
+    layout: str = "full",
+    fleet_project_name: str = "money4band_fleet",
+    compose_format: str = "yaml",
+) -> None:
+    """
+    Store the compose files of the multiproxy instances in the given layout.
+
+    In the "override" layout the part shared by every instance is written once
+    to a base file in the instances directory, and each instance's
+    docker-compose.yaml only holds what differs (network, ports, ...). Both
+    files are passed to Docker Compose with multiple -f flags. The "fleet"
+    layout additionally writes every instance into one compose project in the
+    instances directory, so a single up/down converges all of them. The "full"
+    layout materializes a complete compose file per instance.
+
+    Args:
+        instances_dir (str): The directory containing the proxy instances.
+        layout (str, optional): "full", "override" or "fleet". Defaults to "full".
+        fleet_project_name (str, optional): Compose project name of the fleet.
+            Defaults to "money4band_fleet".
+        compose_format (str, optional): "yaml" or "json". Defaults to "yaml".
+
+    Raises:
+        ValueError: If the layout is unknown.
+    """
+    if layout not in COMPOSE_LAYOUTS:
+        raise ValueError(
+            f"Unknown compose layout '{layout}', expected one of "
+            f"{', '.join(COMPOSE_LAYOUTS)}"
+        )
+    if not os.path.isdir(instances_dir):
+        return
+
+    compose_files = sorted(
+        os.path.join(instances_dir, instance, "docker-compose.yaml")
+        for instance in os.listdir(instances_dir)
+        if os.path.isfile(os.path.join(instances_dir, instance, "docker-compose.yaml"))
+    )
+    configs = {path: load_instance_compose_config(path) for path in compose_files}
+
+    base_filename = None
+    if layout == "override" and configs:
+        base = get_common_compose_config(list(configs.values()))
+        base_content = dump_compose_config(base, compose_format)
+        base_filename = (
+            f"{COMPOSE_BASE_FILENAME_PREFIX}"
+            f"{hashlib.sha256(base_content.encode('utf-8')).hexdigest()[:12]}."
+            f"{compose_format}"
+        )
+        write_file_if_changed(base_content, os.path.join(instances_dir, base_filename))
+        for path, config in configs.items():
+            override = {
+                COMPOSE_BASE_KEY: f"../{base_filename}",
+                **make_config_overlay(base, config),
+            }
+            write_file_if_changed(dump_compose_config(override, compose_format), path)
+        logging.info(
+            f"Wrote the shared compose base {base_filename} and {len(configs)} "
+            "instance overrides"
+        )
+    else:
+        for path, config in configs.items():
+            write_file_if_changed(dump_compose_config(config, compose_format), path)
+
+    write_fleet_compose(
+        instances_dir,
+        configs if layout == "fleet" else {},
+        fleet_project_name,
+        compose_format,
+    )
+
+    # Remove the bases no instance points to anymore
+    for filename in os.listdir(instances_dir):
+        if (
+            filename.startswith(COMPOSE_BASE_FILENAME_PREFIX)
+            and filename != base_filename
+        ):
+            try:
+                os.remove(os.path.join(instances_dir, filename))
+            except OSError as e:
+                logging.warning(f"Could not remove stale compose base {filename}: {e}")
+
+
+def write_fleet_compose(
+    instances_dir: str,
+    configs: dict[str, dict[str, Any]],
+    fleet_project_name: str = "money4band_fleet",
+    compose_format: str = "yaml",
+) -> None:
+    """
+    Write the fleet project of the given instances, or remove it if there are none.
+
+    Args:
+        instances_dir (str): The directory containing the proxy instances.
+        configs (dict[str, dict[str, Any]]): The compose configurations by compose
+            file path of each instance.
+        fleet_project_name (str, optional): Compose project name of the fleet.
+            Defaults to "money4band_fleet".
+        compose_format (str, optional): "yaml" or "json". Defaults to "yaml".
+    """
+    fleet_compose_file = os.path.join(instances_dir, COMPOSE_FLEET_FILENAME)
+    fleet_env_file = os.path.join(instances_dir, ".env")
+    if not configs:
+        if os.path.isfile(fleet_compose_file):
+            for path in [fleet_compose_file, fleet_env_file]:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logging.warning(f"Could not remove {path}: {e}")
+        return
+
+    fleet_config = build_fleet_compose_config(
+        [
+            (
+                os.path.basename(os.path.dirname(path)),
+                config,
+                read_env_file(os.path.join(os.path.dirname(path), ".env")),
+            )
+            for path, config in configs.items()
+        ]
+    )
+    write_file_if_changed(
+        dump_compose_config(fleet_config, compose_format), fleet_compose_file
+    )
+    write_file_if_changed(
+        f"COMPOSE_PROJECT_NAME={fleet_project_name}\n", fleet_env_file
+    )
+    logging.info(
+        f"Wrote {len(configs)} instances into the fleet project "
+        f"{fleet_project_name}"
+    )
+
+
+def get_compose_layout(m4b_config_path_or_dict: Any) -> str:
+    """
+    Get the compose layout of the multiproxy instances set in the m4b configuration.
+
+    Args:
+        m4b_config_path_or_dict (Any): The path to the m4b configuration file or
+            the config dictionary.
+
+    Returns:
+        str: "full", "override" or "fleet".
+    """
+    m4b_config = load_json_config(m4b_config_path_or_dict)
+    return m4b_config.get("multiproxy", {}).get("compose_layout", "full")
+
+
+def apply_configured_compose_layout(
+    instances_dir: str, m4b_config_path_or_dict: Any
+) -> None:
+    """
+    Store the compose files of the multiproxy instances in the layout set in the m4b
+    configuration.
+
+    Args:
+        instances_dir (str): The directory containing the proxy instances.
+        m4b_config_path_or_dict (Any): The path to the m4b configuration file or
+            the config dictionary.
+    """
+    m4b_config = load_json_config(m4b_config_path_or_dict)
+    project_name = m4b_config.get("project", {}).get(
+        "compose_project_name", "money4band"
+    )
+    apply_compose_layout(
+        instances_dir,
+        get_compose_layout(m4b_config),
+        fleet_project_name=f"{project_name}_fleet",
+        compose_format=m4b_config.get("files", {}).get("compose_format", "yaml"),
+    )
+
+
+def diff_compose_services(
+    old_compose: dict[str, Any],
+    old_env: dict[str, str],
+    new_compose: dict[str, Any],
+    new_env: dict[str, str],
+) -> dict[str, Any]:
+    """
+    Compare two compose configurations of an instance the way Compose decides what to
+    recreate.
+
+    Services are compared after variable interpolation, since Compose recreates a
+    container whenever its interpolated configuration changes.
+
+    Args:
+        old_compose (dict[str, Any]): The current compose configuration.
+        old_env (dict[str, str]): The current .env variables.
+        new_compose (dict[str, Any]): The compose configuration that would be generated.
+        new_env (dict[str, str]): The .env variables that would be generated.
+
+    Returns:
+        dict[str, Any]: The plan, with the services to "add" and "remove", the changed
+            keys of each service to "change", the services to "recreate", the
+            "unchanged" services and whether the "networks_changed".
+    """
+    old_services = interpolate_compose_config(
+        old_compose.get("services") or {}, old_env
+    )
+    new_services = interpolate_compose_config(
+        new_compose.get("services") or {}, new_env
+    )
+    networks_changed = bool(old_services) and interpolate_compose_config(
+        old_compose.get("networks") or {}, old_env
+    ) != interpolate_compose_config(new_compose.get("networks") or {}, new_env)
+
+    change = {}
+    for name, service in new_services.items():
+        old_service = old_services.get(name)
+        if old_service is not None and old_service != service:
+            change[name] = sorted(
+                key
+                for key in set(old_service) | set(service)
+                if old_service.get(key) != service.get(key)
+            )
+
+    recreate = set(change)
+    if networks_changed:
+        # Containers attached to a recreated network are recreated with it
+        recreate.update(
+            name
+            for name, service in new_services.items()
+            if name in old_services and not service.get("network_mode")
+        )
+    # Containers sharing the network namespace of a recreated service follow it
+    while True:
+        followers = {
+            name
+            for name, service in new_services.items()
+            if name in old_services
+            and name not in recreate
+            and str(service.get("network_mode", "")).removeprefix("service:")
+            in recreate
+        }
+        if not followers:
+            break
+        recreate.update(followers)
+
+    return {
+        "add": [name for name in new_services if name not in old_services],
+        "remove": [name for name in old_services if name not in new_services],
+        "change": change,
+        "recreate": sorted(recreate),
+        "unchanged": sorted(
+            name
+            for name in new_services
+            if name in old_services and name not in recreate
+        ),
+        "networks_changed": networks_changed,
+    }
+
+
+def plan_instance_changes(
+    m4b_config_path_or_dict: Any,
+    app_config_path_or_dict: Any,
+    user_config_path_or_dict: Any,
+    compose_output_path: str = str(os.path.join(os.getcwd(), "docker-compose.yaml")),
+    env_output_path: str = str(os.path.join(os.getcwd(), ".env")),
+    *,
+    is_main_instance: bool = False,
+    resolution_context: ImageResolutionContext | None = None,
+) -> dict[str, Any]:
+    """
+    Plan what regenerating and restarting an instance would change, without writing
+    any file.
+
+    Args:
+        m4b_config_path_or_dict (Any): The path to the m4b configuration file or
+            the config dictionary.
+        app_config_path_or_dict (Any): The path to the app configuration file or
+            the config dictionary.
+        user_config_path_or_dict (Any): The path to the user configuration file or
+            the config dictionary.
+        compose_output_path (str, optional): The current docker-compose.yaml file.
+            Defaults to './docker-compose.yaml'.
+        env_output_path (str, optional): The current .env file. Defaults to './.env'.
+        is_main_instance (bool, optional): Whether this is the main instance.
+            Defaults to False.
+        resolution_context (ImageResolutionContext, optional): Image resolutions shared
+            across the instances planned in the same run. A new context is used if not
+            provided.
+
+    Returns:
+        dict[str, Any]: The plan returned by diff_compose_services, with the
+        "compose_file".
+    """
+    if resolution_context is None:
+        resolution_context = ImageResolutionContext(
+            lock_path=get_image_lock_path(
+                user_config_path_or_dict
+                if isinstance(user_config_path_or_dict, str)
+                else None
+            ),
+            dry_run=True,
+        )
+    new_compose = assemble_docker_compose(
+        m4b_config_path_or_dict,
+        app_config_path_or_dict,
+        user_config_path_or_dict,
+        compose_output_path=compose_output_path,
+        is_main_instance=is_main_instance,
+        resolution_context=resolution_context,
+        show_progress=False,
+        dry_run=True,
+    )
+    new_env = parse_env_content(
+        generate_env_file(
+            m4b_config_path_or_dict,
+            app_config_path_or_dict,
+            user_config_path_or_dict,
+            env_output_path=env_output_path,
+            is_main_instance=is_main_instance,
+            show_progress=False,
+            dry_run=True,
+        )
+    )
+    old_compose = (
+        load_instance_compose_config(compose_output_path)
+        if os.path.isfile(compose_output_path)
+        else {}
+    )
+    old_env = read_env_file(env_output_path) if os.path.isfile(env_output_path) else {}
+
+    plan = diff_compose_services(old_compose, old_env, new_compose, new_env)
+    plan["compose_file"] = compose_output_path
+    return plan
+
+
+def plan_all_instances(
+    app_config_path: str,
+    m4b_config_path: str,
+    user_config_path: str,
+    instances_dir: str = "m4b_proxy_instances",
+    resolution_context: ImageResolutionContext | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    Plan the changes of the main instance and of every multiproxy instance.
+
+    Args:
+        app_config_path (str): Path to the app configuration file.
+        m4b_config_path (str): Path to the m4b configuration file.
+        user_config_path (str): Path to the user configuration file.
+        instances_dir (str, optional): The directory containing the proxy instances.
+        resolution_context (ImageResolutionContext, optional): Image resolutions shared
+            by all the instances. A new context is used if not provided.
+
+    Returns:
+        dict[str, dict[str, Any]]: The plan of each instance, by instance name.
+    """
+    if resolution_context is None:
+        resolution_context = ImageResolutionContext(
+            lock_path=get_image_lock_path(user_config_path), dry_run=True
+        )
+    main_instance_name = (
+        load_json_config(m4b_config_path)
+        .get("project", {})
+        .get("compose_project_name", "money4band")
+    )
+    plans = {
+        main_instance_name: plan_instance_changes(
+            m4b_config_path,
+            app_config_path,
+            user_config_path,
+            compose_output_path="./docker-compose.yaml",
+            env_output_path="./.env",
+            is_main_instance=True,
+            resolution_context=resolution_context,
+        )
+    }
+    if not os.path.isdir(instances_dir):
+        return plans
+
+    for instance_name in sorted(os.listdir(instances_dir)):
+        instance_path = os.path.join(instances_dir, instance_name)
+        instance_user_config = os.path.join(instance_path, "user-config.json")
+        if not os.path.isfile(instance_user_config):
+            continue
+        # Use main configs if instance-specific ones don't exist
+        instance_app_config = os.path.join(instance_path, "app-config.json")
+        instance_m4b_config = os.path.join(instance_path, "m4b-config.json")
+        plans[instance_name] = plan_instance_changes(
+            instance_m4b_config
+            if os.path.exists(instance_m4b_config)
+            else m4b_config_path,
+            instance_app_config
+            if os.path.exists(instance_app_config)
+            else app_config_path,
+            instance_user_config,
+            compose_output_path=os.path.join(instance_path, "docker-compose.yaml"),
+            env_output_path=os.path.join(instance_path, ".env"),
+            resolution_context=resolution_context,
+        )
+    return plans
+
+
+def format_plan(plans: dict[str, dict[str, Any]]) -> str:
+    """
+    Format instance plans for the terminal.
+
+    Args:
+        plans (dict[str, dict[str, Any]]): The plan of each instance, by instance name.
+
+    Returns:
+        str: The formatted plans, followed by a summary line.
+    """
+    lines = []
+    totals = {"add": 0, "change": 0, "recreate": 0, "remove": 0}
+    for instance_name, plan in plans.items():
+        lines.append(f"{instance_name} ({plan.get('compose_file', '')}):")
+        for name in plan["add"]:
+            lines.append(f"  + {name}")
+        for name in plan["recreate"]:
+            keys = plan["change"].get(name)
+            reason = ", ".join(keys) if keys else "dependency or network changed"
+            lines.append(f"  -/+ {name} (recreate: {reason})")
+        for name in plan["remove"]:
+            lines.append(f"  - {name}")
+        if plan["networks_changed"]:
+            lines.append(
+                "  ! network configuration changed, the stack must be restarted"
+            )
+        if not (plan["add"] or plan["recreate"] or plan["remove"]):
+            lines.append("  no changes")
+        totals["add"] += len(plan["add"])
+        totals["change"] += len(plan["change"])
+        totals["recreate"] += len(plan["recreate"])
+        totals["remove"] += len(plan["remove"])
+    lines.append(
+        f"Plan: {totals['add']} to add, {totals['change']} to change, "
+        f"{totals['recreate']} to recreate, {totals['remove']} to remove."
+    )
+    return "\n".join(lines)
+
+
+def benchmark_compose_formats(
+    compose_config: dict[str, Any], instances: int = 200
+) -> dict[str, dict[str, float]]:
+    """
+    Time serializing and parsing the compose files of a fleet with each available
+    backend.
+
+    Args:
+        compose_config (dict[str, Any]): The compose configuration of one instance.
+        instances (int, optional): Number of instance files to serialize and parse.
+            Defaults to 200.
+
+    Returns:
+        dict[str, dict[str, float]]: Per backend, the "dump" and "load" seconds and
+        the total "bytes".
+    """
+    backends = {"yaml (pure Python)": (yaml.SafeDumper, yaml.SafeLoader)}
+    if YAML_DUMPER is not yaml.SafeDumper:
+        backends["yaml (libyaml)"] = (YAML_DUMPER, YAML_LOADER)
+    backends["json"] = None
+
+    results = {}
+    for name, backend in backends.items():
+        start = time.perf_counter()
+        if backend is None:
+            contents = [
+                dump_compose_config(compose_config, "json") for _ in range(instances)
+            ]
+        else:
+            contents = [
+                yaml.dump(
+                    compose_config,
+                    Dumper=backend[0],
+                    sort_keys=False,
+                    default_flow_style=False,
+                )
+                for _ in range(instances)
+            ]
+        dumped = time.perf_counter()
+        for content in contents:
+            if backend is None:
+                json.loads(content)
+            else:
+                parse_yaml(content, backend[1])
+        loaded = time.perf_counter()
+        results[name] = {
+            "dump": dumped - start,
+            "load": loaded - dumped,
+            "bytes": float(sum(len(content) for content in contents)),
+        }
+    return results
+
+
+def get_published_dashboards(
+    compose_project_names: set[str] | None = None,
+) -> dict[str, list[tuple[str, str, str]]]:
+    """
+    List the web dashboards published by compose containers with a single container
+    listing.
+
+    Only containers labelled with a compose project are queried, so containers of
+    other tools never end up in the dashboard files.
+
+    Args:
+        compose_project_names (set[str], optional): The projects to keep, all if None.
+
+    Returns:
+        dict[str, list[tuple[str, str, str]]]: The (service, container, url) tuples
+        by compose project name, sorted by container name.
+    """
+    dashboards: dict[str, set[tuple[str, str, str]]] = {}
+    containers = list_containers(filters={"label": [COMPOSE_PROJECT_LABEL]})
+    for container in containers or []:
+        labels = container.get("Labels") or {}
+        project = labels.get(COMPOSE_PROJECT_LABEL)
+        if compose_project_names is not None and project not in compose_project_names:
+            continue
+        names = container.get("Names") or [""]
+        for port in container.get("Ports") or []:
+            if port.get("Type") != "tcp" or not port.get("PublicPort"):
+                continue
+            host_ip = port.get("IP", "")
+            unspecified = not host_ip or ipaddress.ip_address(host_ip).is_unspecified
+            host = "localhost" if unspecified else host_ip
+            if ":" in host:
+                host = f"[{host}]"
+            dashboards.setdefault(project, set()).add(
+                (
+                    labels.get(COMPOSE_SERVICE_LABEL, ""),
+                    names[0].lstrip("/"),
+                    f"http://{host}:{port['PublicPort']}",
+                )
+            )
+    return {
+        project: sorted(entries, key=lambda entry: (entry[1], entry[2]))
+        for project, entries in dashboards.items()
+    }
+
+
+def write_dashboard_urls(
+    compose_project_name: str,
+    device_name: str,
+    dashboards: list[tuple[str, str, str]],
+    directory: str = ".",
+) -> str:
+    """
+    Write the dashboard URLs of an instance to its
+    "dashboards_URLs_<compose_project_name>-<device_name>.txt" file.
+
+    Args:
+        compose_project_name (str): The name of the compose project.
+        device_name (str): The name of the device.
+        dashboards (list[tuple[str, str, str]]): The (service, container, url) tuples.
+        directory (str): The directory to write the file to.
+
+    Returns:
+        str: The path of the dashboard file.
+    """
+    dashboard_file = os.path.join(
+        directory, f"dashboards_URLs_{compose_project_name}-{device_name}.txt"
+    )
+    dashboard_lines = [
+        f"------ Dashboards {compose_project_name}-{device_name} ------\n"
+    ]
+    dashboard_lines.extend(
+        f"If enabled you can visit the {container} web dashboard on {url}\n"
+        for _, container, url in dashboards
+    )
+    write_file_if_changed("".join(dashboard_lines), dashboard_file)
+    logging.info(f"Dashboard URLs have been written to {dashboard_file}")
+    return dashboard_file
 
 
 def generate_dashboard_urls(
@@ -601,12 +1978,11 @@ def generate_dashboard_urls(
                 logging.info(
                     "Reading COMPOSE_PROJECT_NAME and DEVICE_NAME from .env file..."
                 )
-                with open(env_file) as f:
-                    for line in f:
-                        if "COMPOSE_PROJECT_NAME" in line:
-                            compose_project_name = line.split("=")[1].strip()
-                        if "DEVICE_NAME" in line:
-                            device_name = line.split("=")[1].strip()
+                env = read_env_file(env_file)
+                compose_project_name = (
+                    compose_project_name or env.get("COMPOSE_PROJECT_NAME", "").strip()
+                )
+                device_name = device_name or env.get("DEVICE_NAME", "").strip()
             else:
                 logging.error("Error: Parameters not provided and .env file not found.")
                 return
@@ -617,26 +1993,93 @@ def generate_dashboard_urls(
             )
             return
 
-        dashboard_file = f"dashboards_URLs_{compose_project_name}-{device_name}.txt"
-        with open(dashboard_file, "w") as f:
-            f.write(f"------ Dashboards {compose_project_name}-{device_name} ------\n")
+        dashboards = get_published_dashboards({compose_project_name})
+        write_dashboard_urls(
+            compose_project_name,
+            device_name,
+            dashboards.get(compose_project_name, []),
+        )
+    finally:
+        event.set()
+        spinner_thread.join()
+
+
+def generate_all_dashboard_urls(
+    main_env_file: str = "./.env",
+    instances_dir: str = "m4b_proxy_instances",
+) -> list[str]:
+    """
+    Generate the dashboard URLs file of the main instance and of every multiproxy
+    instance.
 
-        result = subprocess.run(
-            ["docker", "ps", "--format", "{{.Ports}} {{.Names}}"],
-            check=False,
-            capture_output=True,
-            text=True,
+    The containers of all instances are listed with a single docker ps call. Each
+    instance file is written next to its .env file; when the instances run as a
+    single fleet project, each one gets the services prefixed with its name.
+
+    Args:
+        main_env_file (str): The path to the main environment file.
+        instances_dir (str): The directory containing the proxy instances.
+
+    Returns:
+        list[str]: The paths of the dashboard files written.
+    """
+    # (compose project, device name, directory, fleet service prefix) of each instance
+    targets = []
+    if os.path.isfile(main_env_file):
+        env = read_env_file(main_env_file)
+        targets.append(
+            (
+                env.get("COMPOSE_PROJECT_NAME", "").strip(),
+                env.get("DEVICE_NAME", "").strip(),
+                os.path.dirname(main_env_file) or ".",
+                None,
+            )
         )
-        for line in result.stdout.splitlines():
-            container_info = line.split()[-1]
-            port_mapping = re.search(r"0.0.0.0:(\d+)->", line)
-            if port_mapping:
-                with open(dashboard_file, "a") as f:
-                    f.write(
-                        f"If enabled you can visit the {container_info} web dashboard on http://localhost:{port_mapping.group(1)}\n"
-                    )
+    if os.path.isdir(instances_dir):
+        fleet_project_name = None
+        if os.path.isfile(os.path.join(instances_dir, COMPOSE_FLEET_FILENAME)):
+            fleet_project_name = read_env_file(os.path.join(instances_dir, ".env")).get(
+                "COMPOSE_PROJECT_NAME"
+            )
+        for instance in sorted(os.listdir(instances_dir)):
+            instance_env_file = os.path.join(instances_dir, instance, ".env")
+            if not os.path.isfile(instance_env_file):
+                continue
+            env = read_env_file(instance_env_file)
+            targets.append(
+                (
+                    fleet_project_name or env.get("COMPOSE_PROJECT_NAME", "").strip(),
+                    env.get("DEVICE_NAME", "").strip(),
+                    os.path.join(instances_dir, instance),
+                    f"{instance}_" if fleet_project_name else None,
+                )
+            )
+
+    targets = [target for target in targets if target[0] and target[1]]
+    if not targets:
+        logging.error(
+            "Error: No instance with COMPOSE_PROJECT_NAME and DEVICE_NAME found."
+        )
+        return []
 
-        logging.info(f"Dashboard URLs have been written to {dashboard_file}")
+    event = threading.Event()
+    spinner_thread = threading.Thread(
+        target=show_spinner, args=("Generating dashboard URLs...", event)
+    )
+    spinner_thread.start()
+    try:
+        dashboards = get_published_dashboards({target[0] for target in targets})
+        dashboard_files = []
+        for project, device_name, directory, service_prefix in targets:
+            entries = [
+                entry
+                for entry in dashboards.get(project, [])
+                if service_prefix is None or entry[0].startswith(service_prefix)
+            ]
+            dashboard_files.append(
+                write_dashboard_urls(project, device_name, entries, directory)
+            )
+        return dashboard_files
     finally:
         event.set()
         spinner_thread.join()
@@ -685,8 +2128,6 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
         m4b_config_path: Path to the m4b configuration file.
         user_config_path: Path to the user configuration file.
     """
-    import shutil
-
     from colorama import Fore, Style
 
     from utils.prompt_helper import ask_question_yn
@@ -749,15 +2190,9 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
     # Check if containers are running
     containers_running = False
     try:
-        result = subprocess.run(
-            ["docker", "ps", "--filter", f"name={device}", "--format", "{{.Names}}"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        if result.returncode == 0 and result.stdout.strip():
+        running_count = len(list_containers(filters={"name": [device]}) or [])
+        if running_count:
             containers_running = True
-            running_count = len(result.stdout.strip().split("\n"))
             print(
                 f"\n{Fore.YELLOW}⚠ {running_count} container(s) currently running{Style.RESET_ALL}"
             )
@@ -765,52 +2200,66 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
         pass  # Docker check failed, continue anyway
 
     print()
+    if ask_question_yn(
+        "Show which services would be added, recreated or removed first?",
+        default=False,
+    ):
+        try:
+            print(
+                format_plan(
+                    plan_all_instances(
+                        app_config_path,
+                        m4b_config_path,
+                        user_config_path,
+                        instances_dir=instances_dir,
+                    )
+                )
+            )
+        except Exception as e:
+            print(f"{Fore.RED}Could not compute the plan: {e}{Style.RESET_ALL}")
+            logging.error(f"Error planning the regeneration: {e}")
+        print()
     if not ask_question_yn("Regenerate files with this configuration?"):
         print("Cancelled.")
         input("\nPress Enter to go back to main menu...")
         return
 
-    # Create backup of existing files
+    # Existing files are backed up here before being replaced
     backup_dir = ".backup"
-    os.makedirs(backup_dir, exist_ok=True)
-    files_to_backup = ["docker-compose.yaml", ".env"]
-    backed_up = []
 
-    for filename in files_to_backup:
-        if os.path.exists(filename):
-            backup_path = os.path.join(backup_dir, filename)
-            try:
-                shutil.copy2(filename, backup_path)
-                backed_up.append(filename)
-            except Exception as e:
-                logging.warning(f"Could not backup {filename}: {e}")
-
-    if backed_up:
-        print(
-            f"{Fore.BLUE}Backed up: {', '.join(backed_up)} → {backup_dir}/{Style.RESET_ALL}"
-        )
+    # Share image resolutions between the main instance and all multiproxy instances
+    resolution_context = ImageResolutionContext(
+        lock_path=get_image_lock_path(user_config_path)
+    )
 
     try:
         # Regenerate main instance files
-        print(f"\n{Fore.CYAN}Regenerating docker-compose.yaml...{Style.RESET_ALL}")
-        assemble_docker_compose(
-            m4b_config_path_or_dict=m4b_config,
-            app_config_path_or_dict=app_config,
-            user_config_path_or_dict=user_config,
-            compose_output_path="./docker-compose.yaml",
-            is_main_instance=True,
+        print(
+            f"\n{Fore.CYAN}Regenerating docker-compose.yaml and .env..."
+            f"{Style.RESET_ALL}"
         )
-        print(f"{Fore.GREEN}✓ docker-compose.yaml regenerated{Style.RESET_ALL}")
-
-        print(f"{Fore.CYAN}Regenerating .env file...{Style.RESET_ALL}")
-        generate_env_file(
+        if generate_instance_files(
             m4b_config_path_or_dict=m4b_config,
             app_config_path_or_dict=app_config,
             user_config_path_or_dict=user_config,
+            compose_output_path="./docker-compose.yaml",
             env_output_path="./.env",
             is_main_instance=True,
-        )
-        print(f"{Fore.GREEN}✓ .env file regenerated{Style.RESET_ALL}")
+            resolution_context=resolution_context,
+            backup_dir=backup_dir,
+        ):
+            print(
+                f"{Fore.BLUE}Previous files backed up → {backup_dir}/{Style.RESET_ALL}"
+            )
+            print(
+                f"{Fore.GREEN}✓ docker-compose.yaml and .env regenerated"
+                f"{Style.RESET_ALL}"
+            )
+        else:
+            print(
+                f"{Fore.GREEN}✓ docker-compose.yaml and .env already up to date"
+                f"{Style.RESET_ALL}"
+            )
 
         # Handle multiproxy instances
         if has_instances and instance_dirs:
@@ -838,17 +2287,6 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
                         )
                         continue
 
-                    # Backup instance files
-                    instance_backup = os.path.join(instance_path, ".backup")
-                    os.makedirs(instance_backup, exist_ok=True)
-                    for f in ["docker-compose.yaml", ".env"]:
-                        src = os.path.join(instance_path, f)
-                        if os.path.exists(src):
-                            try:
-                                shutil.copy2(src, os.path.join(instance_backup, f))
-                            except Exception:
-                                pass
-
                     try:
                         # Use main configs if instance-specific ones don't exist
                         i_app_cfg = (
@@ -865,23 +2303,25 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
                         print(
                             f"{Fore.CYAN}  Regenerating {instance_name}...{Style.RESET_ALL}"
                         )
-                        assemble_docker_compose(
+                        if generate_instance_files(
                             m4b_config_path_or_dict=i_m4b_cfg,
                             app_config_path_or_dict=i_app_cfg,
                             user_config_path_or_dict=instance_user_config,
                             compose_output_path=instance_compose,
-                            is_main_instance=False,
-                        )
-                        generate_env_file(
-                            m4b_config_path_or_dict=i_m4b_cfg,
-                            app_config_path_or_dict=i_app_cfg,
-                            user_config_path_or_dict=instance_user_config,
                             env_output_path=instance_env,
                             is_main_instance=False,
-                        )
-                        print(
-                            f"{Fore.GREEN}  ✓ {instance_name} regenerated{Style.RESET_ALL}"
-                        )
+                            resolution_context=resolution_context,
+                            backup_dir=os.path.join(instance_path, ".backup"),
+                        ):
+                            print(
+                                f"{Fore.GREEN}  ✓ {instance_name} regenerated"
+                                f"{Style.RESET_ALL}"
+                            )
+                        else:
+                            print(
+                                f"{Fore.GREEN}  ✓ {instance_name} already up to date"
+                                f"{Style.RESET_ALL}"
+                            )
                     except Exception as e:
                         print(
                             f"{Fore.RED}  ✗ {instance_name} failed: {e}{Style.RESET_ALL}"
@@ -889,6 +2329,16 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
                         logging.error(
                             f"Error regenerating instance {instance_name}: {e}"
                         )
+                apply_configured_compose_layout(instances_dir, m4b_config)
+
+        # Imported here as the validator depends on this module
+        from utils.validator import report_generated_files
+
+        report_generated_files(
+            compose_file="./docker-compose.yaml",
+            env_file="./.env",
+            instances_dir=instances_dir,
+        )
 
         print(f"\n{Fore.GREEN}Done!{Style.RESET_ALL}")
 
@@ -915,9 +2365,135 @@ def main(app_config_path: str, m4b_config_path: str, user_config_path: str) -> N
     except Exception as e:
         print(f"{Fore.RED}Error: {e}{Style.RESET_ALL}")
         logging.error(f"Error regenerating files: {e}")
-        if backed_up:
+        if os.path.isdir(backup_dir):
             print(
                 f"{Fore.YELLOW}Your previous files are backed up in {backup_dir}/{Style.RESET_ALL}"
             )
 
     input("\nPress Enter to go back to main menu...")
+
+
+if __name__ == "__main__":
+    # Get the script absolute path and name
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    script_name = os.path.basename(__file__)
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description=f"Run the {script_name} module standalone."
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help=(
+            "Print the services each instance would add, recreate or remove, without "
+            "writing files"
+        ),
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print the plan as JSON",
+    )
+    parser.add_argument(
+        "--app-config-path",
+        type=str,
+        default=os.path.join(parent_dir, "config", "app-config.json"),
+        help="Path to the app configuration file",
+    )
+    parser.add_argument(
+        "--m4b-config-path",
+        type=str,
+        default=os.path.join(parent_dir, "config", "m4b-config.json"),
+        help="Path to the m4b configuration file",
+    )
+    parser.add_argument(
+        "--user-config-path",
+        type=str,
+        default=os.path.join(parent_dir, "config", "user-config.json"),
+        help="Path to the user configuration file",
+    )
+    parser.add_argument(
+        "--instances-dir",
+        type=str,
+        default="m4b_proxy_instances",
+        help="Directory containing the multiproxy instances",
+    )
+    parser.add_argument(
+        "--benchmark-compose",
+        action="store_true",
+        help=(
+            "Benchmark the compose file serializers on a fleet of copies of a compose "
+            "file"
+        ),
+    )
+    parser.add_argument(
+        "--compose-file",
+        type=str,
+        default=os.path.join(os.getcwd(), "docker-compose.yaml"),
+        help="Compose file used as the instance template of the benchmark",
+    )
+    parser.add_argument(
+        "--instances",
+        type=int,
+        default=200,
+        help="Number of instance files serialized and parsed by the benchmark",
+    )
+    parser.add_argument(
+        "--log-dir",
+        default=os.path.join(script_dir, "logs"),
+        help="Set the logging directory",
+    )
+    parser.add_argument(
+        "--log-file", default=f"{script_name}.log", help="Set the logging file name"
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        default="INFO",
+        help="Set the logging level",
+    )
+    args = parser.parse_args()
+
+    # Set logging level based on command-line arguments
+    log_level = getattr(logging, args.log_level.upper(), None)
+    if not isinstance(log_level, int):
+        raise ValueError(f"Invalid log level: {args.log_level}")
+
+    # Start logging
+    os.makedirs(args.log_dir, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(args.log_dir, args.log_file),
+        format="%(asctime)s - [%(levelname)s] - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=log_level,
+    )
+
+    logging.info(f"Starting {script_name} script...")
+
+    try:
+        if args.plan:
+            plans = plan_all_instances(
+                args.app_config_path,
+                args.m4b_config_path,
+                args.user_config_path,
+                instances_dir=args.instances_dir,
+            )
+            print(json.dumps(plans, indent=2) if args.json else format_plan(plans))
+        elif args.benchmark_compose:
+            compose_config = load_instance_compose_config(args.compose_file)
+            results = benchmark_compose_formats(compose_config, args.instances)
+            print(
+                f"{'Backend':<20} {'Dump (s)':>10} {'Load (s)':>10} {'Size (KiB)':>12}"
+            )
+            for name, result in results.items():
+                print(
+                    f"{name:<20} {result['dump']:>10.3f} {result['load']:>10.3f} "
+                    f"{result['bytes'] / 1024:>12.1f}"
+                )
+        else:
+            parser.print_help()
+        logging.info(f"{script_name} script completed successfully")
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {str(e)}")
+        raise
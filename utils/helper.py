@@ -73,16 +73,45 @@ def create_docker_group_if_needed():
         raise RuntimeError("Failed to add user to Docker group.") from e
 
 
-def run_docker_command(command, use_sudo=False):
+# Exit code reported for a command stopped after running past its timeout,
+# as with coreutils' timeout
+COMMAND_TIMEOUT_EXIT_CODE = 124
+# Seconds a timed out command gets to exit after SIGTERM before it is killed
+COMMAND_TERMINATE_GRACE = 10
+
+
+def terminate_command(process):
+    """
+    Stop a running command, asking it to exit before killing it.
+
+    SIGTERM comes first because sudo relays it to the command it runs, so
+    docker compose stops too. SIGKILL would only kill sudo and leave the command
+    running. The command is killed if it is still running after
+    COMMAND_TERMINATE_GRACE seconds.
+
+    Args:
+        process (subprocess.Popen): The running command.
+    """
+    process.terminate()
+    try:
+        process.communicate(timeout=COMMAND_TERMINATE_GRACE)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+
+
+def run_docker_command(command, use_sudo=False, timeout=None):
     """
     Run a Docker command, optionally using sudo, and handle errors gracefully.
 
     Args:
         command (list): The Docker command to run.
         use_sudo (bool): Whether to prepend 'sudo' to the command.
+        timeout (float, optional): Seconds after which the command is stopped,
+            see terminate_command.
 
     Returns:
-        int: The exit code of the command.
+        int: The exit code of the command, COMMAND_TIMEOUT_EXIT_CODE if it timed out.
     """
     if use_sudo and platform.system().lower() == "linux":
         command.insert(0, "sudo")
@@ -90,14 +119,24 @@ def run_docker_command(command, use_sudo=False):
     logging.info(f"Running command: {' '.join(command)}")
 
     try:
-        result = subprocess.run(command, capture_output=True, text=True, check=False)
-        if result.returncode == 0:
-            logging.info(result.stdout)
+        with subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        ) as process:
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                terminate_command(process)
+                logging.error(
+                    f"Command timed out after {timeout} seconds: {' '.join(command)}"
+                )
+                return COMMAND_TIMEOUT_EXIT_CODE
+        if process.returncode == 0:
+            logging.info(stdout)
         else:
-            logging.error(f"Command failed with exit code {result.returncode}")
-            logging.error(result.stderr)
-            print(f"{Fore.RED}Error: {result.stderr.strip()}{Style.RESET_ALL}")
-        return result.returncode
+            logging.error(f"Command failed with exit code {process.returncode}")
+            logging.error(stderr)
+            print(f"{Fore.RED}Error: {stderr.strip()}{Style.RESET_ALL}")
+        return process.returncode
     except Exception as e:
         logging.error(f"{Fore.RED}Failed to run command: {e}{Style.RESET_ALL}")
         print(f"{Fore.RED}Unexpected error: {e}{Style.RESET_ALL}")
@@ -3,13 +3,110 @@ import importlib.util
 import json
 import logging
 import os
+from copy import deepcopy
 from typing import Any
 
+# Key of a sparse config overlay pointing to the config it extends
+CONFIG_EXTENDS_KEY = "$extends"
+
+
+def merge_config_layers(
+    base: dict[str, Any], overlay: dict[str, Any]
+) -> dict[str, Any]:
+    """
+    Merge a sparse overlay onto a base config (JSON merge patch semantics).
+
+    Nested objects are merged recursively, any other value replaces the base
+    value and a null value removes the key.
+
+    Arguments:
+    base -- the base configuration dictionary
+    overlay -- the overlay dictionary
+
+    Returns:
+    Dict[str, Any] -- A new merged configuration dictionary.
+    """
+    merged = deepcopy(base)
+    for key, value in overlay.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config_layers(merged[key], value)
+        else:
+            merged[key] = deepcopy(value)
+    return merged
+
+
+def make_config_overlay(base: dict[str, Any], config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Compute the sparse overlay that turns a base config into the given config.
+
+    Arguments:
+    base -- the base configuration dictionary
+    config -- the full configuration dictionary
+
+    Returns:
+    Dict[str, Any] -- The overlay, so that merge_config_layers(base, overlay) == config.
+    """
+    overlay = {}
+    for key, value in config.items():
+        if key not in base:
+            overlay[key] = deepcopy(value)
+        elif isinstance(value, dict) and isinstance(base[key], dict):
+            nested = make_config_overlay(base[key], value)
+            if nested:
+                overlay[key] = nested
+        elif value != base[key]:
+            overlay[key] = deepcopy(value)
+    for key in base:
+        if key not in config:
+            overlay[key] = None
+    return overlay
+
+
+def get_config_base_path(config_path: str, config: dict[str, Any]) -> str | None:
+    """
+    Get the absolute path of the config extended by a sparse overlay.
+
+    Arguments:
+    config_path -- the path of the overlay file
+    config -- the raw content of the overlay file
+
+    Returns:
+    str | None -- The base config path, or None if the config is not an overlay.
+    """
+    base_path = config.get(CONFIG_EXTENDS_KEY)
+    if not isinstance(base_path, str):
+        return None
+    return os.path.normpath(
+        os.path.join(os.path.dirname(os.path.abspath(config_path)), base_path)
+    )
+
+
+def _load_json_file(config_path: str, loading: tuple[str, ...] = ()) -> dict[str, Any]:
+    with open(config_path) as f:
+        logging.debug(f"Loading config from file: {config_path}")
+        config = json.load(f)
+    base_path = (
+        get_config_base_path(config_path, config) if isinstance(config, dict) else None
+    )
+    if base_path is None:
+        return config
+    if base_path in loading:
+        raise ValueError(f"Config {config_path} extends itself through {base_path}")
+    base = _load_json_file(base_path, loading + (os.path.abspath(config_path),))
+    overlay = {key: value for key, value in config.items() if key != CONFIG_EXTENDS_KEY}
+    return merge_config_layers(base, overlay)
+
 
 def load_json_config(config_path_or_dict: Any) -> dict[str, Any]:
     """
     Load JSON config variables from a file or dictionary.
 
+    A config file holding a "$extends" key is a sparse overlay: the config it
+    points to (relative to the overlay file) is loaded and the overlay is merged
+    onto it, so the returned dictionary is always the full config.
+
     Arguments:
     config_path_or_dict -- the config file path or dictionary
 
@@ -24,9 +121,7 @@ def load_json_config(config_path_or_dict: Any) -> dict[str, Any]:
     if isinstance(config_path_or_dict, str):
         # If config is a string, assume it's a file path and load the JSON file
         try:
-            with open(config_path_or_dict) as f:
-                logging.debug(f"Loading config from file: {config_path_or_dict}")
-                return json.load(f)
+            return _load_json_file(config_path_or_dict)
         except FileNotFoundError:
             logging.error(f"Config file {config_path_or_dict} not found.")
             raise
@@ -1,4 +1,135 @@
+import logging
+import os
 import socket
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import loader
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+
+# Global config loading and global variables
+m4b_config_path = os.path.join(parent_dir, "config", "m4b-config.json")
+try:
+    m4b_config = loader.load_json_config(m4b_config_path)
+except FileNotFoundError:
+    m4b_config = {}  # Fallback to empty config if not found
+    logging.warning("Configuration file not found. Using default values.")
+
+# HTTP client settings (configurable via m4b-config.json)
+http_config = m4b_config.get("http", {})
+HTTP_CONNECT_TIMEOUT = http_config.get(
+    "connect_timeout", 5
+)  # Seconds to wait for a connection to be established
+HTTP_READ_TIMEOUT = http_config.get(
+    "read_timeout", 30
+)  # Seconds to wait between bytes received from the server
+HTTP_RETRIES = http_config.get(
+    "retries", 3
+)  # Retries on connection errors and retryable status codes
+HTTP_BACKOFF_FACTOR = http_config.get(
+    "backoff_factor", 0.5
+)  # Exponential backoff base in seconds (0.5, 1, 2, ...)
+HTTP_POOL_MAXSIZE = http_config.get(
+    "pool_maxsize", 10
+)  # Maximum pooled connections kept per host
+
+# Status codes worth retrying; Retry-After is honored for 429 and 503
+HTTP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Registry API status codes worth retrying. A 429 is returned to the caller at
+# once, so the registry rate limiter sees it instead of sleeping for Retry-After.
+REGISTRY_RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# Shared sessions by purpose, created on first use
+_http_sessions: dict[str, requests.Session] = {}
+_http_session_lock = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTP adapter applying default connect and read timeouts to every request."""
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def create_http_session(
+    status_forcelist: tuple[int, ...] = HTTP_RETRY_STATUS_CODES,
+    respect_retry_after: bool = True,
+) -> requests.Session:
+    """
+    Create an HTTP session with connection pooling, timeouts and retries.
+
+    Connections are kept alive and reused per host, up to HTTP_POOL_MAXSIZE.
+    Failed requests are retried with exponential backoff, by default waiting
+    as long as the server asks through the Retry-After header.
+
+    Args:
+        status_forcelist (tuple[int, ...]): Status codes that are retried.
+        respect_retry_after (bool): Whether to wait for the Retry-After delay.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=status_forcelist,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=respect_retry_after,
+        raise_on_status=False,
+    )
+    adapter = TimeoutHTTPAdapter(
+        max_retries=retry,
+        pool_connections=HTTP_POOL_MAXSIZE,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=True,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """
+    Get the HTTP session shared by the whole process.
+
+    Returns:
+        requests.Session: The shared session, created on first use.
+    """
+    with _http_session_lock:
+        if "default" not in _http_sessions:
+            _http_sessions["default"] = create_http_session()
+        return _http_sessions["default"]
+
+
+def get_registry_session() -> requests.Session:
+    """
+    Get the HTTP session shared by registry API requests.
+
+    Unlike the general session, it never retries a 429 nor sleeps for a
+    Retry-After delay: rate limiting is left to the caller.
+
+    Returns:
+        requests.Session: The shared registry session, created on first use.
+    """
+    with _http_session_lock:
+        if "registry" not in _http_sessions:
+            _http_sessions["registry"] = create_http_session(
+                status_forcelist=REGISTRY_RETRY_STATUS_CODES,
+                respect_retry_after=False,
+            )
+        return _http_sessions["registry"]
 
 
 def is_port_in_use(port):
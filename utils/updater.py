@@ -1,14 +1,14 @@
-import json
 import logging
 import os
 import re
 import sys
-import urllib.request
 from datetime import datetime
 
+import requests
 from colorama import Fore, Style, just_fix_windows_console
 
 from utils.loader import load_json_config
+from utils.networker import get_http_session
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
@@ -96,9 +96,9 @@ def get_latest_releases(count: int = 5) -> list[dict]:
     repo = "money4band"
     url = f"https://api.github.com/repos/{owner}/{repo}/releases"
     try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read().decode()
-            releases = json.loads(data)
+        with get_http_session().get(url) as response:
+            response.raise_for_status()
+            releases = response.json()
             stripped_releases = []
             for release in releases:
                 if release["prerelease"]:
@@ -130,12 +130,14 @@ def get_latest_releases(count: int = 5) -> list[dict]:
                 )
             stripped_releases.sort(key=lambda x: x["version"], reverse=True)
             return stripped_releases[:count]
-    except urllib.error.HTTPError as e:
-        raise Exception(f"Failed to fetch releases. HTTP Error: {e.code}")
-    except urllib.error.URLError as e:
-        raise Exception(f"Failed to fetch releases. URL Error: {e.reason}")
-    except json.JSONDecodeError:
+    except requests.HTTPError as e:
+        raise Exception(
+            f"Failed to fetch releases. HTTP Error: {e.response.status_code}"
+        )
+    except requests.exceptions.JSONDecodeError:
         raise Exception("Failed to parse JSON response.")
+    except requests.RequestException as e:
+        raise Exception(f"Failed to fetch releases. URL Error: {e}")
     except Exception as e:
         raise Exception(f"An error occurred: {e}")
 
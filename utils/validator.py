@@ -0,0 +1,603 @@
+import argparse
+import functools
+import json
+import logging
+import os
+import re
+import sys
+from collections.abc import Callable
+from typing import Any
+
+from colorama import Fore, Style
+
+from utils.generator import (
+    COMPOSE_FLEET_FILENAME,
+    ENV_REFERENCE_PATTERN,
+    interpolate_compose_config,
+    load_instance_compose_config,
+    parse_env_content,
+)
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(script_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+# Hand-maintained subset of the Compose specification schema covering the keys
+# money4band generates, compiled by compile_schema (the official schema and the
+# jsonschema package are not shipped). Unknown top-level and service keys are
+# rejected, so a key outside the subset is reported rather than accepted.
+COMPOSE_SCHEMA_PATH = os.path.join(parent_dir, "config", "compose-schema.json")
+
+# JSON schema keywords compile_schema validates, and the ones it ignores
+SCHEMA_KEYWORDS = {
+    "$ref",
+    "type",
+    "enum",
+    "pattern",
+    "required",
+    "properties",
+    "patternProperties",
+    "additionalProperties",
+    "items",
+}
+SCHEMA_ANNOTATIONS = {
+    "$schema",
+    "$id",
+    "$comment",
+    "title",
+    "description",
+    "default",
+    "definitions",
+}
+
+# Python types accepted for each JSON schema type
+JSON_SCHEMA_TYPES = {
+    "object": (dict,),
+    "array": (list,),
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "null": (type(None),),
+}
+
+# Host side of a port mapping: [ip:]host:container[/protocol]
+PORT_MAPPING_PATTERN = re.compile(
+    r"^(?:(?P<ip>\[?[0-9a-fA-F.:]+\]?):)?(?P<host>[0-9]+(?:-[0-9]+)?):[0-9]+(?:-[0-9]+)?(?:/(?P<protocol>tcp|udp|sctp))?$"
+)
+
+Validator = Callable[[Any, str], list[str]]
+
+
+def _matches_type(value: Any, schema_type: str) -> bool:
+    if isinstance(value, bool) and schema_type != "boolean":
+        return False
+    return isinstance(value, JSON_SCHEMA_TYPES[schema_type])
+
+
+def _check_schema_keywords(node: dict[str, Any]) -> None:
+    unsupported = set(node) - SCHEMA_KEYWORDS - SCHEMA_ANNOTATIONS
+    if unsupported:
+        raise ValueError(
+            f"Unsupported schema keywords: {', '.join(sorted(unsupported))}"
+        )
+
+
+def compile_schema(
+    schema: dict[str, Any], root: dict[str, Any] | None = None
+) -> Validator:
+    """
+    Compile a JSON schema into a validator function.
+
+    Only the keywords used by the bundled compose schema are supported: $ref to
+    local definitions, type, enum, pattern, required, properties, patternProperties,
+    additionalProperties and items. Any other validation keyword (e.g. oneOf,
+    minimum, format) raises a ValueError instead of being silently ignored.
+
+    Args:
+        schema (dict[str, Any]): The schema to compile.
+        root (dict[str, Any], optional): The document $ref pointers are resolved
+            against.
+
+    Returns:
+        Validator: A function taking a value and its path, returning the problems found.
+
+    Raises:
+        ValueError: If the schema uses an unsupported keyword or reference.
+    """
+    root = schema if root is None else root
+    compiled_refs: dict[str, Validator] = {}
+
+    def resolve_ref(ref: str) -> Validator:
+        if ref not in compiled_refs:
+            if not ref.startswith("#/"):
+                raise ValueError(f"Unsupported schema reference: {ref}")
+            target = root
+            for part in ref[2:].split("/"):
+                target = target[part]
+            # Register a forwarder first so recursive definitions terminate
+            cell: list[Validator] = []
+
+            def forward(value: Any, path: str) -> list[str]:
+                return cell[0](value, path)
+
+            compiled_refs[ref] = forward
+            cell.append(compile_node(target))
+        return compiled_refs[ref]
+
+    def compile_node(node: dict[str, Any]) -> Validator:
+        _check_schema_keywords(node)
+        if "$ref" in node:
+            return resolve_ref(node["$ref"])
+
+        types = node.get("type")
+        if isinstance(types, str):
+            types = [types]
+        enum = node.get("enum")
+        pattern = re.compile(node["pattern"]) if "pattern" in node else None
+        required = node.get("required", [])
+        properties = {
+            key: compile_node(child)
+            for key, child in node.get("properties", {}).items()
+        }
+        pattern_properties = [
+            (re.compile(key), compile_node(child))
+            for key, child in node.get("patternProperties", {}).items()
+        ]
+        additional = node.get("additionalProperties", True)
+        additional_validator = (
+            compile_node(additional) if isinstance(additional, dict) else None
+        )
+        items = compile_node(node["items"]) if "items" in node else None
+
+        def validate_mapping(value: dict[str, Any], path: str) -> list[str]:
+            problems = [
+                f"{path}: missing required key '{key}'"
+                for key in required
+                if key not in value
+            ]
+            for key, item in value.items():
+                item_path = f"{path}.{key}"
+                matched = False
+                if key in properties:
+                    matched = True
+                    problems.extend(properties[key](item, item_path))
+                for key_pattern, child in pattern_properties:
+                    if key_pattern.search(key):
+                        matched = True
+                        problems.extend(child(item, item_path))
+                if matched:
+                    continue
+                if additional is False:
+                    problems.append(f"{path}: unexpected key '{key}'")
+                elif additional_validator:
+                    problems.extend(additional_validator(item, item_path))
+            return problems
+
+        def validate(value: Any, path: str) -> list[str]:
+            if types and not any(_matches_type(value, t) for t in types):
+                return [f"{path}: expected {' or '.join(types)}, got {value!r}"]
+            if enum is not None and value not in enum:
+                return [f"{path}: {value!r} is not one of {enum}"]
+            if pattern and isinstance(value, str) and not pattern.search(value):
+                return [f"{path}: {value!r} does not match {pattern.pattern}"]
+            if isinstance(value, dict):
+                return validate_mapping(value, path)
+            if isinstance(value, list) and items:
+                return [
+                    problem
+                    for index, item in enumerate(value)
+                    for problem in items(item, f"{path}[{index}]")
+                ]
+            return []
+
+        return validate
+
+    return compile_node(schema)
+
+
+@functools.cache
+def get_compose_validator(schema_path: str = COMPOSE_SCHEMA_PATH) -> Validator:
+    """
+    Load and compile the compose schema once per process.
+
+    Args:
+        schema_path (str): Path to the compose JSON schema.
+
+    Returns:
+        Validator: The compiled compose schema validator.
+    """
+    with open(schema_path) as f:
+        schema = json.load(f)
+    logging.debug(f"Compiled compose schema {schema_path}")
+    return compile_schema(schema)
+
+
+def validate_compose_schema(
+    config: dict[str, Any], schema_path: str = COMPOSE_SCHEMA_PATH
+) -> list[str]:
+    """
+    Validate a compose configuration against the compose schema.
+
+    Args:
+        config (dict[str, Any]): The interpolated compose configuration.
+        schema_path (str): Path to the compose JSON schema.
+
+    Returns:
+        list[str]: The schema violations found.
+    """
+    return get_compose_validator(schema_path)(config, "compose")
+
+
+def find_undefined_variables(value: Any, env: dict[str, str]) -> list[str]:
+    """
+    Find the variables a compose configuration references without a default and the
+    env does not define.
+
+    Args:
+        value (Any): The compose configuration or a value of it.
+        env (dict[str, str]): The variables of the generated .env file.
+
+    Returns:
+        list[str]: The sorted names of the undefined variables.
+    """
+    undefined = set()
+
+    def walk(item: Any) -> None:
+        if isinstance(item, dict):
+            for child in item.values():
+                walk(child)
+        elif isinstance(item, list):
+            for child in item:
+                walk(child)
+        elif isinstance(item, str):
+            for match in ENV_REFERENCE_PATTERN.finditer(item):
+                name = match.group(1) or match.group(4)
+                if name and not match.group(2) and name not in env:
+                    undefined.add(name)
+
+    walk(value)
+    return sorted(undefined)
+
+
+def check_service_references(config: dict[str, Any]) -> list[str]:
+    """
+    Check that the services a compose configuration refers to are defined in it.
+
+    Args:
+        config (dict[str, Any]): The compose configuration.
+
+    Returns:
+        list[str]: The dangling service references found.
+    """
+    services = config.get("services") or {}
+    problems = []
+    for name, service in services.items():
+        if not isinstance(service, dict):
+            continue
+        network_mode = service.get("network_mode")
+        if isinstance(network_mode, str) and network_mode.startswith("service:"):
+            target = network_mode.split(":", 1)[1]
+            if target not in services:
+                problems.append(
+                    f"compose.services.{name}.network_mode: service '{target}' is "
+                    "not defined"
+                )
+        depends_on = service.get("depends_on") or []
+        for target in depends_on if isinstance(depends_on, (list, dict)) else []:
+            if target not in services:
+                problems.append(
+                    f"compose.services.{name}.depends_on: service '{target}' is "
+                    "not defined"
+                )
+    return problems
+
+
+def get_host_ports(config: dict[str, Any]) -> dict[tuple[str, str, str], str]:
+    """
+    Collect the host ports a compose configuration publishes.
+
+    Args:
+        config (dict[str, Any]): The interpolated compose configuration.
+
+    Returns:
+        dict[tuple[str, str, str], str]: The publishing service by (host ip, host
+        port, protocol).
+    """
+    ports = {}
+    for name, service in (config.get("services") or {}).items():
+        if not isinstance(service, dict):
+            continue
+        for port in service.get("ports") or []:
+            if isinstance(port, dict):
+                if port.get("published") is None:
+                    continue
+                key = (
+                    str(port.get("host_ip", "")),
+                    str(port["published"]),
+                    str(port.get("protocol", "tcp")),
+                )
+            else:
+                match = PORT_MAPPING_PATTERN.match(str(port))
+                if not match:
+                    continue
+                key = (
+                    match.group("ip") or "",
+                    match.group("host"),
+                    match.group("protocol") or "tcp",
+                )
+            ports[key] = name
+    return ports
+
+
+def load_generated_files(
+    compose_file: str, env_file: str
+) -> tuple[dict[str, Any] | None, list[str]]:
+    """
+    Load and validate a generated compose file and its .env file.
+
+    Args:
+        compose_file (str): Path to the compose file, including any layers it extends.
+        env_file (str): Path to the .env file interpolated into the compose file.
+
+    Returns:
+        tuple[dict[str, Any] | None, list[str]]: The interpolated configuration, or None
+        if it could not be loaded, and the problems found.
+    """
+    try:
+        config = load_instance_compose_config(compose_file)
+    except Exception as e:
+        return None, [f"{compose_file}: cannot be loaded: {e}"]
+    if not isinstance(config, dict):
+        return None, [f"{compose_file}: is not a mapping"]
+
+    problems = []
+    env = {}
+    if os.path.exists(env_file):
+        with open(env_file) as f:
+            env = parse_env_content(f.read())
+    else:
+        problems.append(f"{env_file}: does not exist")
+
+    undefined = find_undefined_variables(config, env)
+    problems.extend(
+        f"compose: variable '{name}' is not defined in {os.path.basename(env_file)}"
+        for name in undefined
+    )
+    # Undefined variables are already reported, substitute them silently
+    interpolated = interpolate_compose_config(
+        config, {**dict.fromkeys(undefined, ""), **env}
+    )
+    problems.extend(validate_compose_schema(interpolated))
+    problems.extend(check_service_references(interpolated))
+    return interpolated, problems
+
+
+def check_stack_clashes(
+    config: dict[str, Any],
+    compose_file: str,
+    container_names: dict[str, str],
+    host_ports: dict[tuple[str, str, str], str],
+) -> list[str]:
+    """
+    Check a stack for container names and host ports already used by other stacks.
+
+    Args:
+        config (dict[str, Any]): The interpolated compose configuration of the stack.
+        compose_file (str): Path to the compose file of the stack.
+        container_names (dict[str, str]): The compose file using each container name
+            so far, updated with the names of this stack.
+        host_ports (dict[tuple[str, str, str], str]): The stack publishing each host
+            port so far, updated with the ports of this stack.
+
+    Returns:
+        list[str]: The clashes found.
+    """
+    problems = []
+    for name, service in (config.get("services") or {}).items():
+        container_name = (
+            service.get("container_name") if isinstance(service, dict) else None
+        )
+        if not container_name:
+            continue
+        if container_name in container_names:
+            problems.append(
+                f"compose.services.{name}.container_name: '{container_name}' is also "
+                f"used by {container_names[container_name]}"
+            )
+        else:
+            container_names[container_name] = compose_file
+    for key, service in get_host_ports(config).items():
+        _, port, protocol = key
+        if key in host_ports:
+            problems.append(
+                f"compose.services.{service}.ports: host port {port}/{protocol} is "
+                f"also published by {host_ports[key]}"
+            )
+        else:
+            host_ports[key] = f"{compose_file} ({service})"
+    return problems
+
+
+def validate_generated_files(
+    compose_file: str = "docker-compose.yaml",
+    env_file: str = ".env",
+    instances_dir: str = "m4b_proxy_instances",
+) -> dict[str, list[str]]:
+    """
+    Validate the generated compose and .env files of the main stack and every
+    multiproxy instance in one pass.
+
+    Besides validating each pair on its own, container names and host ports are
+    checked for clashes across all the stacks, as they share the Docker host.
+
+    Args:
+        compose_file (str): Path to the main compose file, skipped if missing.
+        env_file (str): Path to the main .env file.
+        instances_dir (str): Directory containing the multiproxy instances.
+
+    Returns:
+        dict[str, list[str]]: The problems found by compose file, empty when all
+        files are valid.
+    """
+    stacks = []
+    if os.path.exists(compose_file):
+        stacks.append((compose_file, env_file))
+    if os.path.isdir(instances_dir):
+        for name in sorted(os.listdir(instances_dir)):
+            instance_path = os.path.join(instances_dir, name)
+            instance_compose = os.path.join(instance_path, "docker-compose.yaml")
+            if os.path.isfile(instance_compose):
+                stacks.append((instance_compose, os.path.join(instance_path, ".env")))
+
+    results = {}
+    container_names: dict[str, str] = {}
+    host_ports: dict[tuple[str, str, str], str] = {}
+    for stack_compose, stack_env in stacks:
+        config, problems = load_generated_files(stack_compose, stack_env)
+        if config is not None:
+            problems.extend(
+                check_stack_clashes(config, stack_compose, container_names, host_ports)
+            )
+        if problems:
+            results[stack_compose] = problems
+
+    # The fleet project runs the same containers as the instances, validated apart
+    fleet_compose = os.path.join(instances_dir, COMPOSE_FLEET_FILENAME)
+    if os.path.isfile(fleet_compose):
+        _, problems = load_generated_files(
+            fleet_compose, os.path.join(instances_dir, ".env")
+        )
+        if problems:
+            results[fleet_compose] = problems
+
+    logging.info(
+        f"Validated {len(stacks)} generated compose file(s), {len(results)} with "
+        "problems"
+    )
+    return results
+
+
+def format_validation_report(results: dict[str, list[str]]) -> str:
+    """
+    Format the problems found by validate_generated_files for display.
+
+    Args:
+        results (dict[str, list[str]]): The problems found by compose file.
+
+    Returns:
+        str: The report.
+    """
+    if not results:
+        return "All generated compose files are valid."
+    lines = []
+    for compose_file, problems in results.items():
+        lines.append(f"{compose_file}:")
+        lines.extend(f"  - {problem}" for problem in problems)
+    return "\n".join(lines)
+
+
+def report_generated_files(
+    compose_file: str = "docker-compose.yaml",
+    env_file: str = ".env",
+    instances_dir: str = "m4b_proxy_instances",
+) -> bool:
+    """
+    Validate the generated files and print the problems found.
+
+    Validation problems never interrupt the caller, they are only reported.
+
+    Args:
+        compose_file (str): Path to the main compose file.
+        env_file (str): Path to the main .env file.
+        instances_dir (str): Directory containing the multiproxy instances.
+
+    Returns:
+        bool: True if all generated files are valid.
+    """
+    try:
+        results = validate_generated_files(compose_file, env_file, instances_dir)
+    except Exception as e:
+        logging.error(f"Error validating the generated files: {e}")
+        return False
+    for stack_compose, problems in results.items():
+        for problem in problems:
+            logging.warning(f"{stack_compose}: {problem}")
+    if results:
+        print(
+            f"{Fore.YELLOW}Problems found in the generated files:{Style.RESET_ALL}\n"
+            f"{format_validation_report(results)}"
+        )
+    return not results
+
+
+if __name__ == "__main__":
+    # Get the script absolute path and name
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    script_name = os.path.basename(__file__)
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description=f"Run the {script_name} module standalone."
+    )
+    parser.add_argument(
+        "--compose-file",
+        type=str,
+        default="docker-compose.yaml",
+        help="Path to the main compose file",
+    )
+    parser.add_argument(
+        "--env-file",
+        type=str,
+        default=".env",
+        help="Path to the main .env file",
+    )
+    parser.add_argument(
+        "--instances-dir",
+        type=str,
+        default="m4b_proxy_instances",
+        help="Directory containing the multiproxy instances",
+    )
+    parser.add_argument(
+        "--log-dir",
+        default=os.path.join(script_dir, "logs"),
+        help="Set the logging directory",
+    )
+    parser.add_argument(
+        "--log-file", default=f"{script_name}.log", help="Set the logging file name"
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        default="INFO",
+        help="Set the logging level",
+    )
+    args = parser.parse_args()
+
+    # Set logging level based on command-line arguments
+    log_level = getattr(logging, args.log_level.upper(), None)
+    if not isinstance(log_level, int):
+        raise ValueError(f"Invalid log level: {args.log_level}")
+
+    # Start logging
+    os.makedirs(args.log_dir, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(args.log_dir, args.log_file),
+        format="%(asctime)s - [%(levelname)s] - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=log_level,
+    )
+
+    logging.info(f"Starting {script_name} script...")
+
+    try:
+        results = validate_generated_files(
+            args.compose_file, args.env_file, args.instances_dir
+        )
+        print(format_validation_report(results))
+        logging.info(f"{script_name} script completed successfully")
+        sys.exit(1 if results else 0)
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {str(e)}")
+        raise